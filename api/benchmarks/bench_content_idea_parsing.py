@@ -0,0 +1,112 @@
+"""
+Fallback rate of content-idea parsing on imperfect model output.
+
+Variants of a valid recommendation are generated the way model answers go
+wrong: markdown fences, a sentence before the JSON, trailing commas, an
+out-of-range score, and answers cut off at a random point (the output cap).
+The previous parser (strip fences, json.loads, validate) is compared with the
+tolerant parser; a fallback means the whole generation was discarded. The
+valid recommendation differs from the fallback one in every field, so a
+result can be checked to carry the answer's core fields rather than fallback ones.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_content_idea_parsing --samples 2000
+"""
+
+import re
+import json
+import random
+import argparse
+from collections import Counter
+from typing import Callable, Dict
+
+from models.schemas import ContentRecommendation
+from services.gemini_utils import (
+    _create_fallback_recommendation, _parse_content_recommendation, CONTENT_IDEA_FALLBACK, CONTENT_IDEA_CORE_FIELDS,
+)
+
+# Jawaban model yang berbeda dari rekomendasi fallback di setiap field
+ANSWER = ContentRecommendation(
+    title="Build a Morning Routine That Sticks in 7 Days",
+    target_audience="Busy students and young professionals aged 18-30",
+    content_style="Personal vlog with a daily challenge and quick on-screen checklists",
+    suggested_structure={
+        "hook": "Show the chaotic morning before the routine in the first five seconds",
+        "challenge": "Introduce the 7-day challenge and the three habits it builds",
+        "daily_log": "Quick cuts of each day with one lesson learned",
+        "call_to_action": "Invite viewers to join the challenge and post their day one",
+    },
+    pro_tips=["Film the same angle every day so progress is easy to see", "Keep each day under 30 seconds"],
+    estimated_viral_score=64,
+    platform_recommendations=[{
+        "platform": "TikTok",
+        "suitability_score": 88,
+        "reasoning": "Daily challenge episodes suit short vertical video",
+        "optimization_tips": ["Post each day as its own clip", "Use a series hashtag"],
+    }],
+)
+
+
+def _legacy_parse(response_text: str) -> bool:
+    """The parsing of generate_content_idea before the tolerant parser; True when it succeeds."""
+    clean_json_text = response_text.strip()
+    if clean_json_text.startswith('```json'):
+        clean_json_text = clean_json_text[7:]
+    if clean_json_text.startswith('```'):
+        clean_json_text = clean_json_text[3:]
+    if clean_json_text.endswith('```'):
+        clean_json_text = clean_json_text[:-3]
+    try:
+        ContentRecommendation(**json.loads(clean_json_text.strip()))
+        return True
+    except Exception:
+        return False
+
+
+def _variants(rng: random.Random) -> Dict[str, Callable[[], str]]:
+    document = ANSWER.model_dump(mode="json")
+    text = json.dumps(document, indent=4)
+
+    def truncated() -> str:
+        # Terpotong di paruh kedua jawaban, seperti saat batas output tercapai
+        return text[:rng.randint(len(text) // 2, len(text) - 1)]
+
+    return {
+        "valid": lambda: text,
+        "fenced": lambda: f"```json\n{text}\n```",
+        "prose": lambda: f"Here is the content recommendation you asked for:\n{text}",
+        "trailing_commas": lambda: re.sub(r'(["\d\]}])\n(\s*[\]}])', r'\1,\n\2', text),
+        "score_out_of_range": lambda: text.replace('"estimated_viral_score": 64', '"estimated_viral_score": 120'),
+        "truncated": truncated,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    variants = _variants(rng)
+    fallback = _create_fallback_recommendation()
+    legacy, tolerant, kept = Counter(), Counter(), 0
+    for index in range(args.samples):
+        name = list(variants)[index % len(variants)]
+        answer = variants[name]()
+        legacy[name] += not _legacy_parse(answer)
+        recommendation, outcome = _parse_content_recommendation(answer)
+        tolerant[name] += outcome == CONTENT_IDEA_FALLBACK
+        kept += outcome != CONTENT_IDEA_FALLBACK and all(
+            getattr(recommendation, field) != getattr(fallback, field) for field in CONTENT_IDEA_CORE_FIELDS
+        )
+
+    per_variant = args.samples / len(variants)
+    for name in variants:
+        print(f"{name}: fallback {legacy[name] / per_variant:.0%} -> {tolerant[name] / per_variant:.0%}")
+    print(f"overall: fallback {sum(legacy.values()) / args.samples:.1%} -> {sum(tolerant.values()) / args.samples:.1%}")
+    used = args.samples - sum(tolerant.values())
+    print(f"core fields taken from the answer: {kept / used if used else 0:.1%} of the answers used")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Latency of the fast (heuristic-only) analysis mode, excluding YouTube I/O.
+
+Metadata and transcript are served from memory, so the timings cover the
+local stages only: viral score, extractive summary and fallback templates for
+videos; extraction and local analysis for documents. The target is a p99
+below 150 ms.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_fast_mode --sentences 2000 --paragraphs 2000 --rounds 200
+"""
+
+import io
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List
+
+from benchmarks.fixtures import make_docx, make_text_pdf, make_transcript
+from models.schemas import VideoMetadata
+from services.document_analyzer import DocumentAnalyzer
+from services.pdf_extraction import pdf_engine
+from services.video_pipeline import video_pipeline
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+async def _measure(label: str, run: Callable[[], Awaitable[object]], rounds: int) -> None:
+    # Putaran pemanasan agar import dan start-up worker tidak ikut terukur
+    await run()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await run()
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"{label}: p50 {_percentile(samples, 0.5):.1f} ms, p99 {_percentile(samples, 0.99):.1f} ms, max {max(samples):.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    metadata = VideoMetadata(
+        video_id="benchmark", title="7 Marketing Strategies That Actually Grow Your Channel", duration=900,
+        thumbnail_url="", channel_name="Benchmark", channel_id="benchmark", view_count=120000, like_count=6000,
+        comment_count=400, subscriber_count=80000, published_at=datetime.now(timezone.utc) - timedelta(days=2),
+    )
+    transcript = make_transcript(args.sentences)
+
+    async def from_memory(value: object) -> object:
+        return value
+
+    async def analyze_video() -> object:
+        run = video_pipeline.start("https://youtu.be/benchmark01", 300, fast=True)
+        # Metadata dan transkrip dari memori: I/O YouTube tidak ikut diukur
+        run._memo("metadata", lambda: from_memory(metadata))
+        run._memo("transcript", lambda: from_memory(transcript))
+        return await run.build_response()
+
+    analyzer = DocumentAnalyzer()
+    docx_bytes = make_docx(args.paragraphs)
+    pdf_bytes = make_text_pdf(args.pages)
+
+    print(f"Transcript: {len(transcript) / 1024:.0f} KiB, docx: {len(docx_bytes) / 1024:.0f} KiB, pdf: {args.pages} pages")
+    try:
+        await _measure("video", analyze_video, args.rounds)
+        await _measure("docx", lambda: analyzer.analyze_document_fast(io.BytesIO(docx_bytes), ".docx", "bench.docx"), args.rounds)
+        await _measure("pdf", lambda: analyzer.analyze_document_fast(io.BytesIO(pdf_bytes), ".pdf", "bench.pdf"), args.rounds)
+    finally:
+        pdf_engine.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Interactive latency of LLM calls while a batch tenant floods the scheduler.
+
+Calls are simulated with a fixed service time, so the timings are pure queue
+wait plus service. Interactive tenants send calls at a steady rate; in the
+loaded runs one tenant also submits a large batch backlog at once. The
+interactive p95 under the fair scheduler should stay close to the unloaded
+one, while a FIFO semaphore (the previous behavior) queues interactive calls
+behind the whole backlog.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_llm_scheduler --capacity 8 --batch 400 --interactive 200
+"""
+
+import time
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from services.llm_scheduler import LlmScheduler, caller_scope, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+class _FifoSlots:
+    """A plain semaphore with the scheduler's interface."""
+
+    def __init__(self, capacity: int):
+        self._semaphore = asyncio.Semaphore(capacity)
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 1.0) -> AsyncIterator[None]:
+        async with self._semaphore:
+            yield
+
+
+async def _run(slots, args: argparse.Namespace, with_batch: bool) -> List[float]:
+    latencies: List[float] = []
+
+    async def call(tenant: str, priority: str, record: bool) -> None:
+        with caller_scope(tenant, priority):
+            started = time.perf_counter()
+            async with slots.slot():
+                await asyncio.sleep(args.service_ms / 1000)
+            if record:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    tasks = []
+    if with_batch:
+        tasks = [asyncio.create_task(call("bulk-team", PRIORITY_BATCH, False)) for _ in range(args.batch)]
+        await asyncio.sleep(0)
+    interval = args.service_ms / 1000 / args.capacity * 2  # Interactive load at about half of the capacity
+    for index in range(args.interactive):
+        tasks.append(asyncio.create_task(call(f"user-{index % 5}", PRIORITY_INTERACTIVE, True)))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=400)
+    parser.add_argument("--interactive", type=int, default=200)
+    parser.add_argument("--service-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    for label, slots, with_batch in (
+        ("scheduler, interactive only", LlmScheduler(args.capacity), False),
+        ("scheduler, with batch flood", LlmScheduler(args.capacity), True),
+        ("fifo, with batch flood", _FifoSlots(args.capacity), True),
+    ):
+        samples = await _run(slots, args, with_batch)
+        print(f"{label}: interactive p50 {_percentile(samples, 0.5):.0f} ms, "
+              f"p95 {_percentile(samples, 0.95):.0f} ms, max {max(samples):.0f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""
+Compare single-core and N-core PDF extraction throughput.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_pdf_extraction --pages 200 --workers 4
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+from benchmarks.fixtures import make_text_pdf
+from services.pdf_extraction import PdfExtractionEngine
+
+
+async def _measure(engine: PdfExtractionEngine, pdf_bytes: bytes, rounds: int) -> float:
+    # Putaran pemanasan agar biaya start-up worker tidak ikut terukur
+    await engine.extract_pages(pdf_bytes)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await engine.extract_pages(pdf_bytes)
+    return (time.perf_counter() - started) / rounds
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_bytes = make_text_pdf(args.pages)
+    print(f"PDF: {args.pages} pages, {len(pdf_bytes) / 1024:.0f} KiB")
+
+    results = {}
+    for workers in sorted({1, args.workers}):
+        engine = PdfExtractionEngine(max_workers=workers)
+        try:
+            seconds = await _measure(engine, pdf_bytes, args.rounds)
+        finally:
+            engine.shutdown()
+        results[workers] = seconds
+        print(f"{workers:>2} worker(s): {seconds:.3f}s per document, {args.pages / seconds:.0f} pages/s")
+
+    if len(results) > 1:
+        print(f"Speedup: {results[1] / results[args.workers]:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
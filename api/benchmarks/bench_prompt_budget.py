@@ -0,0 +1,84 @@
+"""
+Character slices versus the token-budgeted prompt builder.
+
+Content-idea prompts are built from a summary and a success-factor text of
+random, independent lengths. The previous inputs (each cut to 600 characters)
+are compared with the prompt builder on the same inputs: how many inputs
+are cut mid-word or mid-sentence, how much of the budget is left unused when
+an input is shortened, and the prompt size. Build time per prompt is reported for the builder.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_prompt_budget --samples 2000
+"""
+
+import re
+import time
+import random
+import argparse
+from statistics import mean
+
+from utils.tokens import estimate_tokens
+from services.prompt_builder import build_prompt_builder
+from services.gemini_utils import CONTENT_IDEA_PROMPT
+
+WORDS = (
+    "the audience video creator content hook story engagement retention platform growth channel trend "
+    "tutorial explains shows because viewers share comment quickly strong visual editing pacing value"
+).split()
+
+
+def _text(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def _legacy_prompt(category: str, summary: str, reason: str) -> str:
+    return CONTENT_IDEA_PROMPT.text.format(category=category, summary=summary[:600], reason=reason[:600])
+
+
+def _cut(original: str, kept: str) -> str:
+    """How an input ended up in the prompt: whole, at a sentence end, at a word boundary, or mid-word."""
+    kept = kept.removesuffix("...")
+    if kept == original:
+        return "whole"
+    if kept.endswith("."):
+        return "sentence"
+    return "word" if original[len(kept)] == " " else "mid_word"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    builder = build_prompt_builder()
+    budget = builder.budget_for(CONTENT_IDEA_PROMPT.name)
+    inputs = [("Education", _text(rng, rng.randint(1, 12)), _text(rng, rng.randint(1, 12))) for _ in range(args.samples)]
+
+    started = time.perf_counter()
+    built = [builder.build(CONTENT_IDEA_PROMPT, category=c, summary=s, reason=r) for c, s, r in inputs]
+    build_us = (time.perf_counter() - started) / args.samples * 1e6
+    legacy = [_legacy_prompt(c, s, r) for c, s, r in inputs]
+
+    for name, prompts in (("slices", legacy), ("builder", built)):
+        cuts, unused = [], []
+        for (_, summary, reason), prompt in zip(inputs, prompts):
+            kept = re.search(r"Original Summary: (.*)\nSuccess Factors: (.*)\n", prompt).groups()
+            outcomes = [_cut(summary, kept[0]), _cut(reason, kept[1])]
+            cuts += outcomes
+            # Anggaran yang tidak terpakai pada prompt yang isinya dipotong
+            if outcomes != ["whole", "whole"]:
+                unused.append(budget - estimate_tokens(prompt))
+        tokens = [estimate_tokens(prompt) for prompt in prompts]
+        print(f"{name}: cut mid-word {cuts.count('mid_word') / len(cuts):.1%}, "
+              f"cut mid-sentence {(cuts.count('mid_word') + cuts.count('word')) / len(cuts):.1%}, "
+              f"prompt tokens mean {mean(tokens):.0f} / max {max(tokens)} (budget {budget}), "
+              f"unused budget when shortened {mean(unused) if unused else 0:.0f} tokens")
+    print(f"builder: {build_us:.0f} us per prompt")
+
+
+if __name__ == "__main__":
+    main()
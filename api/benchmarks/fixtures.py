@@ -0,0 +1,97 @@
+"""Synthetic documents used by the benchmarks."""
+
+import io
+from typing import List
+
+
+def _escape_pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """Build a plain PDF with `pages` pages of text, without external tools."""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page_number in range(1, pages + 1):
+        lines = [
+            f"Page {page_number} line {line}: revenue grew 12.5% to $3.4M while costs fell in 2023."
+            for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 40 800 Td 14 TL " + " ".join(f"({_escape_pdf_text(line)}) Tj T*" for line in lines) + " ET"
+        stream_bytes = stream.encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for object_id, body in enumerate(objects, 1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+    xref_offset = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_offset))
+    return output.getvalue()
+
+
+def make_docx(paragraphs: int, tables: int = 10, rows_per_table: int = 20) -> bytes:
+    """Build a .docx with `paragraphs` paragraphs and a few tables using python-docx."""
+    import docx
+
+    document = docx.Document()
+    for index in range(paragraphs):
+        document.add_paragraph(f"Paragraph {index}: the quarterly report shows revenue of $1.2M and 8% growth.")
+    for _ in range(tables):
+        table = document.add_table(rows=rows_per_table, cols=4)
+        for row in table.rows:
+            for column, cell in enumerate(row.cells):
+                cell.text = f"value {column}"
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def make_pptx(slides: int) -> bytes:
+    """Build a .pptx with `slides` title-and-content slides plus a small table each."""
+    import pptx
+    from pptx.util import Inches
+
+    presentation = pptx.Presentation()
+    for index in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {index}: market overview"
+        slide.placeholders[1].text_frame.text = "Revenue grew 12%\nCosts fell 3%\nHeadcount stable"
+        table = slide.shapes.add_table(3, 3, Inches(1), Inches(4), Inches(6), Inches(1.5)).table
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = "42"
+    output = io.BytesIO()
+    presentation.save(output)
+    return output.getvalue()
+
+
+def make_transcript(sentences: int) -> str:
+    """Build a spoken-style transcript with `sentences` sentences."""
+    topics = ["marketing strategy", "video editing", "audience growth", "content ideas", "revenue streams"]
+    return " ".join(
+        f"In this part we talk about {topics[index % len(topics)]} and how it helps your channel grow by {index % 9 + 1} percent."
+        for index in range(sentences)
+    )
@@ -3,9 +3,12 @@ from dotenv import load_dotenv
 # untuk memuat environment variables sebelum modul lain diimpor.
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from routers import analyze, analyze_document
+from routers import analyze, analyze_document, metrics, admin, jobs
+from services.pdf_extraction import pdf_engine
+from services.jobs import job_manager
+from services.llm_scheduler import caller_scope, tenant_id, PRIORITY_BATCH
 import os
 
 app = FastAPI(
@@ -34,9 +37,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Panggilan Gemini dijadwalkan per tenant (X-API-Key yang terdaftar di LLM_TENANT_WEIGHTS, selain itu anonymous);
+# klien boleh menurunkan prioritasnya dengan X-Priority: batch
+@app.middleware("http")
+async def llm_caller_context(request: Request, call_next):
+    priority = PRIORITY_BATCH if request.headers.get("X-Priority", "").lower() == PRIORITY_BATCH else None
+    with caller_scope(tenant_id(request.headers.get("X-API-Key")), priority):
+        return await call_next(request)
+
 # Include routers
 app.include_router(analyze.router, prefix="/api", tags=["analyze"])
 app.include_router(analyze_document.router, prefix="/api", tags=["document"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+
+@app.on_event("startup")
+async def start_workers():
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await job_manager.stop()
+    pdf_engine.shutdown()
 
 @app.get("/")
 async def root():
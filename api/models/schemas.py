@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from pydantic import AliasChoices, BaseModel, Field, field_validator
+from typing import List, Dict, Literal, Optional
 from datetime import datetime
 
 class AnalyzeRequest(BaseModel):
@@ -7,6 +7,29 @@ class AnalyzeRequest(BaseModel):
     youtube_url: Optional[str] = Field(None, description="YouTube video URL to analyze")
     file_path: Optional[str] = Field(None, description="File path for document analysis")
     average_view_duration: Optional[int] = Field(None, description="Average view duration in seconds from YouTube Studio")
+    fields: Optional[List[str]] = Field(
+        None,
+        validation_alias=AliasChoices("fields", "include"),
+        description="Response fields to compute (e.g. ['video_metadata', 'viral_score']); stages only needed for other fields are skipped. Also accepted as 'include'.",
+    )
+    deadline_seconds: Optional[float] = Field(
+        None, gt=0,
+        description="Time budget for the analysis; stages switch to cheaper strategies as it runs out. Defaults to the server deadline.",
+    )
+    mode: Literal["full", "fast"] = Field(
+        "full",
+        description="'fast' builds the analysis locally without Gemini (heuristic score, extractive summary, template recommendations)",
+    )
+
+    @field_validator("fields")
+    @classmethod
+    def _known_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        unknown = [name for name in fields if name not in AnalyzeResponse.model_fields]
+        if unknown:
+            raise ValueError(f"Unknown response fields: {', '.join(unknown)}. Allowed: {', '.join(AnalyzeResponse.model_fields)}")
+        return fields
 
 class VideoMetadata(BaseModel):
     """Video metadata information."""
@@ -56,6 +79,17 @@ class AnalyzeResponse(BaseModel):
     recommendations: ContentRecommendation = Field(..., description="Content recommendations")
     doc_summary: Optional[str] = Field(None, description="Document summary if file was analyzed")
 
+class PartialAnalyzeResponse(BaseModel):
+    """Content analysis limited to the requested `fields`; fields that were not requested are null."""
+    video_metadata: Optional[VideoMetadata] = Field(None, description="Video metadata")
+    summary: Optional[str] = Field(None, description="Overall content summary")
+    timeline_summary: Optional[List[TimelineItem]] = Field(None, description="Timeline-based summary")
+    viral_score: Optional[int] = Field(None, ge=0, le=100, description="Viral potential score")
+    viral_label: Optional[str] = Field(None, description="Viral potential label")
+    viral_explanation: Optional[str] = Field(None, description="Explanation of viral potential")
+    recommendations: Optional[ContentRecommendation] = Field(None, description="Content recommendations")
+    doc_summary: Optional[str] = Field(None, description="Document summary if file was analyzed")
+
 class ErrorResponse(BaseModel):
     """Error response model."""
     error: str = Field(..., description="Error message")
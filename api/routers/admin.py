@@ -0,0 +1,34 @@
+import os
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from services.document_cache import document_analysis_cache
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Endpoint admin hanya aktif jika ADMIN_API_KEY diset, dan header X-Admin-Key harus cocok."""
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if not admin_key:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled. Set ADMIN_API_KEY to enable them.")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key.")
+
+@router.delete("/admin/document-cache/{content_sha256}", dependencies=[Depends(require_admin_key)])
+async def invalidate_document_analysis(content_sha256: str):
+    """Menghapus hasil analisis dokumen yang tersimpan untuk SHA-256 tertentu."""
+    if len(content_sha256) != 64 or any(c not in "0123456789abcdefABCDEF" for c in content_sha256):
+        raise HTTPException(status_code=400, detail="Expected a hex-encoded SHA-256 digest.")
+    removed = await document_analysis_cache.invalidate(content_sha256)
+    logger.info(f"Invalidated {removed} cached analyses for document {content_sha256}")
+    return {"sha256": content_sha256.lower(), "removed": removed}
+
+@router.delete("/admin/document-cache", dependencies=[Depends(require_admin_key)])
+async def clear_document_analyses():
+    """Mengosongkan seluruh cache analisis dokumen."""
+    removed = await document_analysis_cache.clear()
+    logger.info(f"Cleared document analysis cache ({removed} entries)")
+    return {"removed": removed}
@@ -1,129 +1,224 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from models.schemas import AnalyzeRequest, AnalyzeResponse, VideoMetadata
-from services.transcriber import TranscriberService, VideoProcessingError
-from services.viral import ViralAnalysisService
-from services.gemini_utils import summarize_transcript, explain_why_viral, generate_content_idea
+from fastapi import APIRouter, HTTPException, Response, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from models.schemas import AnalyzeRequest, AnalyzeResponse, PartialAnalyzeResponse
+from services.video_pipeline import video_pipeline, VideoNotFoundError, get_viral_label, has_fallback_output, STAGE_DONE
+from services.response_cache import analyze_response_cache, CacheLookup, CACHE_MISS, CACHE_STALE
+from services.fast_analysis import resolve_analysis_mode, ANALYSIS_MODE_FULL
+from services.admission import AdmissionController, AdmissionRejectedError, analyze_admission
+from services.llm_scheduler import caller_scope, PRIORITY_BATCH
 from utils import youtube
+from utils.deadline import deadline_scope, with_deadline, DeadlineExceeded, DEFAULT_DEADLINE_SECONDS, MAX_DEADLINE_SECONDS
+import json
+import asyncio
 import logging
-import tempfile
-import os
-from pathlib import Path
-import PyPDF2
-import docx
-import pptx
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-transcriber_service = TranscriberService()
-viral_service = ViralAnalysisService()
+def _analyze_cache_key(video_id: str, average_view_duration: Optional[int]) -> str:
+    return f"{video_id}:{average_view_duration}"
 
-@router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_content(request: AnalyzeRequest):
+def _set_cache_headers(response: Response, lookup: CacheLookup) -> None:
+    response.headers["X-Cache"] = lookup.status
+    response.headers["Age"] = str(lookup.age)
+    response.headers["Cache-Control"] = analyze_response_cache.cache_control()
+
+@asynccontextmanager
+async def _admitted(controller: AdmissionController) -> AsyncIterator[None]:
+    """Hold an analysis slot of the endpoint; a full queue is rejected with 429."""
+    try:
+        granted_at = await controller.acquire()
+    except AdmissionRejectedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        yield
+    finally:
+        controller.release(granted_at)
+
+def _project(result: AnalyzeResponse, fields: Optional[List[str]]) -> Union[AnalyzeResponse, PartialAnalyzeResponse]:
+    """Keep only the requested fields."""
+    if fields is None:
+        return result
+    return PartialAnalyzeResponse(**{name: getattr(result, name) for name in fields})
+
+async def _refresh_cached_analysis(cache_key: str, youtube_url: str, average_view_duration: Optional[int]) -> None:
+    """Menyegarkan entri cache yang sudah basi di latar belakang."""
+    try:
+        with caller_scope(priority=PRIORITY_BATCH):
+            result = await video_pipeline.analyze(youtube_url, average_view_duration)
+        # Hasil cadangan tidak boleh menggantikan entri yang masih bagus
+        if has_fallback_output(result):
+            logger.warning(f"Background refresh for {cache_key} fell back to canned output, keeping the cached entry")
+            return
+        await analyze_response_cache.set(cache_key, result.model_dump(mode="json"))
+        logger.info(f"Refreshed cached analysis for {cache_key}")
+    except Exception as e:
+        logger.warning(f"Background refresh failed for {cache_key}: {e}")
+    finally:
+        analyze_response_cache.end_refresh(cache_key)
+
+@router.post("/analyze", response_model=Union[AnalyzeResponse, PartialAnalyzeResponse])
+async def analyze_content(request: AnalyzeRequest, response: Response, background_tasks: BackgroundTasks):
     """Menganalisis konten YouTube."""
     if not request.youtube_url:
         raise HTTPException(status_code=400, detail="youtube_url must be provided")
-    logger.info(f"Analyzing YouTube content: {request.youtube_url}")
+    video_id = youtube.extract_video_id(request.youtube_url)
+    if not video_id:
+        raise HTTPException(status_code=404, detail="Invalid YouTube URL or video not found.")
+
+    cache_key = _analyze_cache_key(video_id, request.average_view_duration)
+    cached = await analyze_response_cache.get(cache_key)
+    if cached.status != CACHE_MISS:
+        _set_cache_headers(response, cached)
+        response.headers["X-Analysis-Mode"] = ANALYSIS_MODE_FULL
+        if cached.status == CACHE_STALE and analyze_response_cache.begin_refresh(cache_key):
+            background_tasks.add_task(_refresh_cached_analysis, cache_key, request.youtube_url, request.average_view_duration)
+        return _project(AnalyzeResponse.model_validate(cached.value), request.fields)
+
+    # Mode cepat: tanpa Gemini, juga dipakai otomatis saat Gemini tidak tersedia
+    analysis_mode = resolve_analysis_mode(request.mode)
+    logger.info(f"Analyzing YouTube content ({analysis_mode}): {request.youtube_url}")
+    # Deadline request diteruskan ke setiap tahapan lewat context variable
+    budget = min(request.deadline_seconds or DEFAULT_DEADLINE_SECONDS, MAX_DEADLINE_SECONDS)
     try:
-        video_metadata = await youtube.get_video_metadata(request.youtube_url)
-        if not video_metadata:
-            raise HTTPException(status_code=404, detail="Invalid YouTube URL or video not found.")
-        
-        comments = await youtube.get_video_comments(video_metadata.video_id)
-        transcript = await transcriber_service.get_transcript(request.youtube_url)
-        
-        overall_summary = await summarize_transcript(transcript)
-        viral_explanation = await explain_why_viral(video_metadata.title, video_metadata.view_count or 0, video_metadata.like_count or 0, overall_summary)
-        recommendations = await generate_content_idea("youtube", overall_summary, viral_explanation)
-        
-        # --- PERBAIKAN DI SINI ---
-        # Mengubah cara pemanggilan fungsi agar sesuai dengan definisi baru
-        viral_score = await viral_service.calculate_viral_score(
-            content=transcript,
-            metadata=video_metadata,
-            average_view_duration=request.average_view_duration
-        )
-        
-        if viral_score >= 80: viral_label = "Very High Potential"
-        elif viral_score >= 60: viral_label = "Good Potential"
-        else: viral_label = "Needs Improvement"
-        
-        return AnalyzeResponse(
-            video_metadata=video_metadata, summary=overall_summary, timeline_summary=[],
-            viral_score=viral_score, viral_label=viral_label, 
-            viral_explanation=viral_explanation, recommendations=recommendations
-        )
+        with deadline_scope(budget) as deadline:
+            # Waktu antre untuk slot analisis ikut dihitung dalam deadline
+            async with _admitted(analyze_admission):
+                # Tahapan yang input-nya tidak berubah sejak analisis sebelumnya dipakai ulang;
+                # dengan `fields`, hanya tahapan yang dibutuhkan field tersebut yang dijalankan
+                result = await with_deadline(video_pipeline.analyze(
+                    request.youtube_url, request.average_view_duration,
+                    fields=request.fields, fast=analysis_mode != ANALYSIS_MODE_FULL,
+                ))
+    except HTTPException:
+        raise
+    except DeadlineExceeded:
+        logger.warning(f"Analysis of {request.youtube_url} exceeded its {budget:.0f}s deadline")
+        raise HTTPException(status_code=504, detail=f"Analysis did not finish within {budget:.0f} seconds")
+    except VideoNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"An unexpected server error occurred: {e}", exc_info=True)
         # Memberikan detail error ke client untuk mempermudah debugging
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {type(e).__name__}")
 
-@router.post("/analyze-document", response_model=AnalyzeResponse)
-async def analyze_document(file: UploadFile = File(...)):
-    """Menganalisis dokumen yang diunggah."""
-    allowed_extensions = {'.pdf', '.doc', '.docx', '.txt', '.ppt', '.pptx'}
-    file_extension = Path(file.filename or '').suffix.lower()
-    if file_extension not in allowed_extensions:
-        raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}")
-    
+    # Hanya respons lengkap dari analisis penuh yang tidak terpotong deadline dan tanpa hasil cadangan yang disimpan di cache
+    if (request.fields is None and analysis_mode == ANALYSIS_MODE_FULL and not deadline.degraded
+            and not has_fallback_output(result)):
+        await analyze_response_cache.set(cache_key, result.model_dump(mode="json"))
+    _set_cache_headers(response, CacheLookup(CACHE_MISS))
+    response.headers["X-Analysis-Mode"] = analysis_mode
+    if deadline.degraded:
+        response.headers["X-Degraded-Stages"] = ",".join(deadline.degraded)
+    return result
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _stage_event(stage: str, value: Any) -> Optional[str]:
+    """SSE event for a finished pipeline stage (the transcript itself is not sent)."""
+    if stage == "metadata":
+        return _sse_event("metadata", value.model_dump(mode="json"))
+    if stage == "viral_score":
+        return _sse_event("viral_score", {"viral_score": value, "viral_label": get_viral_label(value)})
+    if stage == "summary":
+        return _sse_event("summary", {"summary": value})
+    if stage == "viral_explanation":
+        return _sse_event("viral_explanation", {"viral_explanation": value})
+    if stage == "recommendations":
+        return _sse_event("recommendations", value.model_dump(mode="json"))
+    return None
+
+async def _cached_analysis_events(value: Dict[str, Any]) -> AsyncIterator[str]:
+    yield _sse_event("metadata", value.get("video_metadata"))
+    yield _sse_event("viral_score", {"viral_score": value["viral_score"], "viral_label": value["viral_label"]})
+    yield _sse_event("summary", {"summary": value["summary"]})
+    yield _sse_event("viral_explanation", {"viral_explanation": value["viral_explanation"]})
+    yield _sse_event("recommendations", value["recommendations"])
+    yield _sse_event("done", value)
+
+async def _analysis_events(cache_key: str, youtube_url: str, average_view_duration: Optional[int]) -> AsyncIterator[str]:
+    """Run the pipeline and yield an SSE event for every stage as soon as it completes."""
+    events: "asyncio.Queue[tuple]" = asyncio.Queue()
+    run = video_pipeline.start(
+        youtube_url, average_view_duration,
+        on_stage=lambda stage, status: events.put_nowait(("stage", stage, status)),
+        on_summary_delta=lambda delta: events.put_nowait(("summary_delta", delta)),
+    )
+    build = asyncio.ensure_future(run.build_response())
+    build.add_done_callback(lambda task: events.put_nowait(("finished",)))
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        while True:
+            item = await events.get()
+            if item[0] == "summary_delta":
+                yield _sse_event("summary_delta", {"text": item[1]})
+            elif item[0] == "stage" and item[2] == STAGE_DONE:
+                event = _stage_event(item[1], await getattr(run, item[1])())
+                if event:
+                    yield event
+            elif item[0] == "finished":
+                break
+
         try:
-            document_text = await extract_text_from_document(temp_file_path, file_extension)
-            if not document_text or len(document_text.strip()) < 20:
-                raise HTTPException(status_code=422, detail="Document content is too short or empty.")
-            
-            overall_summary = await summarize_transcript(document_text)
-            
-            # Untuk dokumen, kita buat metadata dummy karena tidak relevan
-            dummy_metadata = VideoMetadata(
-                video_id="doc_analysis", title=file.filename or "Document", duration=0,
-                thumbnail_url="", channel_name="", channel_id="", view_count=0, like_count=0,
-                comment_count=0, subscriber_count=0, published_at=None, description=""
-            )
-            viral_score = await viral_service.calculate_viral_score(document_text, dummy_metadata)
-
-            if viral_score >= 80: viral_label = "Very High Potential"
-            elif viral_score >= 60: viral_label = "Good Potential"
-            else: viral_label = "Needs Improvement"
-
-            viral_explanation = "This document has strong potential to be repurposed into engaging digital content."
-            recommendations = await generate_content_idea("document", overall_summary, viral_explanation)
-            
-            return AnalyzeResponse(
-                summary=overall_summary, viral_score=viral_score, viral_label=viral_label,
-                viral_explanation=viral_explanation, recommendations=recommendations, doc_summary=overall_summary
-            )
-        finally:
-            os.unlink(temp_file_path)
-    except Exception as e:
-        logger.error(f"Document analysis failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to analyze document.")
+            result = build.result()
+        except VideoNotFoundError as e:
+            yield _sse_event("error", {"status_code": 404, "detail": str(e)})
+            return
+        except Exception as e:
+            logger.error(f"Streaming analysis failed: {e}", exc_info=True)
+            yield _sse_event("error", {"status_code": 500, "detail": f"An internal server error occurred: {type(e).__name__}"})
+            return
+
+        value = result.model_dump(mode="json")
+        if not has_fallback_output(result):
+            await analyze_response_cache.set(cache_key, value)
+        yield _sse_event("done", value)
+    finally:
+        # Client terputus: hentikan tahapan yang masih berjalan
+        if not build.done():
+            build.cancel()
+            run.cancel()
 
-async def extract_text_from_document(file_path: str, file_extension: str) -> str:
-    """Mengekstrak teks dari berbagai format dokumen."""
-    text = ""
+async def _admitted_events(controller: AdmissionController, events: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Start the event stream once a slot is free; rejection after the headers were sent is an error event."""
     try:
-        if file_extension == '.txt':
-            with open(file_path, 'r', encoding='utf-8') as f: return f.read()
-        elif file_extension == '.pdf':
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages: text += page.extract_text() or ""
-            return text
-        elif file_extension in ['.doc', '.docx']:
-            doc = docx.Document(file_path)
-            for para in doc.paragraphs: text += para.text + "\n"
-            return text
-        elif file_extension in ['.ppt', '.pptx']:
-            prs = pptx.Presentation(file_path)
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"): text += shape.text + "\n"
-            return text
-        raise ValueError(f"Unsupported file type: {file_extension}")
-    except Exception as e:
-        raise Exception(f"Failed to process {file_extension} file: {e}")
\ No newline at end of file
+        async with controller.admit():
+            async with aclosing(events):
+                async for event in events:
+                    yield event
+    except AdmissionRejectedError as e:
+        yield _sse_event("error", {"status_code": 429, "detail": str(e), "retry_after": e.retry_after})
+
+@router.get("/analyze/stream")
+async def analyze_content_stream(youtube_url: str = Query(...), average_view_duration: Optional[int] = Query(None)):
+    """
+    Streaming variant of /analyze as server-sent events. Events are sent as
+    each stage completes: metadata, viral_score, summary_delta (Gemini text as
+    it arrives), summary, viral_explanation, recommendations and finally done
+    with the complete response (or error).
+    """
+    video_id = youtube.extract_video_id(youtube_url)
+    if not video_id:
+        raise HTTPException(status_code=404, detail="Invalid YouTube URL or video not found.")
+
+    cache_key = _analyze_cache_key(video_id, average_view_duration)
+    cached = await analyze_response_cache.get(cache_key)
+    refresh = None
+    if cached.status != CACHE_MISS:
+        events = _cached_analysis_events(cached.value)
+        if cached.status == CACHE_STALE and analyze_response_cache.begin_refresh(cache_key):
+            refresh = BackgroundTask(_refresh_cached_analysis, cache_key, youtube_url, average_view_duration)
+    else:
+        if analyze_admission.would_reject():
+            raise HTTPException(status_code=429, detail="Too many concurrent analyze requests",
+                                headers={"Retry-After": str(analyze_admission.retry_after())})
+        events = _admitted_events(analyze_admission, _analysis_events(cache_key, youtube_url, average_view_duration))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Cache": cached.status},
+        background=refresh,
+    )
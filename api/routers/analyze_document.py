@@ -1,96 +1,69 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Response, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from models.schemas import AnalyzeResponse, VideoMetadata
 from services.document_analyzer import DocumentAnalyzer
-from services.gemini_utils import generate_content_idea
-import logging
-import tempfile
+from services.document_cache import document_analysis_cache
+from services.gemini_utils import generate_content_idea, _create_fallback_recommendation
+from services.response_cache import CACHE_HIT, CACHE_MISS
+from services.fast_analysis import resolve_analysis_mode, ANALYSIS_MODE_FULL
+from services.admission import AdmissionController, AdmissionRejectedError, document_admission, document_batch_admission
+from services.llm_scheduler import caller_scope, PRIORITY_BATCH
+from services.video_pipeline import STAGE_RUNNING, STAGE_DONE
+from utils.uploads import ingest_upload, IngestedUpload, UploadTooLargeError, MAX_UPLOAD_BYTES
+from utils.archives import extract_archive_documents, ArchiveLimitError, ARCHIVE_MAX_BYTES, ARCHIVE_MAX_FILES
+from utils.file_types import detect_document_format
 import os
+import json
+import asyncio
+import logging
+import zipfile
+from contextlib import nullcontext
 from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Literal, Optional, Tuple
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 document_analyzer = DocumentAnalyzer()
 
+# Dokumen yang diproses bersamaan per request batch; panggilan Gemini tetap dibatasi GEMINI_MAX_CONCURRENCY
+DOCUMENT_BATCH_PARALLELISM = int(os.getenv("DOCUMENT_BATCH_PARALLELISM", "4"))
+
+ALLOWED_EXTENSIONS = {'.pdf', '.doc', '.docx', '.txt', '.ppt', '.pptx'}
+DOCUMENT_STAGES = ("analysis", "recommendations")
+ZIP_EXTENSIONS = {'.zip'}
+
 @router.post("/analyze-document", response_model=AnalyzeResponse)
-async def analyze_document(file: UploadFile = File(...)):
+async def analyze_document(response: Response, file: UploadFile = File(...),
+                           mode: Literal["full", "fast"] = Query("full")):
     """
     Analyze uploaded document and extract summary with key points.
-    Supports PDF, Word, PowerPoint, and text files.
+    Supports PDF, Word, PowerPoint, and text files. With mode=fast (or while
+    Gemini is unavailable) the analysis is built locally without Gemini.
     """
-    # Validate file type
-    allowed_extensions = {'.pdf', '.doc', '.docx', '.txt', '.ppt', '.pptx'}
-    file_extension = Path(file.filename or '').suffix.lower()
-    
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file type. Allowed formats: {', '.join(allowed_extensions)}"
-        )
-    
-    # Validate file size (max 10MB)
-    if file.size and file.size > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=400,
-            detail="File size must be less than 10MB"
-        )
-    
-    temp_file_path = None
+    upload = None
     try:
-        # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        # Stream the upload into memory, enforcing the size limit (max 10MB) on the way
+        try:
+            upload = await ingest_upload(file)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
         
-        # Analyze the document
-        analysis_result = await document_analyzer.analyze_document(
-            temp_file_path, 
-            file_extension, 
-            file.filename or "document"
-        )
-        
-        # Create enhanced summary with key points
-        enhanced_summary = analysis_result["summary"]
-        
-        # Generate content recommendations based on document analysis
-        recommendations = await generate_content_idea(
-            "document", 
-            analysis_result["summary"], 
-            "This document contains valuable insights that could be repurposed into engaging content."
-        )
-        
-        # Create dummy metadata for document (required by response model)
-        dummy_metadata = VideoMetadata(
-            video_id="doc_analysis",
-            title=file.filename or "Document Analysis",
-            duration=0,
-            thumbnail_url="",
-            channel_name="Document Upload",
-            channel_id="",
-            view_count=0,
-            like_count=0,
-            comment_count=0,
-            subscriber_count=0,
-            published_at=None,
-            description=f"Analysis of {file.filename}"
-        )
-        
-        # Calculate a basic viral score based on content quality
-        viral_score = _calculate_document_viral_score(analysis_result)
-        viral_label = _get_viral_label(viral_score)
-        
-        return AnalyzeResponse(
-            video_metadata=dummy_metadata,
-            summary=analysis_result,
-            timeline_summary=[],  # Not applicable for documents
-            viral_score=viral_score,
-            viral_label=viral_label,
-            viral_explanation=_generate_viral_explanation(analysis_result),
-            recommendations=recommendations,
-            doc_summary=enhanced_summary
-        )
+        analysis_mode = resolve_analysis_mode(mode)
+        try:
+            result, cache_status = await analyze_uploaded_document(
+                upload, file.filename, fast=analysis_mode != ANALYSIS_MODE_FULL, admission=document_admission
+            )
+        except AdmissionRejectedError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        response.headers["X-Cache"] = cache_status
+        # A cached result is always a full analysis
+        response.headers["X-Analysis-Mode"] = ANALYSIS_MODE_FULL if cache_status == CACHE_HIT else analysis_mode
+        return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Document analysis failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -100,12 +73,221 @@ async def analyze_document(file: UploadFile = File(...)):
     
     finally:
         # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
+        if upload:
+            upload.cleanup()
+
+
+@router.post("/analyze-documents")
+async def analyze_documents(files: List[UploadFile] = File(...),
+                            mode: Literal["full", "fast"] = Query("full")):
+    """
+    Analyze several documents, or the documents inside one zip archive, in a
+    single request. Results are streamed as NDJSON, one line per document in
+    completion order: {"index", "filename", "status": "ok", "result"} or
+    {"index", "filename", "status": "error", "status_code", "detail"}.
+    mode=fast analyzes every document locally without Gemini.
+    """
+    if len(files) > ARCHIVE_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {ARCHIVE_MAX_FILES} files can be analyzed per request")
+    
+    documents: List[Tuple[str, IngestedUpload]] = []
+    try:
+        for file in files:
+            filename = file.filename or "document"
+            is_archive = Path(filename).suffix.lower() in ZIP_EXTENSIONS
             try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temporary file: {str(e)}")
+                upload = await ingest_upload(file, max_bytes=ARCHIVE_MAX_BYTES if is_archive else MAX_UPLOAD_BYTES)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=f"{filename}: {str(e)}")
+            
+            # Arsip zip dibuka menjadi dokumen-dokumen di dalamnya (.docx/.pptx juga zip, tapi dikenali formatnya)
+            if is_archive and detect_document_format(upload.stream) is None:
+                try:
+                    documents.extend(await asyncio.to_thread(extract_archive_documents, upload.stream))
+                except ArchiveLimitError as e:
+                    raise HTTPException(status_code=413, detail=f"{filename}: {str(e)}")
+                except zipfile.BadZipFile:
+                    raise HTTPException(status_code=400, detail=f"{filename} is not a valid zip archive")
+                finally:
+                    upload.cleanup()
+            else:
+                documents.append((filename, upload))
+        
+        if len(documents) > ARCHIVE_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"At most {ARCHIVE_MAX_FILES} documents can be analyzed per request")
+
+        # Slot baru diambil setelah semua unggahan diterima, agar tidak tertahan selama I/O upload
+        try:
+            granted_at = await document_batch_admission.acquire()
+        except AdmissionRejectedError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except BaseException:
+        for _, upload in documents:
+            upload.cleanup()
+        raise
+    
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            document_batch_admission.release(granted_at)
+
+    analysis_mode = resolve_analysis_mode(mode)
+    # The stream releases the slot when it ends or fails; the background task only covers a stream that never started
+    return StreamingResponse(
+        _stream_document_results(documents, fast=analysis_mode != ANALYSIS_MODE_FULL, on_done=release),
+        background=BackgroundTask(release),
+        media_type="application/x-ndjson",
+        headers={"X-Analysis-Mode": analysis_mode},
+    )
+
+
+async def _stream_document_results(documents: List[Tuple[str, IngestedUpload]], fast: bool = False,
+                                   on_done: Optional[Callable[[], None]] = None) -> AsyncIterator[str]:
+    """
+    Analyze documents concurrently and yield one NDJSON line per document as
+    soon as it finishes. `on_done` is called once the stream has ended,
+    failed or been closed.
+    """
+    semaphore = asyncio.Semaphore(DOCUMENT_BATCH_PARALLELISM)
+    
+    async def analyze(index: int, filename: str, upload: IngestedUpload) -> Dict:
+        line = {"index": index, "filename": filename}
+        try:
+            # Analisis massal tidak boleh menggeser panggilan Gemini interaktif
+            async with semaphore:
+                with caller_scope(priority=PRIORITY_BATCH):
+                    result, _ = await analyze_uploaded_document(upload, filename, fast=fast)
+            line.update(status="ok", result=result.model_dump(mode="json"))
+        except HTTPException as e:
+            line.update(status="error", status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            logger.error(f"Document analysis failed for {filename}: {str(e)}", exc_info=True)
+            line.update(status="error", status_code=500, detail=f"Failed to analyze document: {str(e)}")
+        finally:
+            upload.cleanup()
+        return line
+    
+    tasks = [asyncio.create_task(analyze(index, filename, upload)) for index, (filename, upload) in enumerate(documents)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+    finally:
+        # Client terputus: hentikan analisis yang belum selesai
+        for task in tasks:
+            task.cancel()
+        for _, upload in documents:
+            upload.cleanup()
+        if on_done is not None:
+            on_done()
+
+
+async def analyze_uploaded_document(upload: IngestedUpload, filename: Optional[str],
+                                    on_stage: Optional[Callable[[str, str], None]] = None,
+                                    fast: bool = False,
+                                    admission: Optional[AdmissionController] = None) -> Tuple[AnalyzeResponse, str]:
+    """
+    Analyze an ingested upload, using the content-hash cache.
+    `on_stage(stage, status)` reports the progress of the DOCUMENT_STAGES.
+    With `fast`, a cache miss is analyzed locally without Gemini and the
+    result is not cached. With `admission`, a cache miss is only analyzed
+    once the controller grants a slot (cache hits never wait).
+    
+    Returns:
+        The response and the cache status (HIT or MISS)
+    
+    Raises:
+        HTTPException: The file type is not supported
+        AdmissionRejectedError: `admission` rejected the request
+    """
+    # Validate file type, detected from the content; the filename suffix is only a fallback
+    file_extension = detect_document_format(upload.stream) or Path(filename or '').suffix.lower()
+    if file_extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported file type. Allowed formats: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    
+    report = on_stage or (lambda stage, status: None)
+    
+    # Identical bytes were analyzed before: serve the stored result
+    cached = await document_analysis_cache.get("document", upload.sha256)
+    if cached is not None:
+        result = AnalyzeResponse.model_validate(cached)
+        result.video_metadata = _document_metadata(filename)
+        for stage in DOCUMENT_STAGES:
+            report(stage, STAGE_DONE)
+        return result, CACHE_HIT
+    
+    # Cache misses wait for an analysis slot
+    async with admission.admit() if admission is not None else nullcontext():
+        # Analyze the document
+        report("analysis", STAGE_RUNNING)
+        analyze = document_analyzer.analyze_document_fast if fast else document_analyzer.analyze_document
+        analysis_result = await analyze(
+            upload.stream, 
+            file_extension, 
+            filename or "document"
+        )
+        report("analysis", STAGE_DONE)
+    
+        # Create enhanced summary with key points
+        enhanced_summary = analysis_result["summary"]
+    
+        # Generate content recommendations based on document analysis
+        report("recommendations", STAGE_RUNNING)
+        if fast:
+            recommendations = _create_fallback_recommendation()
+        else:
+            recommendations = await generate_content_idea(
+                "document", 
+                analysis_result["summary"], 
+                "This document contains valuable insights that could be repurposed into engaging content."
+            )
+        report("recommendations", STAGE_DONE)
+    
+    # Create dummy metadata for document (required by response model)
+    dummy_metadata = _document_metadata(filename)
+    
+    # Calculate a basic viral score based on content quality
+    viral_score = _calculate_document_viral_score(analysis_result)
+    viral_label = _get_viral_label(viral_score)
+    
+    result = AnalyzeResponse(
+        video_metadata=dummy_metadata,
+        summary=analysis_result["summary"],
+        timeline_summary=[],  # Not applicable for documents
+        viral_score=viral_score,
+        viral_label=viral_label,
+        viral_explanation=_generate_viral_explanation(analysis_result),
+        recommendations=recommendations,
+        doc_summary=enhanced_summary
+    )
+    
+    # Fallback results are not cached so a Gemini outage is not pinned
+    if not document_analyzer.is_fallback_summary(enhanced_summary) and recommendations != _create_fallback_recommendation():
+        await document_analysis_cache.set("document", upload.sha256, result.model_dump(mode="json"))
+    return result, CACHE_MISS
+
 
+def _document_metadata(filename: str) -> VideoMetadata:
+    """Dummy metadata for a document (required by response model)."""
+    return VideoMetadata(
+        video_id="doc_analysis",
+        title=filename or "Document Analysis",
+        duration=0,
+        thumbnail_url="",
+        channel_name="Document Upload",
+        channel_id="",
+        view_count=0,
+        like_count=0,
+        comment_count=0,
+        subscriber_count=0,
+        published_at=None,
+        description=f"Analysis of {filename}"
+    )
 
 def _calculate_document_viral_score(analysis_result: dict) -> int:
     """Calculate a viral potential score for document content."""
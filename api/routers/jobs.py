@@ -0,0 +1,132 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from models.schemas import AnalyzeRequest
+from services.jobs import job_manager, JobQueueFullError
+from services.llm_scheduler import caller_scope, current_caller, PRIORITY_BATCH
+from services.video_pipeline import video_pipeline, has_fallback_output, PIPELINE_STAGES
+from services.response_cache import analyze_response_cache
+from routers.analyze import _analyze_cache_key
+from routers.analyze_document import analyze_uploaded_document, DOCUMENT_STAGES
+from utils import youtube
+from utils.uploads import ingest_upload, IngestedUpload, UploadTooLargeError
+import os
+import uuid
+import shutil
+import asyncio
+import logging
+from typing import Any, Callable, Dict
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# File yang diunggah disimpan di disk sampai job-nya selesai, agar job tetap bisa dijalankan setelah restart
+JOB_UPLOAD_DIR = os.path.join(job_manager.directory, "uploads")
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public representation of a job (without internal parameters)."""
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "status_url": f"/api/jobs/{job['id']}",
+    }
+
+async def _submit(kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    # Job dijalankan atas nama tenant yang mengirimnya, di kelas prioritas batch
+    params["tenant"] = current_caller().tenant
+    try:
+        job = await job_manager.submit(kind, params)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    logger.info(f"Queued {kind} job {job['id']}")
+    return _job_view(job)
+
+async def _run_analyze_job(params: Dict[str, Any], on_stage: Callable[[str, str], None]) -> Dict[str, Any]:
+    fields = params.get("fields")
+    fast = params.get("mode") == "fast"
+    with caller_scope(params.get("tenant"), PRIORITY_BATCH):
+        result = await video_pipeline.analyze(params["youtube_url"], params.get("average_view_duration"), on_stage, fields, fast)
+    response = result.model_dump(mode="json")
+    # Hasil lengkap job juga mengisi cache /api/analyze (kecuali yang memakai hasil cadangan)
+    if fields is None and not fast and not has_fallback_output(result):
+        await analyze_response_cache.set(_analyze_cache_key(params["video_id"], params.get("average_view_duration")), response)
+    return response
+
+async def _run_document_job(params: Dict[str, Any], on_stage: Callable[[str, str], None]) -> Dict[str, Any]:
+    stream = await asyncio.to_thread(open, params["upload_path"], "rb")
+    upload = IngestedUpload(stream=stream, size=params["size"], sha256=params["sha256"])
+    try:
+        with caller_scope(params.get("tenant"), PRIORITY_BATCH):
+            result, _ = await analyze_uploaded_document(upload, params["filename"], on_stage)
+    finally:
+        upload.cleanup()
+    return result.model_dump(mode="json")
+
+def _remove_job_upload(params: Dict[str, Any]) -> None:
+    try:
+        os.unlink(params["upload_path"])
+    except FileNotFoundError:
+        pass
+
+def _store_upload(upload: IngestedUpload, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    upload.stream.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.stream, f)
+
+job_manager.register("analyze", _run_analyze_job, PIPELINE_STAGES)
+job_manager.register("document", _run_document_job, DOCUMENT_STAGES, cleanup=_remove_job_upload)
+
+@router.post("/jobs", status_code=202)
+async def create_analyze_job(request: AnalyzeRequest):
+    """Menjadwalkan analisis YouTube di latar belakang dan langsung mengembalikan ID job."""
+    if not request.youtube_url:
+        raise HTTPException(status_code=400, detail="youtube_url must be provided")
+    video_id = youtube.extract_video_id(request.youtube_url)
+    if not video_id:
+        raise HTTPException(status_code=404, detail="Invalid YouTube URL or video not found.")
+    return await _submit("analyze", {
+        "youtube_url": request.youtube_url,
+        "video_id": video_id,
+        "average_view_duration": request.average_view_duration,
+        "fields": request.fields,
+        "mode": request.mode,
+    })
+
+@router.post("/jobs/document", status_code=202)
+async def create_document_job(file: UploadFile = File(...)):
+    """Menjadwalkan analisis dokumen di latar belakang dan langsung mengembalikan ID job."""
+    try:
+        upload = await ingest_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    upload_path = os.path.join(JOB_UPLOAD_DIR, uuid.uuid4().hex)
+    try:
+        await asyncio.to_thread(_store_upload, upload, upload_path)
+    finally:
+        upload.cleanup()
+
+    try:
+        return await _submit("document", {
+            "upload_path": upload_path,
+            "filename": file.filename,
+            "size": upload.size,
+            "sha256": upload.sha256,
+        })
+    except HTTPException:
+        await asyncio.to_thread(_remove_job_upload, {"upload_path": upload_path})
+        raise
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progres per tahap, dan hasil sebuah job."""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_view(job)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+from services.video_pipeline import video_pipeline
+from services.response_cache import analyze_response_cache
+from services.document_cache import document_analysis_cache
+from services.jobs import job_manager
+from services.admission import admission_controllers
+from services.gemini_utils import gemini_service, content_idea_stats
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Operational counters of the analysis pipeline."""
+    return {
+        "analyze": {
+            "in_flight": video_pipeline.single_flight.stats(),
+            "stages": video_pipeline.store.stats(),
+            "response_cache": analyze_response_cache.stats(),
+        },
+        "documents": {
+            "analysis_cache": document_analysis_cache.stats(),
+        },
+        "jobs": job_manager.stats(),
+        # Queue depth and rejections of the per-endpoint admission control
+        "admission": {name: controller.stats() for name, controller in admission_controllers.items()},
+        # Gemini slot usage and queue wait per tenant and priority class
+        "llm_scheduler": gemini_service.scheduler.stats(),
+        # Hedged Gemini calls per prompt type and how often the duplicate won
+        "llm_hedging": gemini_service.hedger.stats(),
+        # Model chosen per prompt type, and calls, latency and tokens per backend and model
+        "llm_routing": gemini_service.router.stats(),
+        # Output cap, latency and output-token distribution per generation profile
+        "llm_profiles": gemini_service.profiles.stats(),
+        # Input token budget per prompt type and how often a prompt had to be shortened to fit it
+        "llm_prompts": gemini_service.prompts.stats(),
+        # Content ideas parsed as-is, repaired, or discarded in favor of the fallback recommendation
+        "content_ideas": content_idea_stats(),
+    }
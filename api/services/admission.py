@@ -0,0 +1,148 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from utils.deadline import timeout_for
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request finds the wait queue full or waits longer than the queue timeout."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Too many concurrent {name} requests, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one endpoint.
+
+    Up to `max_concurrency` requests run at once and up to `max_queue` more
+    wait for a slot, each for at most `queue_timeout` seconds (or what is left
+    of the request deadline). Anything beyond that is rejected immediately, so
+    a burst sheds load instead of fanning out into unbounded upstream work.
+    The suggested Retry-After is derived from the average time a slot is held.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._avg_service_seconds = 5.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def would_reject(self) -> bool:
+        """True when a request arriving now would be rejected without waiting."""
+        return self._active >= self.max_concurrency and len(self._waiters) >= self.max_queue
+
+    def retry_after(self) -> int:
+        backlog = (len(self._waiters) + 1) / max(1, self.max_concurrency)
+        return max(1, min(60, math.ceil(self._avg_service_seconds * backlog)))
+
+    def _reject(self) -> AdmissionRejectedError:
+        self.rejected += 1
+        return AdmissionRejectedError(self.name, self.retry_after())
+
+    async def acquire(self) -> float:
+        """
+        Take a slot, waiting in the queue if necessary. Returns the time the
+        slot was granted, to be passed back to `release`.
+
+        Raises:
+            AdmissionRejectedError: The queue is full or the wait timed out.
+        """
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return time.monotonic()
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout_for(self.queue_timeout))
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot sudah diserahkan tepat saat menyerah: kembalikan ke antrean
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise self._reject() from None
+            raise
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, granted_at: Optional[float] = None) -> None:
+        if granted_at is not None:
+            self._avg_service_seconds += 0.2 * (time.monotonic() - granted_at - self._avg_service_seconds)
+        # Slot diserahkan langsung ke request tertua yang masih menunggu
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        granted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(granted_at)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_service_seconds": round(self._avg_service_seconds, 3),
+        }
+
+
+_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+
+# Satu pengendali per endpoint analisis; hasil cache dan endpoint murah tidak melewatinya
+analyze_admission = AdmissionController(
+    "analyze",
+    max_concurrency=int(os.getenv("ANALYZE_MAX_CONCURRENCY", "16")),
+    max_queue=int(os.getenv("ANALYZE_MAX_QUEUE", "32")),
+    queue_timeout=_QUEUE_TIMEOUT,
+)
+document_admission = AdmissionController(
+    "document analysis",
+    max_concurrency=int(os.getenv("DOCUMENT_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("DOCUMENT_MAX_QUEUE", "8")),
+    queue_timeout=_QUEUE_TIMEOUT,
+)
+document_batch_admission = AdmissionController(
+    "document batch",
+    max_concurrency=int(os.getenv("DOCUMENT_BATCH_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("DOCUMENT_BATCH_MAX_QUEUE", "4")),
+    queue_timeout=_QUEUE_TIMEOUT,
+)
+
+admission_controllers = {
+    "analyze": analyze_admission,
+    "analyze_document": document_admission,
+    "analyze_documents": document_batch_admission,
+}
@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(inputs: Dict[str, Any]) -> str:
+    """Build a stable SHA-256 fingerprint of a stage's inputs."""
+    payload = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StageRecord:
+    """Output of one pipeline stage together with the fingerprint of its inputs."""
+    fingerprint: str
+    output: Any
+
+
+class IncrementalAnalysisStore:
+    """
+    Remembers the output of each analysis stage per video so a re-analysis
+    only recomputes the stages whose inputs actually changed.
+    """
+
+    def __init__(self, max_videos: Optional[int] = None):
+        self.max_videos = max_videos or int(os.getenv("ANALYSIS_STORE_MAX_VIDEOS", "1000"))
+        self._records: "OrderedDict[str, Dict[str, StageRecord]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def run_stage(
+        self,
+        key: str,
+        stage: str,
+        inputs: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+        should_store: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Return the recorded output of `stage` when its inputs are unchanged,
+        otherwise run `compute` and record the new output.
+
+        Args:
+            key: Identifier of the analyzed item (e.g. the YouTube video ID)
+            stage: Stage name
+            inputs: Everything the stage output depends on
+            compute: Coroutine factory producing the stage output
+            should_store: Optional predicate; outputs it rejects (e.g. fallbacks) are not recorded
+        """
+        stage_fingerprint = fingerprint(inputs)
+        stages = self._records.get(key)
+        if stages is not None:
+            self._records.move_to_end(key)
+            record = stages.get(stage)
+            if record is not None and record.fingerprint == stage_fingerprint:
+                self.hits += 1
+                logger.info(f"Stage '{stage}' for {key} is up to date, reusing recorded output.")
+                return record.output
+
+        self.misses += 1
+        output = await compute()
+        if should_store is None or should_store(output):
+            self._store(key, stage, StageRecord(stage_fingerprint, output))
+        return output
+
+    def _store(self, key: str, stage: str, record: StageRecord) -> None:
+        stages = self._records.setdefault(key, {})
+        stages[stage] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_videos:
+            self._records.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        """Forget every recorded stage for `key`."""
+        self._records.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"videos": len(self._records), "stage_hits": self.hits, "stage_misses": self.misses}
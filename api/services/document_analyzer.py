@@ -1,16 +1,169 @@
 import os
+import asyncio
 import logging
 import tempfile
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import aclosing
+from itertools import islice
+import xml.etree.ElementTree as ET
+import zipfile
 from pathlib import Path
-import PyPDF2
 import docx
 import pptx
-from services.gemini_utils import gemini_service
+from utils.tokens import estimate_tokens, token_offset, truncate_to_tokens
+from services.gemini_utils import (
+    gemini_service, PROMPT_DOCUMENT_SUMMARY, PROMPT_DOCUMENT_SECTION_NOTES, PROMPT_DOCUMENT_STRENGTHS,
+    PROMPT_DOCUMENT_QUESTIONS, PROMPT_DOCUMENT_RECOMMENDATIONS, PROMPT_DOCUMENT_NUMERICAL,
+)
+from services.prompt_builder import PromptTemplate, PromptSection
+from services.pdf_extraction import pdf_engine
+from services.ooxml_extraction import iter_docx_chunks, iter_pptx_chunks, OoxmlExtractionError
+from services.document_sections import DocumentSection, split_sections
+from services.document_cache import document_analysis_cache, SECTION_SUMMARY_NAMESPACE
+from services.numeric_analysis import tokenize_numbers, numeric_statistics, numeric_digest
+from services.fast_analysis import extractive_summary
 import re
+import codecs
 
 logger = logging.getLogger(__name__)
 
+MAX_CHARS_PER_TOKEN = 6    # Upper bound of characters per estimated token, so extraction never stops short of the token budget
+TEXT_BLOCK_CHARS = 16384   # Block size when reading plain text files
+OOXML_BATCH_CHUNKS = 64    # Paragraphs/slides parsed per worker-thread hop
+
+_FALLBACK_SUMMARY_TAIL = "The document provides comprehensive information that could be valuable for understanding the subject matter."
+
+DOCUMENT_SUMMARY_PROMPT = PromptTemplate(PROMPT_DOCUMENT_SUMMARY, """
+Analyze the following document and provide a comprehensive summary.
+
+Document: {filename}
+Content: {content}
+
+Please provide a clear, well-structured summary that covers:
+- Main topics and objectives
+- Key findings or conclusions
+- Important information and insights
+- Overall purpose and scope
+
+Write in 4-6 sentences using professional, easy-to-understand language.
+
+Summary:
+""", (PromptSection("content"),))
+
+SECTION_NOTES_PROMPT = PromptTemplate(PROMPT_DOCUMENT_SECTION_NOTES, """
+Analyze the following section of a larger document. Only use information that is in the text.
+
+Section:
+{section_text}
+
+Respond in exactly this format:
+SUMMARY: [2-3 sentences with the key facts and conclusions]
+STRENGTHS:
+- [strength of this section, if any]
+WEAKNESSES:
+- [weakness or gap in this section, if any]
+FIGURES:
+- [important number, percentage or amount with what it measures, if any]
+
+Analysis:
+""", (PromptSection("section_text"),))
+
+STRENGTHS_WEAKNESSES_PROMPT = PromptTemplate(PROMPT_DOCUMENT_STRENGTHS, """
+Analyze the following document and identify its strengths and weaknesses.
+
+Document: {filename}
+Content: {content}
+
+Provide a balanced analysis covering:
+
+STRENGTHS (3-5 points):
+- What the document does well
+- Strong arguments or evidence
+- Clear explanations or structure
+- Valuable insights or information
+
+WEAKNESSES (3-5 points):
+- Areas that could be improved
+- Missing information or gaps
+- Unclear explanations
+- Potential biases or limitations
+
+Format your response as:
+STRENGTHS:
+1. [First strength]
+2. [Second strength]
+...
+
+WEAKNESSES:
+1. [First weakness]
+2. [Second weakness]
+...
+
+Analysis:
+""", (PromptSection("content"),))
+
+EXPLORATION_QUESTIONS_PROMPT = PromptTemplate(PROMPT_DOCUMENT_QUESTIONS, """
+Based on the following document content, generate 5-8 thought-provoking questions that would help readers explore the topic more deeply.
+
+Document: {filename}
+Content: {content}
+
+Create questions that:
+- Encourage critical thinking about the content
+- Explore implications and consequences
+- Challenge assumptions or conclusions
+- Suggest areas for further investigation
+- Connect to broader contexts or applications
+
+Format as a numbered list:
+1. [First question]
+2. [Second question]
+...
+
+Questions for deeper exploration:
+""", (PromptSection("content"),))
+
+RECOMMENDATIONS_PROMPT = PromptTemplate(PROMPT_DOCUMENT_RECOMMENDATIONS, """
+Based on the following document content, provide 5-7 actionable recommendations for improvement or next steps.
+
+Document: {filename}
+Content: {content}
+
+Provide recommendations that address:
+- How to improve the document or its implementation
+- Next steps or actions to take
+- Areas for further development
+- Practical applications of the content
+- Ways to enhance effectiveness
+
+Format as a numbered list:
+1. [First recommendation]
+2. [Second recommendation]
+...
+
+Recommendations for improvement and next actions:
+""", (PromptSection("content"),))
+
+NUMERICAL_ANALYSIS_PROMPT = PromptTemplate(PROMPT_DOCUMENT_NUMERICAL, """
+Interpret the numerical data of the following document. The statistics were computed over the whole document.
+
+Document: {filename}
+Statistics:
+{statistics}
+Sample percentages: {percentages}
+Sample currency values: {currencies}
+{figure_notes}
+Provide analysis including:
+- Key numerical findings
+- Trends or patterns in the data
+- Significant statistics or metrics
+- Data-driven insights
+
+If there's substantial numerical data, provide a brief analysis. If minimal data, note what's present.
+
+Numerical Analysis:
+""", (PromptSection("figure_notes"),))
+
 class DocumentAnalyzer:
     """
     Service for analyzing documents and extracting comprehensive insights.
@@ -18,28 +171,41 @@ class DocumentAnalyzer:
     """
     
     def __init__(self):
-        self.max_content_length = 8000  # Limit content length for API calls
         self.min_content_length = 50    # Minimum content length for analysis
+        # Token limit of the document text sent to the API calls; extraction stops once it is reached
+        self.max_content_tokens = int(os.getenv("DOCUMENT_MAX_CONTENT_TOKENS", "2000"))
+        # Streaming XML extraction for .docx/.pptx instead of full python-docx/python-pptx object models
+        self.fast_ooxml_extraction = os.getenv("DOCUMENT_FAST_OOXML", "1") != "0"
+        # Dokumen panjang dianalisis per bagian lalu digabung; hasil bagian yang tidak berubah diambil dari cache
+        self.hierarchical_analysis = os.getenv("DOCUMENT_HIERARCHICAL", "1") != "0"
+        self.max_document_length = int(os.getenv("DOCUMENT_MAX_CHARS", "500000"))
+        self.max_parallelism = int(os.getenv("DOCUMENT_MAX_PARALLELISM", "4"))
+        # Input token budget per request for the per-section calls; cached sections are free
+        self.request_token_budget = int(os.getenv("DOCUMENT_TOKEN_BUDGET", "100000"))
     
-    async def analyze_document(self, file_path: str, file_extension: str, filename: str) -> Dict:
+    async def analyze_document(self, source: Union[str, BinaryIO], file_extension: str, filename: str) -> Dict:
         """
         Main method to analyze a document comprehensively.
         
         Args:
-            file_path: Path to the uploaded file
-            file_extension: File extension (.pdf, .docx, etc.)
+            source: Path to the uploaded file or a binary file-like object with its bytes
+            file_extension: Document format (.pdf, .docx, etc.)
             filename: Original filename
             
         Returns:
             Dictionary containing comprehensive analysis
         """
         try:
-            # Extract text content from document
-            content = await self._extract_text_content(file_path, file_extension)
+            # Extract text content from document (in full when long documents are analyzed hierarchically)
+            char_budget = self.max_document_length if self.hierarchical_analysis else None
+            content = await self._extract_text_content(source, file_extension, char_budget)
             
             if not content or len(content.strip()) < self.min_content_length:
                 raise ValueError("Document content is too short or empty for analysis")
             
+            if self.hierarchical_analysis and self._exceeds_content_budget(self._normalize_text(content)):
+                return await self._analyze_hierarchically(content, filename)
+            
             # Clean and prepare content
             cleaned_content = self._clean_content(content)
             
@@ -48,7 +214,7 @@ class DocumentAnalyzer:
             strengths_weaknesses = await self._analyze_strengths_weaknesses(cleaned_content, filename)
             questions = await self._generate_exploration_questions(cleaned_content, filename)
             recommendations = await self._generate_recommendations(cleaned_content, filename)
-            numerical_analysis = await self._analyze_numerical_data(cleaned_content, filename)
+            numerical_analysis = await self._analyze_numerical_data(self._normalize_text(content), filename)
             
             # Analyze document structure and type
             doc_info = self._analyze_document_structure(cleaned_content, filename)
@@ -68,113 +234,238 @@ class DocumentAnalyzer:
             logger.error(f"Error analyzing document: {str(e)}")
             raise Exception(f"Failed to analyze document: {str(e)}")
     
-    async def _extract_text_content(self, file_path: str, file_extension: str) -> str:
-        """Extract text content from various document formats."""
-        content = ""
+    async def analyze_document_fast(self, source: Union[str, BinaryIO], file_extension: str, filename: str) -> Dict:
+        """
+        Local-only variant of `analyze_document` without any Gemini call: an
+        extractive summary, the fallback lists and the locally computed
+        numerical statistics. Only the first content budget of the document is
+        extracted. Returns a dictionary with the same keys.
+        """
+        try:
+            content = await self._extract_text_content(source, file_extension)
+            
+            if not content or len(content.strip()) < self.min_content_length:
+                raise ValueError("Document content is too short or empty for analysis")
+            
+            cleaned_content = self._clean_content(content)
+            summary = extractive_summary(cleaned_content)
+            summary = f"{summary} {_FALLBACK_SUMMARY_TAIL}" if summary else self._generate_fallback_summary(cleaned_content, filename)
+            
+            return {
+                "summary": summary,
+                "strengths_weaknesses": self._generate_fallback_strengths_weaknesses(),
+                "exploration_questions": self._generate_fallback_questions(),
+                "recommendations": self._generate_fallback_recommendations(),
+                "numerical_analysis": await self._analyze_numerical_data(self._normalize_text(content), filename, interpret=False),
+                "document_info": self._analyze_document_structure(cleaned_content, filename),
+                "word_count": len(cleaned_content.split()),
+                "content_preview": cleaned_content[:200] + "..." if len(cleaned_content) > 200 else cleaned_content
+            }
+            
+        except Exception as e:
+            logger.error(f"Error analyzing document: {str(e)}")
+            raise Exception(f"Failed to analyze document: {str(e)}")
+    
+    async def _extract_text_content(self, source: Union[str, BinaryIO], file_extension: str,
+                                    char_budget: Optional[int] = None) -> str:
+        """
+        Extract text content from various document formats.
         
+        Parsing stops as soon as the cleaned text reaches `char_budget`
+        characters (defaults to the content limit used for the API calls),
+        so the parts of large documents that would be truncated anyway are
+        never parsed. A budget of 0 disables the limit.
+        """
+        if char_budget is None:
+            char_budget = self._extraction_char_budget()
+        
+        parts: List[str] = []
+        collected = 0
         try:
-            if file_extension == '.txt':
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    
-            elif file_extension == '.pdf':
-                content = await self._extract_pdf_content(file_path)
-                
-            elif file_extension in ['.doc', '.docx']:
-                content = await self._extract_word_content(file_path)
-                
-            elif file_extension in ['.ppt', '.pptx']:
-                content = await self._extract_powerpoint_content(file_path)
-                
-            else:
-                raise ValueError(f"Unsupported file format: {file_extension}")
-                
-            return content.strip()
+            async with aclosing(self._iter_content_chunks(source, file_extension)) as chunks:
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    collected += len(self._normalize_text(chunk))
+                    # Lewati batas sedikit agar _clean_content bisa memotong di akhir kalimat
+                    if char_budget and collected > char_budget:
+                        break
+            
+            return "".join(parts).strip()
             
         except Exception as e:
             logger.error(f"Error extracting content from {file_extension}: {str(e)}")
             raise Exception(f"Failed to extract content from document: {str(e)}")
     
-    async def _extract_pdf_content(self, file_path: str) -> str:
-        """Extract text from PDF files."""
-        content = ""
+    def _extraction_char_budget(self) -> int:
+        """Character budget for extraction, large enough to hold the content token limit."""
+        return self.max_content_tokens * MAX_CHARS_PER_TOKEN
+    
+    def _exceeds_content_budget(self, content: str) -> bool:
+        """True when the text is over the content token limit; only its start is counted."""
+        return token_offset(content, self.max_content_tokens) < len(content)
+    
+    def _iter_content_chunks(self, source: Union[str, BinaryIO], file_extension: str) -> AsyncIterator[str]:
+        """Return an async generator of text chunks (pages, slides, paragraphs) in document order."""
+        if file_extension == '.txt':
+            return self._iter_text_chunks(source)
+        elif file_extension == '.pdf':
+            return self._iter_pdf_chunks(source)
+        elif file_extension in ['.doc', '.docx']:
+            return self._iter_word_chunks(source)
+        elif file_extension in ['.ppt', '.pptx']:
+            return self._iter_powerpoint_chunks(source)
+        raise ValueError(f"Unsupported file format: {file_extension}")
+    
+    async def _iter_text_chunks(self, source: Union[str, BinaryIO]) -> AsyncIterator[str]:
+        """Yield plain text files in blocks."""
+        if isinstance(source, str):
+            with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+                while True:
+                    block = f.read(TEXT_BLOCK_CHARS)
+                    if not block:
+                        return
+                    yield block
+        else:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+            source.seek(0)
+            while True:
+                block = source.read(TEXT_BLOCK_CHARS)
+                if not block:
+                    break
+                yield decoder.decode(block)
+            yield decoder.decode(b"", final=True)
+    
+    async def _iter_pdf_chunks(self, source: Union[str, BinaryIO]) -> AsyncIterator[str]:
+        """Yield PDF pages."""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            content += f"\n--- Page {page_num + 1} ---\n"
-                            content += page_text
-                    except Exception as e:
-                        logger.warning(f"Could not extract text from page {page_num + 1}: {str(e)}")
-                        continue
-                        
-            return content
+            pdf_bytes = await asyncio.to_thread(self._read_source_bytes, source)
+            
+            # Halaman diekstrak paralel di process pool, hasilnya tetap berurutan.
+            # Menutup iterator lebih awal membatalkan batch yang belum berjalan.
+            async with aclosing(pdf_engine.iter_pages(pdf_bytes)) as pages:
+                async for page_index, page_text in pages:
+                    if page_text:
+                        yield f"\n--- Page {page_index + 1} ---\n{page_text}"
             
         except Exception as e:
             raise Exception(f"Error reading PDF file: {str(e)}")
     
-    async def _extract_word_content(self, file_path: str) -> str:
-        """Extract text from Word documents."""
-        content = ""
+    @staticmethod
+    def _read_source_bytes(source: Union[str, BinaryIO]) -> bytes:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                return f.read()
+        source.seek(0)
+        return source.read()
+    
+    @staticmethod
+    def _table_rows(table) -> Iterator[str]:
+        for row in table.rows:
+            row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if row_text:
+                yield " | ".join(row_text) + "\n"
+    
+    def _iter_word_chunks(self, source: Union[str, BinaryIO]) -> AsyncIterator[str]:
+        """Return an async generator of Word paragraphs followed by table rows."""
+        if not self.fast_ooxml_extraction:
+            return self._iter_word_chunks_with_library(source)
+        return self._iter_ooxml_chunks(source, iter_docx_chunks, self._iter_word_chunks_with_library)
+    
+    def _iter_powerpoint_chunks(self, source: Union[str, BinaryIO]) -> AsyncIterator[str]:
+        """Return an async generator of PowerPoint slides."""
+        if not self.fast_ooxml_extraction:
+            return self._iter_powerpoint_chunks_with_library(source)
+        return self._iter_ooxml_chunks(source, iter_pptx_chunks, self._iter_powerpoint_chunks_with_library)
+    
+    async def _iter_ooxml_chunks(
+        self,
+        source: Union[str, BinaryIO],
+        fast_iter: Callable[[BinaryIO], Iterator[str]],
+        fallback_iter: Callable[[BinaryIO], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """
+        Stream .docx/.pptx text straight out of the zip with the lightweight XML
+        extractor, parsing in a worker thread batch by batch. Files it cannot
+        handle fall back to python-docx / python-pptx.
+        """
+        stream = open(source, 'rb') if isinstance(source, str) else source
+        chunks = fast_iter(stream)
+        yielded = False
+        pending: Optional["asyncio.Future[List[str]]"] = None
         try:
-            doc = docx.Document(file_path)
+            while True:
+                pending = asyncio.ensure_future(asyncio.to_thread(lambda: list(islice(chunks, OOXML_BATCH_CHUNKS))))
+                # Dilindungi agar pembatalan tidak melepas thread yang masih menjalankan generator
+                batch = await asyncio.shield(pending)
+                if not batch:
+                    break
+                for chunk in batch:
+                    yielded = True
+                    yield chunk
+        except (OoxmlExtractionError, ET.ParseError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            if yielded:
+                raise
+            logger.info(f"Streaming OOXML extraction declined the file ({e}), falling back to the full parser")
+        finally:
+            if pending is not None and not pending.done():
+                # Dibatalkan saat batch masih diproses: generator baru boleh ditutup setelah thread selesai
+                await asyncio.wait({pending})
+                if not pending.cancelled():
+                    pending.exception()
+            chunks.close()
+        
+        try:
+            if not yielded:
+                stream.seek(0)
+                async with aclosing(fallback_iter(stream)) as fallback_chunks:
+                    async for chunk in fallback_chunks:
+                        yield chunk
+        finally:
+            if isinstance(source, str):
+                stream.close()
+    
+    async def _iter_word_chunks_with_library(self, source: Union[str, BinaryIO]) -> AsyncIterator[str]:
+        """Yield Word paragraphs followed by table rows using python-docx."""
+        try:
+            doc = await asyncio.to_thread(docx.Document, source)
             
             # Extract paragraphs
             for paragraph in doc.paragraphs:
                 if paragraph.text.strip():
-                    content += paragraph.text + "\n"
+                    yield paragraph.text + "\n"
             
             # Extract tables
             for table in doc.tables:
-                content += "\n--- Table Content ---\n"
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        content += " | ".join(row_text) + "\n"
-            
-            return content
+                yield "\n--- Table Content ---\n"
+                for row_text in self._table_rows(table):
+                    yield row_text
             
         except Exception as e:
             raise Exception(f"Error reading Word document: {str(e)}")
     
-    async def _extract_powerpoint_content(self, file_path: str) -> str:
-        """Extract text from PowerPoint presentations."""
-        content = ""
+    async def _iter_powerpoint_chunks_with_library(self, source: Union[str, BinaryIO]) -> AsyncIterator[str]:
+        """Yield PowerPoint slides using python-pptx."""
         try:
-            presentation = pptx.Presentation(file_path)
+            presentation = await asyncio.to_thread(pptx.Presentation, source)
             
             for slide_num, slide in enumerate(presentation.slides, 1):
-                content += f"\n--- Slide {slide_num} ---\n"
+                slide_parts = [f"\n--- Slide {slide_num} ---\n"]
                 
                 for shape in slide.shapes:
                     if hasattr(shape, "text") and shape.text.strip():
-                        content += shape.text + "\n"
+                        slide_parts.append(shape.text + "\n")
                     
                     # Extract text from tables in slides
                     if shape.has_table:
-                        table = shape.table
-                        for row in table.rows:
-                            row_text = []
-                            for cell in row.cells:
-                                if cell.text.strip():
-                                    row_text.append(cell.text.strip())
-                            if row_text:
-                                content += " | ".join(row_text) + "\n"
-            
-            return content
+                        slide_parts.extend(self._table_rows(shape.table))
+                
+                yield "".join(slide_parts)
             
         except Exception as e:
             raise Exception(f"Error reading PowerPoint file: {str(e)}")
     
-    def _clean_content(self, content: str) -> str:
-        """Clean and normalize extracted content."""
+    def _normalize_text(self, content: str) -> str:
+        """Collapse whitespace and strip extraction markers."""
         # Remove excessive whitespace
         content = re.sub(r'\n\s*\n', '\n\n', content)
         content = re.sub(r' +', ' ', content)
@@ -183,77 +474,132 @@ class DocumentAnalyzer:
         content = re.sub(r'--- Page \d+ ---', '', content)
         content = re.sub(r'--- Slide \d+ ---', '\n\n', content)
         content = re.sub(r'--- Table Content ---', '\n', content)
+        return content
+    
+    def _clean_content(self, content: str) -> str:
+        """Clean and normalize extracted content."""
+        content = self._normalize_text(content)
         
         # Limit content length for API processing
-        if len(content) > self.max_content_length:
-            content = content[:self.max_content_length] + "..."
-        
-        return content.strip()
+        return truncate_to_tokens(content, self.max_content_tokens).strip()
     
     async def _generate_summary(self, content: str, filename: str) -> str:
         """Generate a comprehensive summary of the document."""
-        prompt = f"""
-Analyze the following document and provide a comprehensive summary.
-
-Document: {filename}
-Content: {content}
-
-Please provide a clear, well-structured summary that covers:
-- Main topics and objectives
-- Key findings or conclusions
-- Important information and insights
-- Overall purpose and scope
-
-Write in 4-6 sentences using professional, easy-to-understand language.
-
-Summary:
-"""
+        prompt = gemini_service.prompts.build(DOCUMENT_SUMMARY_PROMPT, filename=filename, content=content)
         
         try:
-            summary = await gemini_service._generate_content(prompt)
+            summary = await gemini_service._generate_content(prompt, prompt_type=PROMPT_DOCUMENT_SUMMARY)
             return summary.strip()
         except Exception as e:
             logger.error(f"Error generating summary: {str(e)}")
             return self._generate_fallback_summary(content, filename)
     
+    async def _analyze_hierarchically(self, content: str, filename: str) -> Dict:
+        """
+        Analyze a document that exceeds the content limit in full.
+        
+        The text is split into structure-aware sections (pages, slides,
+        headings). Each section is reduced to short notes (summary, strengths,
+        weaknesses, key figures) concurrently, then a merge pass runs the
+        regular analyses over the combined notes. Section notes are cached by
+        the hash of the section text, so a revised upload only re-analyzes the
+        sections that actually changed.
+        """
+        sections = split_sections(content)
+        notes = await self._collect_section_notes(sections)
+        logger.info(f"Analyzed {filename} hierarchically from {len(sections)} sections")
+        
+        overview = "\n\n".join(f"[{section.label}] {note['summary']}" for section, note in zip(sections, notes))
+        findings = "\n".join(
+            [overview, "", "Strengths noted in sections:"]
+            + [f"- {item}" for note in notes for item in note["strengths"]]
+            + ["", "Weaknesses noted in sections:"]
+            + [f"- {item}" for note in notes for item in note["weaknesses"]]
+        )
+        figures = "\n".join(
+            f"[{section.label}] {item}" for section, note in zip(sections, notes) for item in note["figures"]
+        )
+        
+        # Masukan yang terlalu panjang dipotong oleh prompt builder sesuai anggaran tiap prompt
+        full_content = self._normalize_text(content).strip()
+        summary, strengths_weaknesses, questions, recommendations, numerical_analysis = await asyncio.gather(
+            self._generate_summary(overview, filename),
+            self._analyze_strengths_weaknesses(findings, filename),
+            self._generate_exploration_questions(overview, filename),
+            self._generate_recommendations(overview, filename),
+            self._analyze_numerical_data(full_content, filename, figures),
+        )
+        
+        return {
+            "summary": summary,
+            "strengths_weaknesses": strengths_weaknesses,
+            "exploration_questions": questions,
+            "recommendations": recommendations,
+            "numerical_analysis": numerical_analysis,
+            "document_info": self._analyze_document_structure(full_content, filename),
+            "word_count": len(full_content.split()),
+            "content_preview": full_content[:200] + "..." if len(full_content) > 200 else full_content,
+            "section_count": len(sections)
+        }
+    
+    async def _collect_section_notes(self, sections: List[DocumentSection]) -> List[Dict]:
+        """
+        Notes for every section, from the cache where possible. At most
+        `max_parallelism` sections are analyzed at once, and when the uncached
+        sections exceed the request token budget each one is shortened
+        proportionally, so the whole document is still covered. Notes made
+        from shortened text are not cached, since the cache key is the digest
+        of the full section.
+        """
+        cached = await asyncio.gather(
+            *(document_analysis_cache.get(SECTION_SUMMARY_NAMESPACE, section.digest) for section in sections)
+        )
+        texts = {
+            index: self._normalize_text(section.text).strip()
+            for index, section in enumerate(sections) if cached[index] is None
+        }
+        tokens = {index: estimate_tokens(text) for index, text in texts.items()}
+        uncached_tokens = sum(tokens.values())
+        shortened = set()
+        if uncached_tokens > self.request_token_budget:
+            ratio = self.request_token_budget / uncached_tokens
+            logger.info(f"Section text ({uncached_tokens} tokens) exceeds the request budget, shortening sections to {ratio:.0%}")
+            for index, text in texts.items():
+                texts[index] = truncate_to_tokens(text, max(50, int(tokens[index] * ratio)))
+                if texts[index] != text:
+                    shortened.add(index)
+        
+        semaphore = asyncio.Semaphore(self.max_parallelism)
+        
+        async def analyze(index: int, section_text: str) -> Dict:
+            async with semaphore:
+                try:
+                    note = await self._generate_section_notes(section_text)
+                except Exception as e:
+                    # Potongan awal bagian dipakai sebagai pengganti dan tidak disimpan di cache
+                    logger.error(f"Error analyzing section '{sections[index].label}': {str(e)}")
+                    return {"summary": section_text[:300], "strengths": [], "weaknesses": [], "figures": []}
+            # Catatan dari teks yang dipendekkan tidak mewakili seluruh bagian: tidak disimpan di cache
+            if index not in shortened:
+                await document_analysis_cache.set(SECTION_SUMMARY_NAMESPACE, sections[index].digest, note)
+            return note
+        
+        fresh = await asyncio.gather(*(analyze(index, text) for index, text in texts.items()))
+        fresh_notes = dict(zip(texts.keys(), fresh))
+        return [cached[index] if cached[index] is not None else fresh_notes[index] for index in range(len(sections))]
+    
+    async def _generate_section_notes(self, section_text: str) -> Dict:
+        """Analyze a single section. The prompt only depends on the section text so the result can be reused."""
+        prompt = gemini_service.prompts.build(SECTION_NOTES_PROMPT, section_text=section_text)
+        response = await gemini_service._generate_content(prompt, prompt_type=PROMPT_DOCUMENT_SECTION_NOTES)
+        return self._parse_section_notes(response)
+    
     async def _analyze_strengths_weaknesses(self, content: str, filename: str) -> Dict[str, List[str]]:
         """Analyze strengths and weaknesses of the document."""
-        prompt = f"""
-Analyze the following document and identify its strengths and weaknesses.
-
-Document: {filename}
-Content: {content}
-
-Provide a balanced analysis covering:
-
-STRENGTHS (3-5 points):
-- What the document does well
-- Strong arguments or evidence
-- Clear explanations or structure
-- Valuable insights or information
-
-WEAKNESSES (3-5 points):
-- Areas that could be improved
-- Missing information or gaps
-- Unclear explanations
-- Potential biases or limitations
-
-Format your response as:
-STRENGTHS:
-1. [First strength]
-2. [Second strength]
-...
-
-WEAKNESSES:
-1. [First weakness]
-2. [Second weakness]
-...
-
-Analysis:
-"""
+        prompt = gemini_service.prompts.build(STRENGTHS_WEAKNESSES_PROMPT, filename=filename, content=content)
         
         try:
-            response = await gemini_service._generate_content(prompt)
+            response = await gemini_service._generate_content(prompt, prompt_type=PROMPT_DOCUMENT_STRENGTHS)
             return self._parse_strengths_weaknesses(response)
         except Exception as e:
             logger.error(f"Error analyzing strengths/weaknesses: {str(e)}")
@@ -261,29 +607,10 @@ Analysis:
     
     async def _generate_exploration_questions(self, content: str, filename: str) -> List[str]:
         """Generate questions to aid in-depth exploration of the document."""
-        prompt = f"""
-Based on the following document content, generate 5-8 thought-provoking questions that would help readers explore the topic more deeply.
-
-Document: {filename}
-Content: {content}
-
-Create questions that:
-- Encourage critical thinking about the content
-- Explore implications and consequences
-- Challenge assumptions or conclusions
-- Suggest areas for further investigation
-- Connect to broader contexts or applications
-
-Format as a numbered list:
-1. [First question]
-2. [Second question]
-...
-
-Questions for deeper exploration:
-"""
+        prompt = gemini_service.prompts.build(EXPLORATION_QUESTIONS_PROMPT, filename=filename, content=content)
         
         try:
-            response = await gemini_service._generate_content(prompt)
+            response = await gemini_service._generate_content(prompt, prompt_type=PROMPT_DOCUMENT_QUESTIONS)
             return self._parse_questions(response)
         except Exception as e:
             logger.error(f"Error generating exploration questions: {str(e)}")
@@ -291,42 +618,29 @@ Questions for deeper exploration:
     
     async def _generate_recommendations(self, content: str, filename: str) -> List[str]:
         """Generate recommendations for improvement or next actions."""
-        prompt = f"""
-Based on the following document content, provide 5-7 actionable recommendations for improvement or next steps.
-
-Document: {filename}
-Content: {content}
-
-Provide recommendations that address:
-- How to improve the document or its implementation
-- Next steps or actions to take
-- Areas for further development
-- Practical applications of the content
-- Ways to enhance effectiveness
-
-Format as a numbered list:
-1. [First recommendation]
-2. [Second recommendation]
-...
-
-Recommendations for improvement and next actions:
-"""
+        prompt = gemini_service.prompts.build(RECOMMENDATIONS_PROMPT, filename=filename, content=content)
         
         try:
-            response = await gemini_service._generate_content(prompt)
+            response = await gemini_service._generate_content(prompt, prompt_type=PROMPT_DOCUMENT_RECOMMENDATIONS)
             return self._parse_recommendations(response)
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             return self._generate_fallback_recommendations()
     
-    async def _analyze_numerical_data(self, content: str, filename: str) -> Dict:
-        """Analyze numerical data and statistics in the document."""
-        # Extract numbers and potential data patterns
-        numbers = re.findall(r'\b\d+(?:\.\d+)?(?:%|\$|€|£)?\b', content)
-        percentages = re.findall(r'\b\d+(?:\.\d+)?%\b', content)
-        currencies = re.findall(r'[\$€£]\d+(?:\.\d+)?(?:k|K|m|M|b|B)?\b', content)
+    async def _analyze_numerical_data(self, content: str, filename: str, notes: Optional[str] = None,
+                                      interpret: bool = True) -> Dict:
+        """
+        Analyze numerical data and statistics in the document.
+        
+        Numeric tokens are classified in a single pass and their statistics,
+        outliers and trends are computed locally over the whole text; Gemini
+        only interprets a compact digest of them (plus the per-section figure
+        notes in hierarchical mode). Without `interpret`, only the local
+        statistics are returned.
+        """
+        tokens = await asyncio.to_thread(tokenize_numbers, content)
         
-        if not numbers and not percentages and not currencies:
+        if not tokens.total:
             return {
                 "has_numerical_data": False,
                 "summary": "No significant numerical data found in the document.",
@@ -334,59 +648,49 @@ Recommendations for improvement and next actions:
                 "insights": []
             }
         
-        prompt = f"""
-Analyze the numerical data in the following document and provide insights.
-
-Document: {filename}
-Content: {content}
-
-Found numbers: {numbers[:20]}  # Limit to first 20 numbers
-Found percentages: {percentages[:10]}
-Found currency values: {currencies[:10]}
-
-Provide analysis including:
-- Key numerical findings
-- Trends or patterns in the data
-- Significant statistics or metrics
-- Data-driven insights
-
-If there's substantial numerical data, provide a brief analysis. If minimal data, note what's present.
-
-Numerical Analysis:
-"""
+        statistics = await asyncio.to_thread(numeric_statistics, tokens)
+        key_figures = {
+            "numbers_found": tokens.total,
+            "percentages": tokens.percent_text[:5],
+            "currencies": tokens.currency_text[:5],
+            "statistics": statistics
+        }
+        
+        if not (tokens.total > 5 or tokens.percent.size > 2 or tokens.currency.size > 2):
+            return {
+                "has_numerical_data": True,
+                "summary": f"Limited numerical data found: {tokens.total} numbers, {tokens.percent.size} percentages, {tokens.currency.size} currency values.",
+                "key_figures": key_figures,
+                "insights": ["Document contains minimal numerical data for comprehensive analysis."]
+            }
+        
+        local_analysis = {
+            "has_numerical_data": True,
+            "summary": f"Found {tokens.total} numbers, {tokens.percent.size} percentages and {tokens.currency.size} currency values.",
+            "key_figures": key_figures,
+            "insights": numeric_digest(statistics).replace("- ", "").split("\n")
+        }
+        if not interpret:
+            return local_analysis
+        
+        figure_notes = f"\nNotes on key figures:\n{notes}\n" if notes else ""
+        prompt = gemini_service.prompts.build(
+            NUMERICAL_ANALYSIS_PROMPT, filename=filename, statistics=numeric_digest(statistics),
+            percentages=', '.join(tokens.percent_text[:10]) or 'none',
+            currencies=', '.join(tokens.currency_text[:10]) or 'none', figure_notes=figure_notes,
+        )
         
         try:
-            if len(numbers) > 5 or len(percentages) > 2 or len(currencies) > 2:
-                response = await gemini_service._generate_content(prompt)
-                return {
-                    "has_numerical_data": True,
-                    "summary": response.strip(),
-                    "key_figures": {
-                        "numbers_found": len(numbers),
-                        "percentages": percentages[:5],
-                        "currencies": currencies[:5]
-                    },
-                    "insights": self._extract_numerical_insights(response)
-                }
-            else:
-                return {
-                    "has_numerical_data": True,
-                    "summary": f"Limited numerical data found: {len(numbers)} numbers, {len(percentages)} percentages, {len(currencies)} currency values.",
-                    "key_figures": {
-                        "numbers_found": len(numbers),
-                        "percentages": percentages,
-                        "currencies": currencies
-                    },
-                    "insights": ["Document contains minimal numerical data for comprehensive analysis."]
-                }
-        except Exception as e:
-            logger.error(f"Error analyzing numerical data: {str(e)}")
+            response = await gemini_service._generate_content(prompt, prompt_type=PROMPT_DOCUMENT_NUMERICAL)
             return {
-                "has_numerical_data": False,
-                "summary": "Unable to analyze numerical data.",
-                "key_figures": [],
-                "insights": []
+                "has_numerical_data": True,
+                "summary": response.strip(),
+                "key_figures": key_figures,
+                "insights": self._extract_numerical_insights(response)
             }
+        except Exception as e:
+            logger.error(f"Error analyzing numerical data: {str(e)}")
+            return local_analysis
     
     def _parse_strengths_weaknesses(self, response: str) -> Dict[str, List[str]]:
         """Parse AI response to extract strengths and weaknesses."""
@@ -461,6 +765,34 @@ Numerical Analysis:
         
         return insights
     
+    def _parse_section_notes(self, response: str) -> Dict:
+        """Parse the SUMMARY/STRENGTHS/WEAKNESSES/FIGURES notes of a section."""
+        notes = {"summary": "", "strengths": [], "weaknesses": [], "figures": []}
+        current_section = None
+        
+        for line in response.split('\n'):
+            line = line.strip()
+            upper = line.upper()
+            if upper.startswith('SUMMARY:'):
+                notes["summary"] = line[len('SUMMARY:'):].strip()
+                current_section = "summary"
+            elif upper.startswith('STRENGTHS'):
+                current_section = "strengths"
+            elif upper.startswith('WEAKNESSES'):
+                current_section = "weaknesses"
+            elif upper.startswith('FIGURES'):
+                current_section = "figures"
+            elif line and current_section == "summary":
+                notes["summary"] = f"{notes['summary']} {line}".strip()
+            elif line and current_section and line.startswith(('-', '*', '•')):
+                item = line.lstrip('-*• ').strip()
+                if item and not item.lower().startswith(('none', 'n/a', '[')):
+                    notes[current_section].append(item)
+        
+        if not notes["summary"]:
+            notes["summary"] = response.strip()[:500]
+        return notes
+    
     def _analyze_document_structure(self, content: str, filename: str) -> Dict:
         """Analyze document structure and determine document type."""
         word_count = len(content.split())
@@ -497,7 +829,12 @@ Numerical Analysis:
         if not summary_text:
             summary_text = f"This document contains {word_count} words of content covering various topics and information"
         
-        return f"{summary_text}. The document provides comprehensive information that could be valuable for understanding the subject matter."
+        return f"{summary_text}. {_FALLBACK_SUMMARY_TAIL}"
+    
+    @staticmethod
+    def is_fallback_summary(summary: str) -> bool:
+        """Check whether a summary came from the local fallback instead of Gemini."""
+        return summary.endswith(_FALLBACK_SUMMARY_TAIL)
     
     def _generate_fallback_strengths_weaknesses(self) -> Dict[str, List[str]]:
         """Generate fallback strengths and weaknesses."""
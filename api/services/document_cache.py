@@ -0,0 +1,70 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from utils.disk_store import JsonDiskStore
+
+logger = logging.getLogger(__name__)
+
+# Naikkan setiap kali ekstraksi, prompt, atau bentuk respons dokumen berubah,
+# agar hasil lama di cache tidak lagi dipakai
+DOCUMENT_ANALYZER_VERSION = "5"
+
+# Handler dokumen yang menyimpan hasil lengkapnya di cache ini
+DOCUMENT_CACHE_NAMESPACES = ("analyze", "document")
+# Catatan analisis per bagian dokumen, dikunci dengan hash teks bagian tersebut
+SECTION_SUMMARY_NAMESPACE = "section"
+
+
+class DocumentAnalysisCache:
+    """
+    Persistent cache of finished document analyses, keyed by the SHA-256 of
+    the uploaded bytes and the analyzer version. A duplicate upload returns
+    the stored response without extraction or Gemini calls. Per-section
+    analysis notes share the store under their own namespace, keyed by the hash
+    of the section text. Entries live on disk with size-bounded LRU
+    eviction, so they survive restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, version: str = DOCUMENT_ANALYZER_VERSION):
+        self.version = version
+        self.disk = JsonDiskStore(directory, max_bytes)
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _key(self, namespace: str, content_sha256: str) -> str:
+        return f"{namespace}:{self.version}:{content_sha256.lower()}"
+
+    async def get(self, namespace: str, content_sha256: str) -> Optional[Dict[str, Any]]:
+        value = await asyncio.to_thread(self.disk.get, self._key(namespace, content_sha256))
+        counters = self.misses if value is None else self.hits
+        counters[namespace] = counters.get(namespace, 0) + 1
+        return value
+
+    async def set(self, namespace: str, content_sha256: str, value: Dict[str, Any]) -> None:
+        try:
+            await asyncio.to_thread(self.disk.put, self._key(namespace, content_sha256), value)
+        except Exception as e:
+            # Cache bersifat opsional; kegagalan menulis tidak boleh menggagalkan request
+            logger.warning(f"Failed to store {namespace} cache entry {content_sha256}: {e}")
+
+    async def invalidate(self, content_sha256: str) -> int:
+        """Drop every cached analysis of a document; returns the number of entries removed."""
+        removed = 0
+        for namespace in DOCUMENT_CACHE_NAMESPACES:
+            if await asyncio.to_thread(self.disk.delete, self._key(namespace, content_sha256)):
+                removed += 1
+        return removed
+
+    async def clear(self) -> int:
+        return await asyncio.to_thread(self.disk.clear)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self.version, "hits": dict(self.hits), "misses": dict(self.misses)}
+
+
+document_analysis_cache = DocumentAnalysisCache(
+    directory=os.getenv("DOCUMENT_CACHE_DIR", "./.cache/documents"),
+    max_bytes=int(os.getenv("DOCUMENT_CACHE_MAX_MB", "128")) * 1024 * 1024,
+)
@@ -0,0 +1,109 @@
+import re
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Penanda yang disisipkan saat ekstraksi; setiap penanda memulai unit baru
+_MARKER = re.compile(r"^[ \t]*--- (Page \d+|Slide \d+|Table Content) ---[ \t]*$", re.MULTILINE)
+# Baris yang terlihat seperti judul: markdown, penomoran ("2.1 Results") atau huruf kapital semua
+_HEADING = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]+\S.{0,100}|\d+(?:\.\d+)*\.?[ \t]+[A-Z][^\n.!?]{0,80}|[A-Z][A-Z0-9 ,&:/()'-]{3,80})[ \t]*$",
+    re.MULTILINE,
+)
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class DocumentSection:
+    """A stable slice of a document; `digest` only depends on its text."""
+    label: str
+    text: str
+    digest: str
+
+
+def section_digest(text: str) -> str:
+    # Hash teks yang whitespace-nya dinormalisasi, agar perubahan tata letak tidak dihitung sebagai edit
+    return hashlib.sha256(_WHITESPACE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+
+def _split_at(pattern: re.Pattern, text: str) -> List[str]:
+    starts = [0] + [match.start() for match in pattern.finditer(text) if match.start() > 0]
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """Split a unit longer than `max_chars` at paragraph, then word boundaries."""
+    if len(text) <= max_chars:
+        return [text]
+    pieces: List[str] = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _units(content: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Break extracted text into (label, text) units at page/slide markers and headings."""
+    units: List[Tuple[str, str]] = []
+    label = "Start"
+    for block in _split_at(_MARKER, content):
+        marker = _MARKER.match(block)
+        if marker:
+            label = marker.group(1) if marker.group(1) != "Table Content" else "Tables"
+            block = block[marker.end():]
+        for part in _split_at(_HEADING, block):
+            heading = _HEADING.match(part)
+            part_label = f"{label}: {heading.group(0).strip()[:60]}" if heading else label
+            for piece in _split_oversized(part, max_chars):
+                if piece.strip():
+                    units.append((part_label, piece.strip()))
+    return units
+
+
+def split_sections(content: str, min_chars: int = 1500, max_chars: int = 6000) -> List[DocumentSection]:
+    """
+    Split extracted document text into sections whose boundaries survive edits.
+
+    Text is first cut into units at page/slide/table markers and heading-like
+    lines. Small units are then grouped with content-defined boundaries: a
+    group is closed once it holds at least `min_chars` and the digest of its
+    last unit happens to end a group, or once it would exceed `max_chars`.
+    Since the decision depends only on nearby content, editing or inserting a
+    page changes the sections around it but leaves the others (and their
+    digests) untouched.
+    """
+    sections: List[DocumentSection] = []
+    group: List[Tuple[str, str]] = []
+    size = 0
+
+    def close_group():
+        nonlocal group, size
+        text = "\n\n".join(text for _, text in group)
+        sections.append(DocumentSection(label=group[0][0], text=text, digest=section_digest(text)))
+        group, size = [], 0
+
+    for label, text in _units(content, max_chars):
+        if group and size + len(text) > max_chars:
+            close_group()
+        group.append((label, text))
+        size += len(text)
+        if size >= min_chars and int(section_digest(text)[:8], 16) % 4 == 0:
+            close_group()
+    if group:
+        close_group()
+    return sections
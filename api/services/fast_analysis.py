@@ -0,0 +1,73 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import List
+
+from services.gemini_utils import gemini_service, _generate_fallback_summary
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_MODE_FULL = "full"
+ANALYSIS_MODE_FAST = "fast"
+# Mode cepat yang dipilih otomatis karena Gemini sedang tidak tersedia
+ANALYSIS_MODE_DEGRADED = "degraded"
+
+# Hanya awal teks yang dipindai, agar waktu ringkasan tetap terbatas untuk transkrip/dokumen panjang
+FAST_SUMMARY_SCAN_CHARS = int(os.getenv("FAST_SUMMARY_SCAN_CHARS", "20000"))
+FAST_SUMMARY_SENTENCES = 3
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[^\W\d_]{3,}")
+_STOPWORDS = frozenset("""
+the and for that this with you are was were have has had not but from they will would there their what about
+which when your can all just been also into more some than then them these those its our out very how who
+yang dan ini itu untuk dengan dari pada tidak akan ada juga bisa kita kami saya kamu mereka dalam sudah atau
+karena jadi seperti agar lebih oleh para
+""".split())
+
+
+def resolve_analysis_mode(requested: str) -> str:
+    """The mode a request actually runs in: full analysis falls back to fast while Gemini is unavailable."""
+    if requested == ANALYSIS_MODE_FAST:
+        return ANALYSIS_MODE_FAST
+    if not gemini_service.available:
+        logger.warning("Gemini is unavailable, serving a degraded (fast) analysis")
+        return ANALYSIS_MODE_DEGRADED
+    return ANALYSIS_MODE_FULL
+
+
+def extractive_summary(content: str, max_sentences: int = FAST_SUMMARY_SENTENCES) -> str:
+    """
+    Pick the most representative sentences of a text, in their original order.
+    Sentences are scored by the average frequency of their content words.
+    """
+    text = " ".join(content[:FAST_SUMMARY_SCAN_CHARS].split())
+    # Kalimat yang berulang (mis. header/footer halaman) hanya dihitung sekali
+    sentences = list(dict.fromkeys(s for s in _SENTENCE_END.split(text) if len(s.split()) >= 4))
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+
+    frequencies = Counter(w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS)
+    if not frequencies:
+        return " ".join(sentences[:max_sentences])
+
+    def score(sentence: str) -> float:
+        words = [w for w in _WORD.findall(sentence.lower()) if w not in _STOPWORDS]
+        return sum(frequencies[w] for w in words) / (len(words) + 1)
+
+    ranked: List[int] = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+    return " ".join(sentences[i] for i in sorted(ranked[:max_sentences]))
+
+
+def fast_summary(content: str) -> str:
+    """
+    Local summary: the extractive summary followed by the keyword-based
+    fallback summary. It is recognized by `is_fallback_summary`, so it is never
+    cached in place of a Gemini summary.
+    """
+    if not content or len(content.strip()) < 10:
+        return "No content available to summarize."
+    extract = extractive_summary(content)
+    fallback = _generate_fallback_summary(content)
+    return f"{extract} {fallback}" if extract else fallback
@@ -1,107 +1,141 @@
 import os
+import time
 import logging
-from typing import Dict, List
-import google.generativeai as genai
+from collections import Counter
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+from pydantic import ValidationError
 from models.schemas import ContentRecommendation, PlatformRecommendation
-import json
+from utils.deadline import with_deadline, note_degraded, DeadlineExceeded
+from utils.json_repair import parse_json_lenient
+from utils.tokens import estimate_tokens
+from services.llm_scheduler import LlmScheduler
+from services.llm_hedging import RequestHedger
+from services.llm_backends import llm_backends, LlmResult, EmptyResponseError
+from services.llm_profiles import build_generation_profiles
+from services.prompt_builder import build_prompt_builder, PromptTemplate, PromptSection
+from services.llm_router import (
+    build_model_router, PROMPT_GENERIC, PROMPT_SUMMARY, PROMPT_VIRAL_EXPLANATION, PROMPT_CONTENT_IDEA,
+    PROMPT_DOCUMENT_SUMMARY, PROMPT_DOCUMENT_SECTION_NOTES, PROMPT_DOCUMENT_STRENGTHS, PROMPT_DOCUMENT_QUESTIONS,
+    PROMPT_DOCUMENT_RECOMMENDATIONS, PROMPT_DOCUMENT_NUMERICAL,
+)
 
 logger = logging.getLogger(__name__)
 
 class GeminiService:
-    """Service for interacting with Google Gemini AI."""
+    """
+    Service for LLM calls. Each prompt type is routed to a model tier (Gemini
+    by default); calls are scheduled, hedged and bounded by the request deadline.
+    """
 
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                logger.info("Gemini service initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini: {e}")
-                self.model = None
-        else:
-            logger.error("GEMINI_API_KEY not found. GeminiService cannot function.")
-            self.model = None
-
-    async def _generate_content(self, prompt: str, max_retries: int = 3) -> str:
-        """Generate content using Gemini API with error handling and retries."""
-        if not self.model:
-            raise Exception("Gemini model is not initialized. Please check your GEMINI_API_KEY.")
-
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        # Slot Gemini dibagi secara adil per tenant dan kelas prioritas (interactive/batch)
+        self.scheduler = LlmScheduler(self.max_concurrency)
+        # Setelah sebuah request gagal total, Gemini dianggap tidak tersedia selama jeda ini
+        self.unavailable_cooldown = float(os.getenv("GEMINI_UNAVAILABLE_COOLDOWN_SECONDS", "30"))
+        self._unavailable_until = 0.0
+        # Batas waktu satu panggilan (termasuk antre di scheduler); dipersingkat lagi oleh sisa deadline request
+        self.call_timeout = float(os.getenv("GEMINI_CALL_TIMEOUT_SECONDS", "30"))
+        # Panggilan yang lebih lambat dari p90 jenis prompt-nya diduplikasi, dibatasi 5% dari semua panggilan
+        self.hedger = RequestHedger(
+            enabled=os.getenv("GEMINI_HEDGING", "1") == "1",
+            percentile=float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.9")),
+            budget=float(os.getenv("GEMINI_HEDGE_BUDGET", "0.05")),
+        )
+        self.router = build_model_router(llm_backends)
+        # Batas output, sampling dan stop sequence per jenis prompt
+        self.profiles = build_generation_profiles()
+        # Anggaran token input per jenis prompt; bagian yang terlalu panjang dipotong di akhir kalimat
+        self.prompts = build_prompt_builder()
+
+    @property
+    def available(self) -> bool:
+        """False without a configured backend, or while in the cooldown after a request failed on every attempt."""
+        return self.router.available and time.monotonic() >= self._unavailable_until
+
+    @staticmethod
+    def _call_cost(prompt: str) -> float:
+        # Biaya antrean kira-kira sebanding dengan ukuran prompt (1 unit ~ 1000 token)
+        return max(1.0, len(prompt) / 4000)
+
+    async def _call(self, prompt: str, prompt_type: str = PROMPT_GENERIC) -> str:
+        """One backend call; the caller holds a scheduler slot."""
+        route = self.router.route(prompt_type)
+        profile = self.profiles.profile_for(prompt_type)
+        started = time.monotonic()
+        try:
+            result = await self.router.backend(route).generate(prompt, route.model, profile)
+        except Exception:
+            self.router.record(route, time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+        self.router.record(route, latency, result)
+        self.profiles.record(profile, latency, result)
+        if result.truncated:
+            logger.info(f"{prompt_type} answer reached the {profile.max_output_tokens}-token output cap")
+        return result.text
+
+    async def _generate_content(self, prompt: str, max_retries: int = 3, prompt_type: str = PROMPT_GENERIC) -> str:
+        """
+        Generate content with error handling and retries.
+        Each attempt is bounded by the call timeout and by the time left in the
+        request deadline; once the deadline is used up, no retry is made.
+        An attempt slower than usual for its `prompt_type` is hedged.
+        """
+        if not self.router.available:
+            raise Exception("No LLM backend is configured. Please check your GEMINI_API_KEY.")
+
+        # Batas konkurensi bersama untuk semua request yang memanggil LLM; duplikat hedge juga memakai slot sendiri
+        slot = lambda: self.scheduler.slot(self._call_cost(prompt))
         for attempt in range(max_retries):
             try:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,  # Lower temperature for more consistent results
-                        top_p=0.8,
-                        top_k=40,
-                        max_output_tokens=2048,
-                    ),
-                    safety_settings=[
-                        {
-                            "category": "HARM_CATEGORY_HARASSMENT",
-                            "threshold": "BLOCK_NONE"
-                        },
-                        {
-                            "category": "HARM_CATEGORY_HATE_SPEECH",
-                            "threshold": "BLOCK_NONE"
-                        },
-                        {
-                            "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                            "threshold": "BLOCK_NONE"
-                        },
-                        {
-                            "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                            "threshold": "BLOCK_NONE"
-                        }
-                    ]
+                text = await with_deadline(
+                    self.hedger.run(prompt_type, lambda: self._call(prompt, prompt_type), slot), self.call_timeout
                 )
-
-                # Check if response has valid content
-                if not response.candidates:
-                    logger.warning(f"Attempt {attempt + 1}: No candidates returned from Gemini")
-                    continue
-                
-                candidate = response.candidates[0]
-                
-                # Check finish reason
-                if hasattr(candidate, 'finish_reason'):
-                    if candidate.finish_reason == 2:  # SAFETY
-                        logger.warning(f"Attempt {attempt + 1}: Content blocked by safety filters")
-                        continue
-                    elif candidate.finish_reason == 3:  # RECITATION
-                        logger.warning(f"Attempt {attempt + 1}: Content blocked due to recitation")
-                        continue
-                    elif candidate.finish_reason != 1:  # Not STOP (successful completion)
-                        logger.warning(f"Attempt {attempt + 1}: Unexpected finish reason: {candidate.finish_reason}")
-                        continue
-
-                # Try to get the text content
-                if hasattr(candidate.content, 'parts') and candidate.content.parts:
-                    text_content = ""
-                    for part in candidate.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            text_content += part.text
-                    
-                    if text_content.strip():
-                        return text_content.strip()
-                
-                # Fallback: try response.text if available
-                if hasattr(response, 'text') and response.text:
-                    return response.text.strip()
-                
-                logger.warning(f"Attempt {attempt + 1}: No valid text content found in response")
-                
+                self._unavailable_until = 0.0
+                return text
+            except EmptyResponseError as e:
+                logger.warning(f"Attempt {attempt + 1}: {e}")
+                continue
+            except DeadlineExceeded:
+                logger.warning(f"Attempt {attempt + 1}: request deadline exceeded, giving up on Gemini")
+                note_degraded("gemini")
+                raise
             except Exception as e:
-                logger.error(f"Attempt {attempt + 1}: Gemini API error: {str(e)}")
+                logger.error(f"Attempt {attempt + 1}: Gemini API error: {type(e).__name__}: {str(e)}")
                 if attempt == max_retries - 1:
+                    self._unavailable_until = time.monotonic() + self.unavailable_cooldown
                     raise Exception(f"Failed to generate content from Gemini after {max_retries} attempts: {str(e)}")
                 continue
 
         raise Exception("Failed to generate valid content from Gemini after all attempts")
 
+    async def _stream_content(self, prompt: str, prompt_type: str = PROMPT_GENERIC) -> AsyncIterator[str]:
+        """
+        Generate content with streaming enabled, yielding text chunks as they
+        arrive. There are no retries: once text has been yielded it cannot be
+        taken back, so callers handle failures themselves.
+        """
+        if not self.router.available:
+            raise Exception("No LLM backend is configured. Please check your GEMINI_API_KEY.")
+
+        route = self.router.route(prompt_type)
+        profile = self.profiles.profile_for(prompt_type)
+        async with self.scheduler.slot(self._call_cost(prompt)):
+            started = time.monotonic()
+            parts = []
+            try:
+                async for text in self.router.backend(route).stream(prompt, route.model, profile):
+                    parts.append(text)
+                    yield text
+            except Exception:
+                self.router.record(route, time.monotonic() - started)
+                raise
+            output = "".join(parts)
+            result = LlmResult(output, estimate_tokens(prompt), estimate_tokens(output))
+            self.router.record(route, time.monotonic() - started, result)
+            self.profiles.record(profile, time.monotonic() - started, result)
+
 
 gemini_service = GeminiService()
 
@@ -112,14 +146,52 @@ async def summarize_transcript(transcript_chunk: str) -> str:
     if not transcript_chunk or len(transcript_chunk.strip()) < 10:
         return "No content available to summarize."
 
-    # Clean and truncate the transcript to avoid issues
-    clean_transcript = transcript_chunk.replace('\n', ' ').strip()[:3000]
+    # Clean the transcript; the prompt builder shortens it to the summary budget
+    clean_transcript = transcript_chunk.replace('\n', ' ').strip()
 
-    prompt = f"""
+    try:
+        prompt = gemini_service.prompts.build(SUMMARY_PROMPT, content=clean_transcript)
+        summary = await gemini_service._generate_content(prompt, prompt_type=PROMPT_SUMMARY)
+        return summary.strip()
+    except Exception as e:
+        logger.error(f"Error summarizing transcript: {e}")
+        # Return a basic summary based on content length and keywords
+        return _generate_fallback_summary(clean_transcript)
+
+async def stream_transcript_summary(transcript_chunk: str, on_delta: Callable[[str], None]) -> str:
+    """
+    Same as `summarize_transcript`, but the summary is generated with streaming
+    and `on_delta` is called with each piece of text as it arrives. Returns the
+    complete summary; if generation fails, the fallback summary is returned and
+    replaces whatever was streamed so far.
+    """
+    if not transcript_chunk or len(transcript_chunk.strip()) < 10:
+        return "No content available to summarize."
+
+    clean_transcript = transcript_chunk.replace('\n', ' ').strip()
+
+    parts = []
+    try:
+        prompt = gemini_service.prompts.build(SUMMARY_PROMPT, content=clean_transcript)
+        async for delta in gemini_service._stream_content(prompt, PROMPT_SUMMARY):
+            # Spasi di awal dibuang agar hasil gabungan sama dengan versi non-streaming
+            if not parts:
+                delta = delta.lstrip()
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        if parts:
+            return "".join(parts).strip()
+        logger.warning("Streaming summary returned no text")
+    except Exception as e:
+        logger.error(f"Error streaming transcript summary: {e}")
+    return _generate_fallback_summary(clean_transcript)
+
+SUMMARY_PROMPT = PromptTemplate(PROMPT_SUMMARY, """
 Please provide a comprehensive summary of the following content in 3-4 sentences.
 Focus on the main topics, key insights, and important information.
 
-Content: {clean_transcript}
+Content: {content}
 
 Requirements:
 - Write in clear, professional language
@@ -128,15 +200,13 @@ Requirements:
 - Focus on factual content only
 
 Summary:
-"""
+""", (PromptSection("content"),))
 
-    try:
-        summary = await gemini_service._generate_content(prompt)
-        return summary.strip()
-    except Exception as e:
-        logger.error(f"Error summarizing transcript: {e}")
-        # Return a basic summary based on content length and keywords
-        return _generate_fallback_summary(clean_transcript)
+_FALLBACK_SUMMARY_TAIL = "The material provides valuable information that could be useful for learning and understanding key concepts in the subject area."
+
+def is_fallback_summary(summary: str) -> bool:
+    """Check whether a summary came from the local fallback instead of Gemini."""
+    return summary == "No content available to summarize." or summary.endswith(_FALLBACK_SUMMARY_TAIL)
 
 def _generate_fallback_summary(content: str) -> str:
     """Generate a basic summary when AI fails."""
@@ -158,23 +228,15 @@ def _generate_fallback_summary(content: str) -> str:
             detected_type = category
             break
     
-    return f"This {detected_type} content covers important topics and insights in approximately {word_count} words. The material provides valuable information that could be useful for learning and understanding key concepts in the subject area."
+    return f"This {detected_type} content covers important topics and insights in approximately {word_count} words. {_FALLBACK_SUMMARY_TAIL}"
 
-async def explain_why_viral(title: str, views: int, likes: int, summary: str) -> str:
-    """
-    Generate explanation for why content has viral potential.
-    """
-    # Clean inputs
-    clean_title = title.replace('\n', ' ').strip()[:200]
-    clean_summary = summary.replace('\n', ' ').strip()[:800]
-    
-    prompt = f"""
+VIRAL_EXPLANATION_PROMPT = PromptTemplate(PROMPT_VIRAL_EXPLANATION, """
 Analyze why this content has viral potential based on the information provided.
 
-Title: {clean_title}
+Title: {title}
 Views: {views:,}
 Likes: {likes:,}
-Content Summary: {clean_summary}
+Content Summary: {summary}
 
 Provide a detailed analysis in clean, well-structured format covering:
 
@@ -191,10 +253,19 @@ Requirements:
 - Focus on actionable viral elements
 
 Analysis:
-"""
+""", (PromptSection("title", min_tokens=20, max_tokens=60), PromptSection("summary", weight=4)))
+
+async def explain_why_viral(title: str, views: int, likes: int, summary: str) -> str:
+    """
+    Generate explanation for why content has viral potential.
+    """
+    prompt = gemini_service.prompts.build(
+        VIRAL_EXPLANATION_PROMPT, views=views, likes=likes,
+        title=title.replace('\n', ' ').strip(), summary=summary.replace('\n', ' ').strip(),
+    )
 
     try:
-        explanation = await gemini_service._generate_content(prompt)
+        explanation = await gemini_service._generate_content(prompt, prompt_type=PROMPT_VIRAL_EXPLANATION)
         # Clean up any markdown formatting
         cleaned_explanation = explanation.strip()
         cleaned_explanation = cleaned_explanation.replace('**', '').replace('*', '')
@@ -244,20 +315,12 @@ def _generate_fallback_viral_explanation(views: int, likes: int) -> str:
 
 5. Strategic distribution and promotion could amplify the existing value to achieve viral status."""
 
-async def generate_content_idea(category: str, summary: str, reason: str) -> ContentRecommendation:
-    """
-    Generate content recommendation based on analysis with platform recommendations.
-    """
-    # Clean inputs
-    clean_summary = summary.replace('\n', ' ').strip()[:600]
-    clean_reason = reason.replace('\n', ' ').strip()[:600]
-    
-    prompt = f"""
+CONTENT_IDEA_PROMPT = PromptTemplate(PROMPT_CONTENT_IDEA, """
 Based on this content analysis, create a new content recommendation in JSON format with platform-specific recommendations.
 
 Category: {category}
-Original Summary: {clean_summary}
-Success Factors: {clean_reason}
+Original Summary: {summary}
+Success Factors: {reason}
 
 Create a JSON response with this exact structure:
 {{
@@ -318,39 +381,89 @@ Consider these factors for platform recommendations:
 - Instagram: Best for visually appealing content, lifestyle, behind-the-scenes
 
 Respond only with valid JSON:
-"""
+""", (PromptSection("summary"), PromptSection("reason")))
+
+async def generate_content_idea(category: str, summary: str, reason: str) -> ContentRecommendation:
+    """
+    Generate content recommendation based on analysis with platform recommendations.
+    """
+    prompt = gemini_service.prompts.build(
+        CONTENT_IDEA_PROMPT, category=category,
+        summary=summary.replace('\n', ' ').strip(), reason=reason.replace('\n', ' ').strip(),
+    )
 
     try:
-        response_text = await gemini_service._generate_content(prompt)
-        
-        # Clean JSON response
-        clean_json_text = response_text.strip()
-        
-        # Remove markdown code blocks if present
-        if clean_json_text.startswith('```json'):
-            clean_json_text = clean_json_text[7:]
-        if clean_json_text.startswith('```'):
-            clean_json_text = clean_json_text[3:]
-        if clean_json_text.endswith('```'):
-            clean_json_text = clean_json_text[:-3]
-        
-        clean_json_text = clean_json_text.strip()
-        
-        # Parse JSON
-        data = json.loads(clean_json_text)
-        
-        # Validate and create ContentRecommendation
-        recommendation = ContentRecommendation(**data)
-        return recommendation
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parsing error in content recommendation: {e}")
-        logger.error(f"Raw response: {response_text[:500]}...")
-        return _create_fallback_recommendation()
+        response_text = await gemini_service._generate_content(prompt, prompt_type=PROMPT_CONTENT_IDEA)
     except Exception as e:
         logger.error(f"Error generating content idea: {str(e)}")
+        content_idea_outcomes[CONTENT_IDEA_ERROR] += 1
         return _create_fallback_recommendation()
 
+    recommendation, outcome = _parse_content_recommendation(response_text)
+    content_idea_outcomes[outcome] += 1
+    if outcome == CONTENT_IDEA_FALLBACK:
+        logger.error(f"Unusable content recommendation, raw response: {response_text[:500]}...")
+    elif outcome == CONTENT_IDEA_REPAIRED:
+        logger.info("Content recommendation was repaired (truncated or partially invalid JSON)")
+    return recommendation
+
+# Hasil generate_content_idea: JSON valid, diperbaiki/dilengkapi, tidak terpakai (fallback), atau gagal dibuat
+CONTENT_IDEA_PARSED = "parsed"
+CONTENT_IDEA_REPAIRED = "repaired"
+CONTENT_IDEA_FALLBACK = "fallback"
+CONTENT_IDEA_ERROR = "error"
+# Bagian ide konten yang harus berasal dari jawaban model; tanpa itu hasil gabungan hanyalah fallback
+CONTENT_IDEA_CORE_FIELDS = ("title", "target_audience", "content_style", "suggested_structure")
+content_idea_outcomes = Counter({CONTENT_IDEA_PARSED: 0, CONTENT_IDEA_REPAIRED: 0, CONTENT_IDEA_FALLBACK: 0, CONTENT_IDEA_ERROR: 0})
+
+def content_idea_stats() -> Dict:
+    """Outcome counts of generated content ideas; fallback_rate counts generations that were discarded."""
+    generated = sum(content_idea_outcomes[o] for o in (CONTENT_IDEA_PARSED, CONTENT_IDEA_REPAIRED, CONTENT_IDEA_FALLBACK))
+    return {
+        **content_idea_outcomes,
+        "repair_rate": round(content_idea_outcomes[CONTENT_IDEA_REPAIRED] / generated, 4) if generated else 0.0,
+        "fallback_rate": round(content_idea_outcomes[CONTENT_IDEA_FALLBACK] / generated, 4) if generated else 0.0,
+    }
+
+def _parse_content_recommendation(response_text: str) -> Tuple[ContentRecommendation, str]:
+    """
+    Parse a generated content idea with the tolerant JSON parser. Truncated
+    JSON is closed after its last complete value; other fields that are
+    missing or invalid are taken from the fallback recommendation, as long as
+    the answer itself contributed all of CONTENT_IDEA_CORE_FIELDS.
+    """
+    data, repaired = parse_json_lenient(response_text)
+    if not isinstance(data, dict):
+        return _create_fallback_recommendation(), CONTENT_IDEA_FALLBACK
+    try:
+        recommendation = ContentRecommendation.model_validate(data)
+        return recommendation, CONTENT_IDEA_REPAIRED if repaired else CONTENT_IDEA_PARSED
+    except ValidationError:
+        pass
+
+    merged = _create_fallback_recommendation().model_dump()
+    salvaged = set()
+    for name in ContentRecommendation.model_fields:
+        if name not in data or name == "platform_recommendations":
+            continue
+        try:
+            ContentRecommendation.model_validate({**merged, name: data[name]})
+        except ValidationError:
+            continue
+        merged[name] = data[name]
+        salvaged.add(name)
+    platforms = []
+    for item in data.get("platform_recommendations") or []:
+        try:
+            platforms.append(PlatformRecommendation.model_validate(item))
+        except ValidationError:
+            continue
+    if platforms:
+        merged["platform_recommendations"] = platforms
+    if not salvaged.issuperset(CONTENT_IDEA_CORE_FIELDS):
+        return _create_fallback_recommendation(), CONTENT_IDEA_FALLBACK
+    return ContentRecommendation.model_validate(merged), CONTENT_IDEA_REPAIRED
+
 def _create_fallback_recommendation() -> ContentRecommendation:
     """Create a fallback recommendation when AI generation fails."""
     return ContentRecommendation(
@@ -0,0 +1,232 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from utils.disk_store import JsonDiskStore
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Handler menerima parameter job dan callback progres (stage, status), lalu mengembalikan hasil yang bisa di-JSON-kan
+JobHandler = Callable[[Dict[str, Any], Callable[[str, str], None]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+    pass
+
+
+@dataclass
+class _JobKind:
+    handler: JobHandler
+    stages: Sequence[str]
+    cleanup: Optional[Callable[[Dict[str, Any]], None]] = None
+
+
+class JobManager:
+    """
+    Runs long analyses in the background on an in-process worker pool.
+
+    Submitting a job only persists it and puts its ID on a bounded queue, so
+    the HTTP request returns immediately. Job state (status, per-stage
+    progress, result or error) is written to a size-bounded disk store after
+    every change; on startup, jobs that were queued or interrupted while
+    running are queued again, and finished results stay available. Queued
+    and running jobs are pinned in the store so eviction only removes
+    finished ones.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, workers: int, queue_size: int):
+        self.directory = directory
+        self.store = JsonDiskStore(directory, max_bytes)
+        self.workers = workers
+        self.queue_size = queue_size
+        self._kinds: Dict[str, _JobKind] = {}
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Salinan job yang masih antre, untuk membersihkan job yang record-nya hilang dari disk
+        self._queued: Dict[str, Dict[str, Any]] = {}
+        self._running = 0
+        self._save_lock = asyncio.Lock()
+        self._saved_revisions: Dict[str, int] = {}
+
+    def register(self, kind: str, handler: JobHandler, stages: Sequence[str],
+                 cleanup: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """Register the handler of a job kind; `cleanup(params)` runs once the job has finished."""
+        self._kinds[kind] = _JobKind(handler, stages, cleanup)
+
+    async def start(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        recovered = await asyncio.to_thread(self._recover)
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        if recovered:
+            logger.info(f"Re-queueing {len(recovered)} unfinished jobs")
+            # Dimasukkan bertahap agar batas antrean tetap berlaku
+            self._tasks.append(asyncio.create_task(self._requeue(recovered)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Persist and queue a new job.
+
+        Raises:
+            JobQueueFullError: The queue is at capacity (or the workers are not running).
+        """
+        if self._queue is None or self._queue.full():
+            raise JobQueueFullError("Too many jobs are waiting, try again later")
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "params": params,
+            "progress": {stage: "pending" for stage in self._kinds[kind].stages},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "revision": 0,
+        }
+        self.store.pin(job["id"])
+        self._queued[job["id"]] = job
+        await self._save(job)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+        }
+
+    def _recover(self) -> List[str]:
+        unfinished = [job for job in self.store.values() if job.get("status") in (JOB_QUEUED, JOB_RUNNING)]
+        unfinished.sort(key=lambda job: job.get("created_at") or 0)
+        for job in unfinished:
+            self.store.pin(job["id"])
+            self._queued[job["id"]] = job
+        return [job["id"] for job in unfinished]
+
+    async def _requeue(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            await self._queue.put(job_id)
+
+    async def _save(self, job: Dict[str, Any]) -> None:
+        """Persist a snapshot of the job; snapshots older than the last one written for a running job are dropped."""
+        async with self._save_lock:
+            if job.get("revision", 0) < self._saved_revisions.get(job["id"], -1):
+                return
+            try:
+                await asyncio.to_thread(self.store.put, job["id"], job)
+                self._saved_revisions[job["id"]] = job.get("revision", 0)
+            except Exception as e:
+                logger.warning(f"Failed to persist job {job['id']}: {e}")
+
+    async def _update(self, job: Dict[str, Any], **changes: Any) -> None:
+        job.update(changes)
+        job["revision"] = job.get("revision", 0) + 1
+        await self._save(job)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Worker {index} failed to run job {job_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        queued = self._queued.pop(job_id, None)
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None and queued is not None:
+            await self._expire(queued)
+            return
+        if job is None or job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+            self.store.unpin(job_id)
+            return
+        kind = self._kinds.get(job["kind"])
+        if kind is None:
+            logger.error(f"No handler registered for job kind '{job['kind']}'")
+            self.store.unpin(job_id)
+            return
+
+        self._jobs[job_id] = job
+        self._running += 1
+        progress_saves: List["asyncio.Future[None]"] = []
+        try:
+            await self._update(job, status=JOB_RUNNING, started_at=time.time())
+
+            def on_stage(stage: str, status: str) -> None:
+                # Progres langsung terlihat lewat GET karena job aktif dibaca dari memori
+                job["progress"] = dict(job["progress"], **{stage: status})
+                job["revision"] += 1
+                progress_saves.append(asyncio.ensure_future(self._save(dict(job))))
+
+            try:
+                outcome = {"status": JOB_SUCCEEDED, "result": await kind.handler(job["params"], on_stage)}
+            except asyncio.CancelledError:
+                # Server berhenti: job tetap "running" di disk dan diantrekan ulang saat start berikutnya
+                raise
+            except Exception as e:
+                logger.warning(f"Job {job_id} failed: {e}")
+                outcome = {"status": JOB_FAILED, "error": getattr(e, "detail", None) or str(e)}
+            await asyncio.gather(*progress_saves)
+            await self._update(job, finished_at=time.time(), **outcome)
+        finally:
+            self._running -= 1
+            self._jobs.pop(job_id, None)
+            self._saved_revisions.pop(job_id, None)
+        self.store.unpin(job_id)
+        await self._cleanup(kind, job)
+
+    async def _expire(self, job: Dict[str, Any]) -> None:
+        """A queued job whose record disappeared from the store: report it as failed and clean up its files."""
+        logger.warning(f"Job {job['id']} was removed from the job store before it ran, marking it as failed")
+        await self._update(job, status=JOB_FAILED, error="The job expired before it could run", finished_at=time.time())
+        self._saved_revisions.pop(job["id"], None)
+        self.store.unpin(job["id"])
+        kind = self._kinds.get(job["kind"])
+        if kind is not None:
+            await self._cleanup(kind, job)
+
+    async def _cleanup(self, kind: _JobKind, job: Dict[str, Any]) -> None:
+        if kind.cleanup is not None:
+            try:
+                await asyncio.to_thread(kind.cleanup, job["params"])
+            except Exception as e:
+                logger.warning(f"Cleanup of job {job['id']} failed: {e}")
+
+
+job_manager = JobManager(
+    directory=os.getenv("JOBS_DIR", "./.cache/jobs"),
+    max_bytes=int(os.getenv("JOBS_MAX_MB", "64")) * 1024 * 1024,
+    workers=int(os.getenv("JOBS_WORKERS", "2")),
+    queue_size=int(os.getenv("JOBS_QUEUE_SIZE", "100")),
+)
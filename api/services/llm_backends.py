@@ -0,0 +1,343 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import google.generativeai as genai
+from openai import AsyncOpenAI
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class EmptyResponseError(Exception):
+    """Raised when a backend answers without usable text (no candidates, blocked, empty)."""
+    pass
+
+
+@dataclass
+class LlmResult:
+    text: str
+    prompt_tokens: int
+    output_tokens: int
+    # Jawaban terpotong karena mencapai max_output_tokens
+    truncated: bool = False
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Backend-neutral generation parameters of one kind of call."""
+    name: str
+    max_output_tokens: int
+    temperature: float = 0.3  # Lower temperature for more consistent results
+    top_p: float = 0.8
+    top_k: int = 40
+    stop_sequences: Tuple[str, ...] = ()
+    # JSON Schema of the expected answer; backends that support it constrain the output to JSON
+    response_schema: Optional[Dict[str, Any]] = field(default=None, compare=False)
+
+
+DEFAULT_PROFILE = GenerationProfile("default", max_output_tokens=2048)
+
+
+def inline_refs(schema: Dict[str, Any], definitions: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Resolve the local `$ref`s of a pydantic JSON Schema, so nested models are written out in place."""
+    if definitions is None:
+        definitions = schema.get("$defs", {})
+    if "$ref" in schema:
+        return inline_refs(definitions[schema["$ref"].rsplit("/", 1)[-1]], definitions)
+    resolved = {}
+    for key, value in schema.items():
+        if key == "$defs":
+            continue
+        if isinstance(value, dict):
+            value = inline_refs(value, definitions) if key != "properties" else {
+                name: inline_refs(item, definitions) for name, item in value.items()
+            }
+        resolved[key] = value
+    return resolved
+
+
+class LlmBackend(ABC):
+    """
+    Interface of an LLM provider. `generate` returns the complete answer with
+    its token usage and raises EmptyResponseError when the answer has no
+    usable text; `stream` yields text chunks as they arrive. Both take the
+    generation profile (output cap, sampling, stop sequences) of the call.
+    """
+
+    name = "backend"
+
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        ...
+
+    @abstractmethod
+    async def generate(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> LlmResult:
+        ...
+
+    @abstractmethod
+    def stream(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> AsyncIterator[str]:
+        ...
+
+
+GEMINI_SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_NONE"
+    }
+]
+
+# Subset OpenAPI yang diterima response_schema Gemini
+_GEMINI_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items"}
+
+
+def gemini_response_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a JSON Schema to the OpenAPI subset accepted by Gemini's response_schema."""
+    converted = {}
+    for key, value in inline_refs(schema).items():
+        if key not in _GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: gemini_response_schema(item) for name, item in value.items()}
+        elif key == "items":
+            value = gemini_response_schema(value)
+        converted[key] = value
+    return converted
+
+
+# Candidate.FinishReason
+FINISH_STOP = 1
+FINISH_MAX_TOKENS = 2
+FINISH_SAFETY = 3
+FINISH_RECITATION = 4
+
+
+class GeminiBackend(LlmBackend):
+    """Google Gemini through google-generativeai."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str]):
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._configs: Dict[GenerationProfile, genai.types.GenerationConfig] = {}
+        self._configured = False
+        if api_key:
+            try:
+                genai.configure(api_key=api_key)
+                self._configured = True
+                logger.info("Gemini backend initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Gemini: {e}")
+        else:
+            logger.error("GEMINI_API_KEY not found. The Gemini backend cannot function.")
+
+    @property
+    def available(self) -> bool:
+        return self._configured
+
+    def _model(self, model: str) -> genai.GenerativeModel:
+        if model not in self._models:
+            self._models[model] = genai.GenerativeModel(model)
+        return self._models[model]
+
+    def _request_options(self, profile: GenerationProfile) -> Dict:
+        """Generation config of the profile (built once per profile) and the shared safety settings."""
+        config = self._configs.get(profile)
+        if config is None:
+            options = {}
+            if profile.response_schema is not None:
+                options["response_mime_type"] = "application/json"
+                options["response_schema"] = gemini_response_schema(profile.response_schema)
+            config = self._configs[profile] = genai.types.GenerationConfig(
+                temperature=profile.temperature,
+                top_p=profile.top_p,
+                top_k=profile.top_k,
+                max_output_tokens=profile.max_output_tokens,
+                stop_sequences=list(profile.stop_sequences) or None,
+                **options,
+            )
+        return {"generation_config": config, "safety_settings": GEMINI_SAFETY_SETTINGS}
+
+    async def generate(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> LlmResult:
+        response = await self._model(model).generate_content_async(prompt, **self._request_options(profile))
+
+        # Check if response has valid content
+        if not response.candidates:
+            raise EmptyResponseError("No candidates returned from Gemini")
+
+        candidate = response.candidates[0]
+
+        # Check finish reason; an answer cut off at the output cap is still used
+        finish_reason = getattr(candidate, 'finish_reason', FINISH_STOP)
+        if finish_reason == FINISH_SAFETY:
+            raise EmptyResponseError("Content blocked by safety filters")
+        elif finish_reason == FINISH_RECITATION:
+            raise EmptyResponseError("Content blocked due to recitation")
+        elif finish_reason not in (FINISH_STOP, FINISH_MAX_TOKENS):
+            raise EmptyResponseError(f"Unexpected finish reason: {finish_reason}")
+
+        text_content = ""
+        if hasattr(candidate.content, 'parts') and candidate.content.parts:
+            for part in candidate.content.parts:
+                if hasattr(part, 'text') and part.text:
+                    text_content += part.text
+
+        # Fallback: try response.text if available
+        if not text_content.strip():
+            try:
+                text_content = response.text or ""
+            except (AttributeError, ValueError):
+                text_content = ""
+        if not text_content.strip():
+            raise EmptyResponseError("No valid text content found in response")
+
+        # Jumlah token bisa 0 jika tidak dilaporkan; estimasi lokal dipakai sebagai gantinya
+        usage = getattr(response, "usage_metadata", None)
+        return LlmResult(
+            text=text_content.strip(),
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt),
+            output_tokens=getattr(usage, "candidates_token_count", 0) or estimate_tokens(text_content),
+            truncated=finish_reason == FINISH_MAX_TOKENS,
+        )
+
+    async def stream(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> AsyncIterator[str]:
+        response = await self._model(model).generate_content_async(prompt, stream=True, **self._request_options(profile))
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk tanpa teks (mis. hanya berisi finish reason)
+                continue
+            if text:
+                yield text
+
+
+class OpenAIBackend(LlmBackend):
+    """OpenAI chat completions."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str]):
+        self.client = AsyncOpenAI(api_key=api_key, timeout=60.0) if api_key else None
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    @staticmethod
+    def _request_options(profile: GenerationProfile) -> Dict:
+        options = {"temperature": profile.temperature, "top_p": profile.top_p, "max_tokens": profile.max_output_tokens}
+        if profile.stop_sequences:
+            # OpenAI menerima paling banyak 4 stop sequence
+            options["stop"] = list(profile.stop_sequences[:4])
+        if profile.response_schema is not None:
+            # JSON mode; skema sendiri tidak didukung oleh versi SDK ini, prompt tetap menjelaskan strukturnya
+            options["response_format"] = {"type": "json_object"}
+        return options
+
+    async def generate(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> LlmResult:
+        response = await self.client.chat.completions.create(
+            model=model, messages=[{"role": "user", "content": prompt}], **self._request_options(profile)
+        )
+        if not response.choices:
+            raise EmptyResponseError("No choices returned from OpenAI")
+        choice = response.choices[0]
+        if choice.finish_reason == "content_filter":
+            raise EmptyResponseError("Content blocked by the content filter")
+        text = (choice.message.content or "").strip()
+        if not text:
+            raise EmptyResponseError("No valid text content found in response")
+        usage = response.usage
+        return LlmResult(
+            text=text,
+            prompt_tokens=usage.prompt_tokens if usage else estimate_tokens(prompt),
+            output_tokens=usage.completion_tokens if usage else estimate_tokens(text),
+            truncated=choice.finish_reason == "length",
+        )
+
+    async def stream(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=model, messages=[{"role": "user", "content": prompt}], stream=True, **self._request_options(profile)
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubBackend(LlmBackend):
+    """
+    Local deterministic backend for tests, benchmarks and development without
+    API keys: the same prompt always gives the same answer, after an optional
+    simulated latency.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @classmethod
+    def _instance(cls, schema: Dict[str, Any], text: str) -> Any:
+        """A value matching the schema, with `text` in every string."""
+        if "enum" in schema:
+            return schema["enum"][0]
+        kind = schema.get("type")
+        if kind == "object":
+            return {name: cls._instance(item, text) for name, item in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [cls._instance(schema.get("items", {}), text)]
+        if kind in ("integer", "number"):
+            return max(schema.get("minimum", 0), min(schema.get("maximum", 100), 50))
+        if kind == "boolean":
+            return True
+        return text
+
+    def _answer(self, prompt: str, model: str, profile: GenerationProfile) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        text = f"Stub answer {digest} from {model} ({profile.name}) for a {len(prompt.split())}-word prompt."
+        if profile.response_schema is not None:
+            return json.dumps(self._instance(inline_refs(profile.response_schema), text))
+        return text
+
+    async def generate(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> LlmResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        answer = self._answer(prompt, model, profile)
+        # Batas output disimulasikan dengan ~4 karakter per token
+        text = answer[:profile.max_output_tokens * 4]
+        return LlmResult(text=text, prompt_tokens=estimate_tokens(prompt), output_tokens=estimate_tokens(text),
+                         truncated=len(text) < len(answer))
+
+    async def stream(self, prompt: str, model: str, profile: GenerationProfile = DEFAULT_PROFILE) -> AsyncIterator[str]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        for word in self._answer(prompt, model, profile)[:profile.max_output_tokens * 4].split(" "):
+            yield word + " "
+
+
+llm_backends: Dict[str, LlmBackend] = {
+    GeminiBackend.name: GeminiBackend(os.getenv("GEMINI_API_KEY")),
+    OpenAIBackend.name: OpenAIBackend(os.getenv("OPENAI_API_KEY")),
+    StubBackend.name: StubBackend(float(os.getenv("LLM_STUB_LATENCY_MS", "0")) / 1000),
+}
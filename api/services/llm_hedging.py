@@ -0,0 +1,141 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import AsyncContextManager, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LATENCY_SAMPLES = 200  # Recent latencies kept per prompt type
+HEDGE_MIN_SAMPLES = 20  # No hedging until the latency percentile of a prompt type is meaningful
+
+
+@dataclass
+class _PromptTypeStats:
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    calls: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+
+
+class RequestHedger:
+    """
+    Hedged LLM calls: when a call runs longer than the recent latency
+    percentile of its prompt type, a duplicate is started and whichever
+    finishes first wins; the other is cancelled.
+
+    Hedges are limited to `budget` times the number of calls, so the extra
+    load stays bounded even when the whole backend is slow (in that case the
+    budget runs out instead of doubling the traffic). The hedge threshold is
+    never below the (1 - budget) percentile: with p90 and a 5% budget, the
+    budget would otherwise go to calls that are only slightly slow and leave
+    nothing for the real tail. A call that fails while the other is still
+    running does not fail the hedged call.
+
+    Each call (and its duplicate) first enters `slot`, e.g. a scheduler slot;
+    the wait for it is not counted, so latencies and the hedge timer only
+    cover the backend call itself.
+    """
+
+    def __init__(self, enabled: bool, percentile: float, budget: float):
+        self.enabled = enabled
+        self.percentile = max(percentile, 1 - budget)
+        self.budget = budget
+        self._types: Dict[str, _PromptTypeStats] = {}
+        self._calls = 0
+        self._hedges = 0
+
+    def _stats(self, prompt_type: str) -> _PromptTypeStats:
+        return self._types.setdefault(prompt_type, _PromptTypeStats())
+
+    def hedge_delay(self, prompt_type: str) -> Optional[float]:
+        """Seconds after which a call of this prompt type is hedged (None: not enough samples yet)."""
+        latencies = self._stats(prompt_type).latencies
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+    def _within_budget(self) -> bool:
+        return self._hedges + 1 <= self.budget * self._calls
+
+    async def _timed(self, stats: _PromptTypeStats, call: Callable[[], Awaitable[T]],
+                     slot: Callable[[], AsyncContextManager], admitted: Optional[asyncio.Event] = None) -> T:
+        async with slot():
+            if admitted is not None:
+                admitted.set()
+            started = time.monotonic()
+            result = await call()
+            stats.latencies.append(time.monotonic() - started)
+            return result
+
+    async def run(self, prompt_type: str, call: Callable[[], Awaitable[T]],
+                  slot: Callable[[], AsyncContextManager] = nullcontext) -> T:
+        """Await `call()` inside `slot()`, hedging it with a second one if it is slow."""
+        stats = self._stats(prompt_type)
+        stats.calls += 1
+        self._calls += 1
+        if not self.enabled:
+            return await self._timed(stats, call, slot)
+
+        admitted = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed(stats, call, slot, admitted))
+        pending = {primary}
+        try:
+            # Waktu tunggu slot tidak dihitung: timer hedge baru mulai saat panggilan pertama benar-benar berjalan
+            waiter = asyncio.ensure_future(admitted.wait())
+            try:
+                await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            started = time.monotonic()
+            delay = self.hedge_delay(prompt_type)
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self._within_budget():
+                    self._hedges += 1
+                    stats.hedges += 1
+                    logger.info(f"Hedging {prompt_type} call after {delay:.2f}s")
+                    pending.add(asyncio.ensure_future(self._timed(stats, call, slot)))
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            stats.hedge_wins += 1
+                            # Latensi panggilan pertama setidaknya selama ini; tanpa sampel ini p90 akan bergeser turun
+                            stats.latencies.append(time.monotonic() - started)
+                        return task.result()
+                    # Kegagalan panggilan pertama diutamakan saat keduanya gagal
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        prompt_types = {}
+        for prompt_type, stats in self._types.items():
+            delay = self.hedge_delay(prompt_type)
+            prompt_types[prompt_type] = {
+                "calls": stats.calls,
+                "hedges": stats.hedges,
+                "hedge_wins": stats.hedge_wins,
+                "hedge_win_rate": round(stats.hedge_wins / stats.hedges, 3) if stats.hedges else None,
+                "hedge_after_ms": round(delay * 1000) if delay is not None else None,
+            }
+        return {
+            "enabled": self.enabled,
+            "budget": self.budget,
+            "percentile": self.percentile,
+            "hedge_rate": round(self._hedges / self._calls, 4) if self._calls else 0.0,
+            "prompt_types": prompt_types,
+        }
+
@@ -0,0 +1,133 @@
+import os
+import logging
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Deque, Dict, List, Optional
+
+from models.schemas import ContentRecommendation
+from services.llm_backends import GenerationProfile, LlmResult
+from services.llm_router import (
+    PROMPT_GENERIC, PROMPT_SUMMARY, PROMPT_VIRAL_EXPLANATION, PROMPT_CONTENT_IDEA, PROMPT_DOCUMENT_SUMMARY,
+    PROMPT_DOCUMENT_SECTION_NOTES, PROMPT_DOCUMENT_STRENGTHS, PROMPT_DOCUMENT_QUESTIONS,
+    PROMPT_DOCUMENT_RECOMMENDATIONS, PROMPT_DOCUMENT_NUMERICAL,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLES = 500  # Recent calls kept per profile for the distributions
+CONTENT_STRUCTURE_KEYS = ("hook", "introduction", "main_content", "call_to_action")
+
+
+def content_recommendation_schema() -> Dict[str, Any]:
+    """
+    JSON Schema of a content idea, derived from ContentRecommendation. The
+    free-form suggested_structure mapping gets the four keys the prompt asks
+    for, since constrained decoding needs named properties.
+    """
+    schema = ContentRecommendation.model_json_schema()
+    schema["properties"]["suggested_structure"].update(
+        properties={key: {"type": "string"} for key in CONTENT_STRUCTURE_KEYS},
+        required=list(CONTENT_STRUCTURE_KEYS),
+    )
+    return schema
+
+
+# Batas output disesuaikan dengan panjang jawaban yang diminta prompt-nya (~4 karakter per token).
+# Stop sequence menghentikan daftar bernomor tepat setelah item terakhir yang dipakai parser.
+DEFAULT_GENERATION_PROFILES = {
+    PROMPT_GENERIC: GenerationProfile(PROMPT_GENERIC, max_output_tokens=2048),
+    # 3-4 kalimat
+    PROMPT_SUMMARY: GenerationProfile(PROMPT_SUMMARY, max_output_tokens=256),
+    # 5 poin bernomor yang ringkas
+    PROMPT_VIRAL_EXPLANATION: GenerationProfile(PROMPT_VIRAL_EXPLANATION, max_output_tokens=512, stop_sequences=("\n6.",)),
+    # Objek JSON dengan tiga rekomendasi platform
+    PROMPT_CONTENT_IDEA: GenerationProfile(PROMPT_CONTENT_IDEA, max_output_tokens=1536,
+                                           response_schema=content_recommendation_schema()),
+    # 4-6 kalimat
+    PROMPT_DOCUMENT_SUMMARY: GenerationProfile(PROMPT_DOCUMENT_SUMMARY, max_output_tokens=384),
+    PROMPT_DOCUMENT_SECTION_NOTES: GenerationProfile(PROMPT_DOCUMENT_SECTION_NOTES, max_output_tokens=384),
+    # 3-5 kekuatan dan 3-5 kelemahan
+    PROMPT_DOCUMENT_STRENGTHS: GenerationProfile(PROMPT_DOCUMENT_STRENGTHS, max_output_tokens=640),
+    # 5-8 pertanyaan
+    PROMPT_DOCUMENT_QUESTIONS: GenerationProfile(PROMPT_DOCUMENT_QUESTIONS, max_output_tokens=400, stop_sequences=("\n9.",)),
+    # 5-7 rekomendasi
+    PROMPT_DOCUMENT_RECOMMENDATIONS: GenerationProfile(PROMPT_DOCUMENT_RECOMMENDATIONS, max_output_tokens=512, stop_sequences=("\n8.",)),
+    PROMPT_DOCUMENT_NUMERICAL: GenerationProfile(PROMPT_DOCUMENT_NUMERICAL, max_output_tokens=512),
+}
+
+
+def _parse_caps(spec: str) -> Dict[str, int]:
+    """Parse "prompt_type=tokens,prompt_type=tokens"."""
+    caps = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prompt_type, _, tokens = item.partition("=")
+        try:
+            caps[prompt_type.strip()] = int(tokens)
+        except ValueError:
+            logger.warning(f"Ignoring invalid output token cap '{item}'")
+    return caps
+
+
+@dataclass
+class _ProfileStats:
+    calls: int = 0
+    truncated: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=PROFILE_SAMPLES))
+    output_tokens: Deque[int] = field(default_factory=lambda: deque(maxlen=PROFILE_SAMPLES))
+
+
+class GenerationProfiles:
+    """
+    Generation profile of each prompt type, with the latency and output-token
+    distribution of the calls made with it. Answers cut off at the output cap
+    are counted, so a cap that is too tight shows up next to its distribution.
+    """
+
+    def __init__(self, profiles: Dict[str, GenerationProfile]):
+        self.profiles = profiles
+        self._stats: Dict[str, _ProfileStats] = {}
+
+    def profile_for(self, prompt_type: str) -> GenerationProfile:
+        return self.profiles.get(prompt_type, self.profiles[PROMPT_GENERIC])
+
+    def record(self, profile: GenerationProfile, latency: float, result: LlmResult) -> None:
+        stats = self._stats.setdefault(profile.name, _ProfileStats())
+        stats.calls += 1
+        stats.truncated += result.truncated
+        stats.latencies.append(latency)
+        stats.output_tokens.append(result.output_tokens)
+
+    @staticmethod
+    def _percentile(samples: List[float], percentile: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+    def stats(self) -> Dict:
+        profiles = {}
+        for name, profile in self.profiles.items():
+            stats = self._stats.get(name, _ProfileStats())
+            latencies = list(stats.latencies)
+            tokens = list(stats.output_tokens)
+            profiles[name] = {
+                "max_output_tokens": profile.max_output_tokens,
+                "calls": stats.calls,
+                "truncated": stats.truncated,
+                "latency_p50_ms": round(self._percentile(latencies, 0.5) * 1000) if latencies else None,
+                "latency_p95_ms": round(self._percentile(latencies, 0.95) * 1000) if latencies else None,
+                "output_tokens_p50": self._percentile(tokens, 0.5),
+                "output_tokens_p95": self._percentile(tokens, 0.95),
+                "output_tokens_max": max(tokens, default=None),
+            }
+        return profiles
+
+
+def build_generation_profiles() -> GenerationProfiles:
+    profiles = dict(DEFAULT_GENERATION_PROFILES)
+    for prompt_type, cap in _parse_caps(os.getenv("LLM_MAX_OUTPUT_TOKENS", "")).items():
+        if prompt_type in profiles:
+            profiles[prompt_type] = replace(profiles[prompt_type], max_output_tokens=cap)
+        else:
+            logger.warning(f"Ignoring output token cap for unknown prompt type '{prompt_type}'")
+    return GenerationProfiles(profiles)
@@ -0,0 +1,149 @@
+import os
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+
+from services.llm_backends import LlmBackend, LlmResult
+
+logger = logging.getLogger(__name__)
+
+# Jenis prompt; model, latensi, hedging dan statistik dicatat per jenis
+PROMPT_GENERIC = "generic"
+PROMPT_SUMMARY = "summary"
+PROMPT_VIRAL_EXPLANATION = "viral_explanation"
+PROMPT_CONTENT_IDEA = "content_idea"
+PROMPT_DOCUMENT_SUMMARY = "document_summary"
+PROMPT_DOCUMENT_SECTION_NOTES = "document_section_notes"
+PROMPT_DOCUMENT_STRENGTHS = "document_strengths_weaknesses"
+PROMPT_DOCUMENT_QUESTIONS = "document_questions"
+PROMPT_DOCUMENT_RECOMMENDATIONS = "document_recommendations"
+PROMPT_DOCUMENT_NUMERICAL = "document_numerical"
+
+TIER_FAST = "fast"
+TIER_STANDARD = "standard"
+
+# Tugas pendek dan sederhana ke model termurah/tercepat; penalaran dan JSON panjang ke model standar
+DEFAULT_PROMPT_TIERS = {
+    PROMPT_GENERIC: TIER_STANDARD,
+    PROMPT_SUMMARY: TIER_FAST,
+    PROMPT_VIRAL_EXPLANATION: TIER_STANDARD,
+    PROMPT_CONTENT_IDEA: TIER_STANDARD,
+    PROMPT_DOCUMENT_SUMMARY: TIER_STANDARD,
+    PROMPT_DOCUMENT_SECTION_NOTES: TIER_FAST,
+    PROMPT_DOCUMENT_STRENGTHS: TIER_FAST,
+    PROMPT_DOCUMENT_QUESTIONS: TIER_FAST,
+    PROMPT_DOCUMENT_RECOMMENDATIONS: TIER_FAST,
+    PROMPT_DOCUMENT_NUMERICAL: TIER_STANDARD,
+}
+LATENCY_SAMPLES = 500
+
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    backend: str
+    model: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.backend}:{self.model}"
+
+
+@dataclass
+class _RouteStats:
+    calls: int = 0
+    errors: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+
+def _parse_route(tier: str, spec: str) -> Route:
+    """Parse "backend:model"."""
+    backend, _, model = spec.partition(":")
+    return Route(tier, backend.strip(), model.strip() or "default")
+
+
+def _parse_prompt_tiers(spec: str) -> Dict[str, str]:
+    """Parse "prompt_type=tier,prompt_type=tier"."""
+    tiers = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prompt_type, _, tier = item.partition("=")
+        tiers[prompt_type.strip()] = tier.strip()
+    return tiers
+
+
+class ModelRouter:
+    """
+    Maps each prompt type to a model tier and each tier to a backend and
+    model. A tier whose backend is not configured falls back to the standard
+    tier. Routing decisions, latency and token usage are recorded per
+    backend and model.
+    """
+
+    def __init__(self, backends: Dict[str, LlmBackend], tiers: Dict[str, Route], prompt_tiers: Dict[str, str]):
+        self.backends = backends
+        self.tiers = tiers
+        self.prompt_tiers = prompt_tiers
+        self._decisions: Dict[str, Counter] = {}
+        self._routes: Dict[str, _RouteStats] = {}
+
+    def _usable(self, route: Optional[Route]) -> bool:
+        return route is not None and route.backend in self.backends and self.backends[route.backend].available
+
+    @property
+    def available(self) -> bool:
+        """True when the standard tier has a configured backend."""
+        return self._usable(self.tiers.get(TIER_STANDARD))
+
+    def route(self, prompt_type: str) -> Route:
+        route = self.tiers.get(self.prompt_tiers.get(prompt_type, TIER_STANDARD))
+        if not self._usable(route):
+            route = self.tiers[TIER_STANDARD]
+        self._decisions.setdefault(prompt_type, Counter())[route.key] += 1
+        return route
+
+    def backend(self, route: Route) -> LlmBackend:
+        return self.backends[route.backend]
+
+    def record(self, route: Route, latency: float, result: Optional[LlmResult] = None) -> None:
+        """Record a finished call; without a result the call failed."""
+        stats = self._routes.setdefault(route.key, _RouteStats())
+        stats.calls += 1
+        stats.latencies.append(latency)
+        if result is None:
+            stats.errors += 1
+        else:
+            stats.prompt_tokens += result.prompt_tokens
+            stats.output_tokens += result.output_tokens
+
+    def stats(self) -> Dict:
+        backends = {}
+        for key, stats in self._routes.items():
+            ordered = sorted(stats.latencies)
+            backends[key] = {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "prompt_tokens": stats.prompt_tokens,
+                "output_tokens": stats.output_tokens,
+                "latency_p50_ms": round(ordered[len(ordered) // 2] * 1000) if ordered else None,
+                "latency_p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000) if ordered else None,
+            }
+        return {
+            "tiers": {tier: route.key for tier, route in self.tiers.items()},
+            "routes": {prompt_type: dict(counter) for prompt_type, counter in self._decisions.items()},
+            "backends": backends,
+        }
+
+
+def build_model_router(backends: Dict[str, LlmBackend]) -> ModelRouter:
+    tiers = {
+        TIER_FAST: _parse_route(TIER_FAST, os.getenv("LLM_TIER_FAST", "gemini:gemini-1.5-flash-8b")),
+        TIER_STANDARD: _parse_route(TIER_STANDARD, os.getenv("LLM_TIER_STANDARD", "gemini:gemini-1.5-flash")),
+    }
+    for route in tiers.values():
+        if route.backend not in backends:
+            logger.error(f"Unknown LLM backend '{route.backend}' for the {route.tier} tier")
+    prompt_tiers = dict(DEFAULT_PROMPT_TIERS, **_parse_prompt_tiers(os.getenv("LLM_PROMPT_TIERS", "")))
+    return ModelRouter(backends, tiers, prompt_tiers)
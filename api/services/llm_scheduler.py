@@ -0,0 +1,207 @@
+import os
+import time
+import heapq
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+ANONYMOUS_TENANT = "anonymous"
+
+# Bobot kelas prioritas: dengan antrean penuh, panggilan interaktif mendapat slot 8x lebih sering dari batch
+PRIORITY_WEIGHTS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("LLM_INTERACTIVE_WEIGHT", "8")),
+    PRIORITY_BATCH: float(os.getenv("LLM_BATCH_WEIGHT", "1")),
+}
+WAIT_SAMPLES = 500  # Recent wait times kept per flow for the percentiles
+# Flow yang tidak dipakai selama ini dihapus (statistiknya ikut hilang)
+FLOW_IDLE_SECONDS = float(os.getenv("LLM_FLOW_IDLE_SECONDS", "600"))
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "tenant=weight,tenant=weight"."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tenant, _, weight = item.partition("=")
+        try:
+            weights[tenant.strip()] = float(weight)
+        except ValueError:
+            logger.warning(f"Ignoring invalid LLM tenant weight '{item}'")
+    return weights
+
+
+# Hanya tenant yang terdaftar di sini yang mendapat flow sendiri
+TENANT_WEIGHTS = _parse_weights(os.getenv("LLM_TENANT_WEIGHTS", ""))
+
+
+def tenant_id(api_key: Optional[str]) -> str:
+    """
+    Tenant of an API key: the first 12 hex digits of its SHA-256, so the key
+    itself never appears in logs or metrics. The header is not authenticated,
+    so keys of tenants that are not configured in LLM_TENANT_WEIGHTS count as
+    anonymous; otherwise any client could claim extra shares with new keys.
+    """
+    if not api_key:
+        return ANONYMOUS_TENANT
+    tenant = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return tenant if tenant in TENANT_WEIGHTS else ANONYMOUS_TENANT
+
+
+@dataclass(frozen=True)
+class Caller:
+    tenant: str = ANONYMOUS_TENANT
+    priority: str = PRIORITY_INTERACTIVE
+
+
+_caller: ContextVar[Caller] = ContextVar("llm_caller", default=Caller())
+
+
+@contextmanager
+def caller_scope(tenant: Optional[str] = None, priority: Optional[str] = None) -> Iterator[Caller]:
+    """Attribute the LLM calls made in the block (and in tasks it starts) to a tenant and priority class."""
+    current = _caller.get()
+    caller = Caller(tenant or current.tenant, priority if priority in PRIORITIES else current.priority)
+    token = _caller.set(caller)
+    try:
+        yield caller
+    finally:
+        _caller.reset(token)
+
+
+def current_caller() -> Caller:
+    return _caller.get()
+
+
+@dataclass
+class _Flow:
+    weight: float
+    last_finish: float = 0.0
+    queued: int = 0
+    served: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+    # Panggilan yang sedang antre atau memegang slot, dan kapan flow terakhir dipakai
+    active: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class LlmScheduler:
+    """
+    Weighted fair queuing of LLM calls in front of a fixed number of slots.
+
+    Every (tenant, priority) pair is a flow with weight tenant weight x
+    priority weight. A waiting call gets a start tag max(virtual time, the
+    flow's last finish tag) and a finish tag start + cost / weight; free slots
+    go to the smallest start tag (start-time fair queuing). A tenant
+    submitting many calls only delays its own flow, and batch calls yield to
+    interactive ones. Only the queue order is affected: calls that already
+    hold a slot run to completion. Flows idle for FLOW_IDLE_SECONDS are
+    dropped, together with their statistics.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._sequence = 0
+        self._heap: List[Tuple[float, int, "asyncio.Future[None]", _Flow]] = []
+        self._flows: Dict[Tuple[str, str], _Flow] = {}
+
+    def _flow(self, caller: Caller) -> _Flow:
+        key = (caller.tenant, caller.priority)
+        flow = self._flows.get(key)
+        if flow is None:
+            self._evict_idle()
+            weight = TENANT_WEIGHTS.get(caller.tenant, 1.0) * PRIORITY_WEIGHTS[caller.priority]
+            flow = self._flows[key] = _Flow(weight=weight)
+        return flow
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, flow in self._flows.items()
+                    if not flow.active and now - flow.last_used > FLOW_IDLE_SECONDS]:
+            del self._flows[key]
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self.capacity and self._heap:
+            start, _, waiter, flow = heapq.heappop(self._heap)
+            flow.queued -= 1
+            if waiter.done():
+                # Pemanggil sudah menyerah (dibatalkan/deadline)
+                continue
+            self._virtual_time = max(self._virtual_time, start)
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 1.0) -> AsyncIterator[None]:
+        """Wait for a slot in fair-queuing order and hold it for the duration of the block."""
+        flow = self._flow(current_caller())
+        queued_at = time.monotonic()
+        flow.active += 1
+        try:
+            if self._in_flight < self.capacity and not self._heap:
+                self._in_flight += 1
+                flow.last_finish = max(self._virtual_time, flow.last_finish)
+            else:
+                start = max(self._virtual_time, flow.last_finish)
+                flow.last_finish = start + max(cost, 0.01) / flow.weight
+                waiter = asyncio.get_running_loop().create_future()
+                self._sequence += 1
+                heapq.heappush(self._heap, (start, self._sequence, waiter, flow))
+                flow.queued += 1
+                try:
+                    await waiter
+                except BaseException:
+                    if waiter.done() and not waiter.cancelled():
+                        # Slot sudah diberikan tepat saat dibatalkan
+                        self._in_flight -= 1
+                        self._dispatch()
+                    else:
+                        waiter.cancel()
+                    raise
+
+            flow.served += 1
+            flow.waits.append(time.monotonic() - queued_at)
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+                self._dispatch()
+        finally:
+            flow.active -= 1
+            flow.last_used = time.monotonic()
+
+    @staticmethod
+    def _percentile(samples: List[float], percentile: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+    def stats(self) -> Dict:
+        tenants: Dict[str, Dict] = {}
+        for (tenant, priority), flow in self._flows.items():
+            waits = list(flow.waits)
+            tenants.setdefault(tenant, {})[priority] = {
+                "weight": flow.weight,
+                "queued": flow.queued,
+                "served": flow.served,
+                "wait_p50_ms": round(self._percentile(waits, 0.5) * 1000, 1),
+                "wait_p95_ms": round(self._percentile(waits, 0.95) * 1000, 1),
+                "wait_max_ms": round(max(waits, default=0.0) * 1000, 1),
+            }
+        return {
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "queued": len(self._heap),
+            "tenants": tenants,
+        }
@@ -0,0 +1,157 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCALES = {
+    "k": 1e3, "thousand": 1e3,
+    "m": 1e6, "mn": 1e6, "million": 1e6,
+    "b": 1e9, "bn": 1e9, "billion": 1e9,
+}
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+# Satu regex dengan grup bernama: setiap token angka diklasifikasikan dalam satu kali lintasan.
+# Urutan alternatif penting: mata uang dan persen dicoba sebelum tahun dan angka biasa.
+_NUMERIC_TOKEN = re.compile(
+    rf"""
+    (?P<currency>(?P<symbol>[$€£])\s?(?P<amount>{_NUMBER})(?:\s?(?P<scale>thousand|million|billion|bn|mn|[kKmMbB])\b)?)
+    |(?P<percent>(?<![\w.])(?P<sign>[-+])?(?P<ratio>{_NUMBER})\s?%)
+    |(?P<year>(?<![\w.,])(?:19|20)\d{{2}}(?![\w%]|[.,]\d))
+    |(?P<plain>(?<![\w.,])(?:{_NUMBER})(?![\w%]|[.,]\d))
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+
+@dataclass
+class NumericTokens:
+    """Numeric tokens of a text, classified into typed arrays (in document order)."""
+    plain: np.ndarray
+    percent: np.ndarray
+    currency: np.ndarray
+    years: np.ndarray
+    percent_text: List[str] = field(default_factory=list)
+    currency_text: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return int(self.plain.size + self.percent.size + self.currency.size + self.years.size)
+
+
+def _to_float(number: str) -> float:
+    return float(number.replace(",", ""))
+
+
+def tokenize_numbers(content: str) -> NumericTokens:
+    """Classify every numeric token (plain, percent, currency with k/M/B suffixes, year) in one pass."""
+    plain: List[float] = []
+    percent: List[float] = []
+    currency: List[float] = []
+    years: List[int] = []
+    percent_text: List[str] = []
+    currency_text: List[str] = []
+
+    for match in _NUMERIC_TOKEN.finditer(content):
+        if match.group("currency"):
+            scale = _SCALES.get((match.group("scale") or "").lower(), 1.0)
+            currency.append(_to_float(match.group("amount")) * scale)
+            currency_text.append(match.group("currency"))
+        elif match.group("percent"):
+            value = _to_float(match.group("ratio"))
+            percent.append(-value if match.group("sign") == "-" else value)
+            percent_text.append(match.group("percent").replace(" ", ""))
+        elif match.group("year"):
+            years.append(int(match.group("year")))
+        else:
+            plain.append(_to_float(match.group("plain")))
+
+    return NumericTokens(
+        plain=np.asarray(plain, dtype=np.float64),
+        percent=np.asarray(percent, dtype=np.float64),
+        currency=np.asarray(currency, dtype=np.float64),
+        years=np.asarray(years, dtype=np.int32),
+        percent_text=percent_text,
+        currency_text=currency_text,
+    )
+
+
+def describe(values: np.ndarray) -> Optional[Dict]:
+    """Descriptive statistics, IQR outliers and the trend across the document order."""
+    if values.size == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    stats = {
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "median": float(median),
+        "std": float(values.std()),
+        "outliers": [],
+        "trend": "n/a",
+    }
+    if values.size >= 4:
+        iqr = q3 - q1
+        mask = (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+        stats["outliers"] = [float(v) for v in np.unique(values[mask])[:10]]
+    if values.size >= 3 and np.ptp(values) > 0:
+        # Kemiringan regresi linear terhadap urutan kemunculan, relatif terhadap rentang nilai
+        slope = np.polyfit(np.arange(values.size, dtype=np.float64), values, 1)[0]
+        relative = slope * (values.size - 1) / np.ptp(values)
+        stats["trend"] = "increasing" if relative > 0.25 else "decreasing" if relative < -0.25 else "flat"
+    return stats
+
+
+def numeric_statistics(tokens: NumericTokens) -> Dict:
+    statistics = {
+        "plain": describe(tokens.plain),
+        "percent": describe(tokens.percent),
+        "currency": describe(tokens.currency),
+        "years": None,
+    }
+    if tokens.years.size:
+        unique_years, counts = np.unique(tokens.years, return_counts=True)
+        most_cited = unique_years[np.argsort(-counts, kind="stable")[:3]]
+        statistics["years"] = {
+            "count": int(tokens.years.size),
+            "first": int(unique_years[0]),
+            "last": int(unique_years[-1]),
+            "most_cited": [int(year) for year in most_cited],
+        }
+    return statistics
+
+
+def _format(value: float) -> str:
+    magnitude = abs(value)
+    for suffix, scale in (("B", 1e9), ("M", 1e6), ("k", 1e3)):
+        if magnitude >= scale:
+            return f"{value / scale:.3g}{suffix}"
+    return f"{value:.4g}"
+
+
+def numeric_digest(statistics: Dict) -> str:
+    """Compact text digest of the statistics for the LLM prompt."""
+    lines = []
+    for kind, unit in (("currency", "currency amounts"), ("percent", "percentages"), ("plain", "other numbers")):
+        stats = statistics.get(kind)
+        if not stats:
+            continue
+        suffix = "%" if kind == "percent" else ""
+        line = (
+            f"- {stats['count']} {unit}: min {_format(stats['min'])}{suffix}, median {_format(stats['median'])}{suffix}, "
+            f"mean {_format(stats['mean'])}{suffix}, max {_format(stats['max'])}{suffix}, trend {stats['trend']}"
+        )
+        if stats["outliers"]:
+            line += f", outliers {', '.join(_format(v) + suffix for v in stats['outliers'][:5])}"
+        lines.append(line)
+    years = statistics.get("years")
+    if years:
+        lines.append(
+            f"- {years['count']} year references from {years['first']} to {years['last']}, "
+            f"most cited: {', '.join(str(y) for y in years['most_cited'])}"
+        )
+    return "\n".join(lines)
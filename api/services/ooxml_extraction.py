@@ -0,0 +1,287 @@
+import logging
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+# Elemen isi run yang dihitung python-docx sebagai teks
+_RUN_CONTENT = {f"{W}t", f"{W}tab", f"{W}ptab", f"{W}br", f"{W}cr", f"{W}noBreakHyphen"}
+
+
+class OoxmlExtractionError(Exception):
+    """Raised when a file does not have the layout the streaming extractor expects."""
+    pass
+
+
+def _rels_path(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _read_relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Dict[str, str]]:
+    """Map relationship ID -> {type, target} for a part, with targets resolved to archive paths."""
+    try:
+        root = ET.fromstring(archive.read(_rels_path(part)))
+    except KeyError:
+        return {}
+    base = posixpath.dirname(part)
+    relationships = {}
+    for rel in root.iter(f"{PKG_REL}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        resolved = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        relationships[rel.get("Id")] = {"type": rel.get("Type", ""), "target": resolved}
+    return relationships
+
+
+def _main_part(archive: zipfile.ZipFile, default: str) -> str:
+    for rel in _read_relationships(archive, "").values():
+        if rel["type"] == OFFICE_DOCUMENT_REL:
+            return rel["target"]
+    return default
+
+
+def _open_archive(stream: BinaryIO) -> zipfile.ZipFile:
+    stream.seek(0)
+    try:
+        return zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as e:
+        raise OoxmlExtractionError(f"Not a valid OOXML package: {e}")
+
+
+def iter_docx_chunks(stream: BinaryIO) -> Iterator[str]:
+    """
+    Stream the text of a .docx body with an incremental XML parser.
+
+    Output matches the python-docx based extractor: body paragraphs first
+    (one per line), then each top-level table as " | "-joined rows. Only
+    the text runs are collected and finished elements are discarded
+    immediately, so memory stays flat even for very large documents.
+    """
+    with _open_archive(stream) as archive:
+        part = _main_part(archive, "word/document.xml")
+        if part not in archive.namelist():
+            raise OoxmlExtractionError(f"Missing main document part '{part}'")
+
+        tables: List[str] = []
+        with archive.open(part) as xml:
+            yield from _iter_word_body(xml, tables)
+        # python-docx menaruh semua tabel setelah paragraf, urutan yang sama dipertahankan
+        yield from tables
+
+
+def _iter_word_body(xml: BinaryIO, tables: List[str]) -> Iterator[str]:
+    elements: List[ET.Element] = []
+    paragraph_buffers: List[Optional[List[str]]] = []
+    table_depth = 0
+    table_rows: List[str] = []
+    row_cells: List[str] = []
+    cell_paragraphs: List[str] = []
+    previous_row_grid: List[str] = []
+    row_grid: List[str] = []
+    cell_span = 1
+    cell_continues_merge = False
+    body_seen = False
+
+    for event, elem in ET.iterparse(xml, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            parent = elements[-1].tag if elements else None
+            elements.append(elem)
+            if tag == f"{W}body":
+                body_seen = True
+            elif tag == f"{W}p":
+                # Hanya paragraf body dan paragraf langsung di sel tabel level atas yang dihitung
+                tracked = parent == f"{W}body" or (parent == f"{W}tc" and table_depth == 1)
+                paragraph_buffers.append([] if tracked else None)
+            elif tag == f"{W}tbl":
+                table_depth += 1
+                if table_depth == 1:
+                    table_rows = []
+                    previous_row_grid = []
+            elif tag == f"{W}tr" and table_depth == 1:
+                row_cells = []
+                row_grid = []
+            elif tag == f"{W}tc" and table_depth == 1:
+                cell_paragraphs = []
+                cell_span = 1
+                cell_continues_merge = False
+            continue
+
+        elements.pop()
+        if tag in _RUN_CONTENT:
+            if paragraph_buffers and paragraph_buffers[-1] is not None and _is_paragraph_run_content(elements):
+                paragraph_buffers[-1].append(_run_content_text(elem))
+        elif tag == f"{W}gridBefore" and table_depth == 1:
+            # Kolom grid kosong di awal baris tetap dihitung untuk posisi merge vertikal
+            row_grid.extend([""] * int(elem.get(f"{W}val", "0") or 0))
+        elif tag == f"{W}gridSpan" and table_depth == 1:
+            cell_span = int(elem.get(f"{W}val", "1") or 1)
+        elif tag == f"{W}vMerge" and table_depth == 1:
+            cell_continues_merge = elem.get(f"{W}val", "continue") == "continue"
+        elif tag == f"{W}p":
+            buffer = paragraph_buffers.pop()
+            if buffer is not None:
+                text = "".join(buffer)
+                if table_depth == 0:
+                    if text.strip():
+                        yield text + "\n"
+                else:
+                    cell_paragraphs.append(text)
+            _discard(elem, elements)
+        elif tag == f"{W}tc" and table_depth == 1:
+            column = len(row_grid)
+            if cell_continues_merge and column < len(previous_row_grid):
+                # Sel lanjutan merge vertikal memakai teks sel di atasnya, seperti python-docx
+                text = previous_row_grid[column]
+            else:
+                text = "\n".join(cell_paragraphs)
+            for _ in range(cell_span):
+                row_grid.append(text)
+                if text.strip():
+                    row_cells.append(text.strip())
+        elif tag == f"{W}tr" and table_depth == 1:
+            previous_row_grid = row_grid
+            if row_cells:
+                table_rows.append(" | ".join(row_cells) + "\n")
+        elif tag == f"{W}tbl":
+            table_depth -= 1
+            if table_depth == 0:
+                tables.append("\n--- Table Content ---\n" + "".join(table_rows))
+                _discard(elem, elements)
+
+    if not body_seen:
+        raise OoxmlExtractionError("Document part has no body")
+
+
+def _is_paragraph_run_content(elements: List[ET.Element]) -> bool:
+    """True for run content python-docx counts: w:p/w:r/* or w:p/w:hyperlink/w:r/*."""
+    if len(elements) < 2 or elements[-1].tag != f"{W}r":
+        return False
+    if elements[-2].tag == f"{W}p":
+        return True
+    return len(elements) >= 3 and elements[-2].tag == f"{W}hyperlink" and elements[-3].tag == f"{W}p"
+
+
+def _run_content_text(elem: ET.Element) -> str:
+    if elem.tag == f"{W}t":
+        return elem.text or ""
+    if elem.tag in (f"{W}tab", f"{W}ptab"):
+        return "\t"
+    if elem.tag == f"{W}br":
+        # Hanya line break biasa yang menjadi baris baru; page/column break diabaikan
+        return "\n" if elem.get(f"{W}type", "textWrapping") == "textWrapping" else ""
+    if elem.tag == f"{W}cr":
+        return "\n"
+    return "-"
+
+
+def _discard(elem: ET.Element, elements: List[ET.Element]) -> None:
+    """Free a finished element so the parsed tree never grows."""
+    elem.clear()
+    if elements:
+        try:
+            elements[-1].remove(elem)
+        except ValueError:
+            pass
+
+
+def _slide_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order."""
+    presentation_part = _main_part(archive, "ppt/presentation.xml")
+    relationships = _read_relationships(archive, presentation_part)
+    try:
+        presentation = ET.fromstring(archive.read(presentation_part))
+    except KeyError:
+        raise OoxmlExtractionError(f"Missing presentation part '{presentation_part}'")
+
+    slides = []
+    for slide_id in presentation.iter(f"{P}sldId"):
+        rel = relationships.get(slide_id.get(f"{R}id"))
+        if rel is None or rel["target"] not in archive.namelist():
+            raise OoxmlExtractionError("Slide list references a missing slide part")
+        slides.append(rel["target"])
+    return slides
+
+
+def iter_pptx_chunks(stream: BinaryIO) -> Iterator[str]:
+    """
+    Stream the text of a .pptx deck slide by slide with an incremental XML
+    parser. Output matches the python-pptx based extractor: one chunk per
+    slide with the text of each top-level shape and " | "-joined table rows.
+    """
+    with _open_archive(stream) as archive:
+        for slide_num, part in enumerate(_slide_parts(archive), 1):
+            with archive.open(part) as xml:
+                yield f"\n--- Slide {slide_num} ---\n" + "".join(_iter_slide_text(xml))
+
+
+def _iter_slide_text(xml: BinaryIO) -> Iterator[str]:
+    elements: List[ET.Element] = []
+    shape_paragraphs: Optional[List[str]] = None
+    paragraph: List[str] = []
+    table_depth = 0
+    in_top_level_frame = False
+    row_cells: List[str] = []
+    cell_paragraphs: List[str] = []
+
+    for event, elem in ET.iterparse(xml, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            parent = elements[-1].tag if elements else None
+            elements.append(elem)
+            if tag == f"{P}sp" and parent == f"{P}spTree":
+                shape_paragraphs = []
+            elif tag == f"{P}graphicFrame" and parent == f"{P}spTree":
+                in_top_level_frame = True
+            elif tag == f"{A}p":
+                paragraph = []
+            elif tag == f"{A}tbl":
+                table_depth += 1
+            elif tag == f"{A}tr":
+                row_cells = []
+            elif tag == f"{A}tc":
+                cell_paragraphs = []
+            continue
+
+        elements.pop()
+        if tag == f"{A}t":
+            if elem.text:
+                paragraph.append(elem.text)
+        elif tag == f"{A}br":
+            paragraph.append("\v")
+        elif tag == f"{A}p":
+            text = "".join(paragraph)
+            if table_depth:
+                cell_paragraphs.append(text)
+            elif shape_paragraphs is not None:
+                shape_paragraphs.append(text)
+        elif tag == f"{A}tc":
+            cell_text = "\n".join(cell_paragraphs).strip()
+            if cell_text:
+                row_cells.append(cell_text)
+        elif tag == f"{A}tr":
+            if row_cells and in_top_level_frame:
+                yield " | ".join(row_cells) + "\n"
+        elif tag == f"{A}tbl":
+            table_depth -= 1
+        elif tag == f"{P}sp" and shape_paragraphs is not None and (not elements or elements[-1].tag == f"{P}spTree"):
+            shape_text = "\n".join(shape_paragraphs)
+            if shape_text.strip():
+                yield shape_text + "\n"
+            shape_paragraphs = None
+            _discard(elem, elements)
+        elif tag == f"{P}graphicFrame" and elements and elements[-1].tag == f"{P}spTree":
+            in_top_level_frame = False
+            _discard(elem, elements)
@@ -0,0 +1,170 @@
+import os
+import math
+import signal
+import asyncio
+import logging
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, List, Optional, Tuple
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+
+class PageTimeoutError(Exception):
+    """Raised inside a worker when a single page takes too long to extract."""
+    pass
+
+
+@contextmanager
+def _page_timeout(seconds: Optional[float]):
+    """
+    Abort the wrapped block after `seconds` using SIGALRM. Only available on
+    Unix in the main thread of a process, which is where pool workers run
+    their tasks; elsewhere the block simply runs without a limit.
+    """
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _on_timeout(signum, frame):
+        raise PageTimeoutError()
+
+    previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+# Reader milik worker ini untuk dokumen terakhir: batch berikutnya dari dokumen yang sama tidak mem-parse ulang PDF
+_worker_reader: Tuple[Optional[str], Optional[PyPDF2.PdfReader]] = (None, None)
+
+
+def _open_reader(pdf_path: str) -> PyPDF2.PdfReader:
+    global _worker_reader
+    path, reader = _worker_reader
+    if path != pdf_path or reader is None:
+        reader = PyPDF2.PdfReader(pdf_path)
+        _worker_reader = (pdf_path, reader)
+    return reader
+
+
+def _drop_reader() -> None:
+    global _worker_reader
+    _worker_reader = (None, None)
+
+
+def _count_pages(pdf_path: str) -> int:
+    return len(_open_reader(pdf_path).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int, page_timeout: Optional[float]) -> List[Tuple[int, str]]:
+    """Extract pages [start, end) of a PDF. Runs inside a worker process."""
+    pages = []
+    for page_index in range(start, end):
+        page_text = ""
+        try:
+            reader = _open_reader(pdf_path)
+            with _page_timeout(page_timeout):
+                page_text = reader.pages[page_index].extract_text() or ""
+        except PageTimeoutError:
+            logger.warning(f"Page {page_index + 1} exceeded the {page_timeout}s extraction timeout, skipping it")
+            # Interupsi bisa meninggalkan reader dalam keadaan setengah jalan, buka ulang
+            _drop_reader()
+        except Exception as e:
+            logger.warning(f"Could not extract text from page {page_index + 1}: {str(e)}")
+        pages.append((page_index, page_text))
+    return pages
+
+
+def _write_temp_pdf(pdf_bytes: bytes) -> str:
+    # Nama unik per dokumen: reader worker dicocokkan lewat path, path yang dipakai ulang akan memberi teks lama
+    fd, path = tempfile.mkstemp(prefix=f"pdf-{uuid.uuid4().hex}-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf_bytes)
+    return path
+
+
+class PdfExtractionEngine:
+    """
+    Extracts PDF text on a process pool so CPU-heavy `extract_text()` calls
+    neither block the event loop nor stay limited to a single core.
+
+    The page range is split into small batches that run in parallel; results
+    are yielded back in page order. Each page has its own timeout so one
+    pathological page cannot stall the whole document.
+
+    The PDF is written to a temporary file once and the tasks only get its
+    path; each worker keeps the reader of the last document it opened, so the
+    bytes are neither pickled per task nor parsed again for every batch.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, page_timeout: Optional[float] = None,
+                 pages_per_task: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+        self.page_timeout = page_timeout if page_timeout is not None else float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "10"))
+        self.pages_per_task = pages_per_task or int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _batches(self, page_count: int) -> List[Tuple[int, int]]:
+        # Batch kecil agar beban merata antar worker, tapi tidak lebih kecil dari yang diperlukan
+        batch_size = max(1, min(self.pages_per_task, math.ceil(page_count / self.max_workers)))
+        return [(start, min(start + batch_size, page_count)) for start in range(0, page_count, batch_size)]
+
+    async def iter_pages(self, pdf_bytes: bytes) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Yield (page_index, text) in page order. Closing the iterator early
+        cancels the batches that have not started yet.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        pdf_path = await asyncio.to_thread(_write_temp_pdf, pdf_bytes)
+        futures: List[Future] = []
+        try:
+            page_count = await loop.run_in_executor(executor, _count_pages, pdf_path)
+            futures = [
+                executor.submit(_extract_page_range, pdf_path, start, end, self.page_timeout)
+                for start, end in self._batches(page_count)
+            ]
+            for future in futures:
+                for page in await asyncio.wrap_future(future):
+                    yield page
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            # PdfReader membaca seluruh file saat dibuka; batch yang belum mulai sudah dibatalkan
+            os.unlink(pdf_path)
+
+    async def extract_pages(self, pdf_bytes: bytes) -> List[str]:
+        """Extract every page and return the texts in page order."""
+        return [text async for _, text in self.iter_pages(pdf_bytes)]
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+
+pdf_engine = PdfExtractionEngine()
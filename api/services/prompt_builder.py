@@ -0,0 +1,170 @@
+import os
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Dict, Optional, Tuple
+
+from utils.tokens import estimate_tokens, truncate_to_tokens
+from services.llm_router import (
+    PROMPT_GENERIC, PROMPT_SUMMARY, PROMPT_VIRAL_EXPLANATION, PROMPT_CONTENT_IDEA, PROMPT_DOCUMENT_SUMMARY,
+    PROMPT_DOCUMENT_SECTION_NOTES, PROMPT_DOCUMENT_STRENGTHS, PROMPT_DOCUMENT_QUESTIONS,
+    PROMPT_DOCUMENT_RECOMMENDATIONS, PROMPT_DOCUMENT_NUMERICAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Anggaran token input per jenis prompt (teks tetap + semua bagian), setara dengan batas karakter sebelumnya
+DEFAULT_PROMPT_BUDGETS = {
+    PROMPT_GENERIC: 8000,
+    # Transkrip ~3000 karakter
+    PROMPT_SUMMARY: 900,
+    # Judul ~200 dan ringkasan ~800 karakter
+    PROMPT_VIRAL_EXPLANATION: 450,
+    # Ringkasan dan alasan ~600 karakter masing-masing, di samping contoh JSON yang panjang
+    PROMPT_CONTENT_IDEA: 820,
+    # Isi dokumen ~8000 karakter, atau gabungan catatan bagian ~24000 karakter
+    PROMPT_DOCUMENT_SUMMARY: 6400,
+    PROMPT_DOCUMENT_STRENGTHS: 6400,
+    PROMPT_DOCUMENT_QUESTIONS: 6400,
+    PROMPT_DOCUMENT_RECOMMENDATIONS: 6400,
+    PROMPT_DOCUMENT_NUMERICAL: 6400,
+    # Satu bagian dokumen (maksimal 6000 karakter)
+    PROMPT_DOCUMENT_SECTION_NOTES: 1800,
+}
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    """
+    A variable part of a prompt that may be shortened to fit the budget.
+    Sections share the tokens left after the fixed text by weight; a section
+    that needs less than its share passes the rest on to the others.
+    """
+    name: str
+    weight: float = 1.0
+    min_tokens: int = 0
+    max_tokens: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A `str.format` prompt of one prompt type; fields that are not sections are inserted as given."""
+    name: str
+    text: str
+    sections: Tuple[PromptSection, ...]
+
+
+@dataclass(frozen=True)
+class _Layout:
+    overhead: int  # Tokens of the fixed template text
+    fields: Tuple[Tuple[str, str], ...]  # Fields that are not sections, with their format spec
+
+
+@lru_cache(maxsize=None)
+def _layout(template: PromptTemplate) -> _Layout:
+    """Budget math that only depends on the template, computed once per template."""
+    literal, fields = [], []
+    section_names = {section.name for section in template.sections}
+    for text, field_name, spec, _ in Formatter().parse(template.text):
+        literal.append(text)
+        if field_name is not None and field_name not in section_names:
+            fields.append((field_name, spec or ""))
+    return _Layout(estimate_tokens("".join(literal)), tuple(fields))
+
+
+def _allocate(sections: Tuple[PromptSection, ...], needs: Dict[str, int], available: int) -> Dict[str, int]:
+    """Token grant per section: sections that fit their weighted share keep all of it, the rest split what is left."""
+    grants = {}
+    pending = list(sections)
+    while pending:
+        weight = sum(section.weight for section in pending)
+        fits = [section for section in pending
+                if needs[section.name] <= max(section.min_tokens, available * section.weight / weight)]
+        if not fits:
+            break
+        for section in fits:
+            grants[section.name] = needs[section.name]
+            available -= needs[section.name]
+            pending.remove(section)
+    for section in pending:
+        grants[section.name] = max(section.min_tokens, int(available * section.weight / weight))
+    return grants
+
+
+def _parse_budgets(spec: str) -> Dict[str, int]:
+    """Parse "prompt_type=tokens,prompt_type=tokens"."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prompt_type, _, tokens = item.partition("=")
+        try:
+            budgets[prompt_type.strip()] = int(tokens)
+        except ValueError:
+            logger.warning(f"Ignoring invalid prompt budget '{item}'")
+    return budgets
+
+
+@dataclass
+class _BuildStats:
+    builds: int = 0
+    shortened: int = 0
+    prompt_tokens_max: int = 0
+
+
+class PromptBuilder:
+    """
+    Builds prompts within the input token budget of their prompt type.
+    Sections over their grant are cut at a sentence boundary, so prompts stay
+    within cost targets without chopping words or leaving budget unused.
+    """
+
+    def __init__(self, budgets: Dict[str, int]):
+        self.budgets = budgets
+        self._stats: Dict[str, _BuildStats] = {}
+
+    def budget_for(self, prompt_type: str) -> int:
+        return self.budgets.get(prompt_type, self.budgets[PROMPT_GENERIC])
+
+    def build(self, template: PromptTemplate, **values: Any) -> str:
+        layout = _layout(template)
+        fixed = sum(estimate_tokens(format(values[name], spec)) for name, spec in layout.fields)
+        available = self.budget_for(template.name) - layout.overhead - fixed
+
+        texts, tokens, needs = {}, {}, {}
+        for section in template.sections:
+            texts[section.name] = str(values[section.name])
+            tokens[section.name] = estimate_tokens(texts[section.name]) if texts[section.name] else 0
+            needs[section.name] = min(tokens[section.name], section.max_tokens or tokens[section.name])
+
+        grants = _allocate(template.sections, needs, available)
+        shortened = [name for name in texts if tokens[name] > grants[name]]
+        for name in shortened:
+            texts[name] = truncate_to_tokens(texts[name], grants[name])
+
+        stats = self._stats.setdefault(template.name, _BuildStats())
+        stats.builds += 1
+        stats.shortened += bool(shortened)
+        used = sum(min(tokens[name], grants[name]) for name in texts)
+        stats.prompt_tokens_max = max(stats.prompt_tokens_max, layout.overhead + fixed + used)
+        return template.text.format(**dict(values, **texts))
+
+    def stats(self) -> Dict:
+        return {
+            name: {
+                "budget": self.budget_for(name),
+                "builds": stats.builds,
+                "shortened": stats.shortened,
+                "prompt_tokens_max": stats.prompt_tokens_max,
+            }
+            for name, stats in self._stats.items()
+        }
+
+
+def build_prompt_builder() -> PromptBuilder:
+    budgets = dict(DEFAULT_PROMPT_BUDGETS)
+    for prompt_type, budget in _parse_budgets(os.getenv("LLM_PROMPT_BUDGETS", "")).items():
+        if prompt_type in budgets:
+            budgets[prompt_type] = budget
+        else:
+            logger.warning(f"Ignoring prompt budget for unknown prompt type '{prompt_type}'")
+    return PromptBuilder(budgets)
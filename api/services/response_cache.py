@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from utils.disk_store import JsonDiskStore
+
+logger = logging.getLogger(__name__)
+
+CACHE_HIT = "HIT"
+CACHE_STALE = "STALE"
+CACHE_MISS = "MISS"
+
+
+@dataclass
+class CacheLookup:
+    """Result of a cache lookup."""
+    status: str
+    value: Optional[Dict[str, Any]] = None
+    age: int = 0
+
+
+class ResponseCache:
+    """
+    Whole-response cache with stale-while-revalidate semantics.
+
+    Entries younger than `fresh_seconds` are served as HIT. Entries within the
+    following `stale_seconds` are still served (STALE) while the caller
+    refreshes them in the background. The most recently used entries live in
+    memory; entries evicted from memory spill over to a size-bounded disk store.
+    """
+
+    def __init__(
+        self,
+        fresh_seconds: int,
+        stale_seconds: int,
+        max_memory_entries: int,
+        disk_directory: Optional[str] = None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_memory_entries = max_memory_entries
+        self.disk = JsonDiskStore(disk_directory, disk_max_bytes) if disk_directory else None
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._refreshing: Set[str] = set()
+        self.counters = {CACHE_HIT: 0, CACHE_STALE: 0, CACHE_MISS: 0}
+
+    async def get(self, key: str) -> CacheLookup:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        elif self.disk is not None:
+            stored = await asyncio.to_thread(self.disk.get, key)
+            if stored is not None:
+                entry = (stored["stored_at"], stored["value"])
+                await self._remember(key, entry)
+
+        if entry is None:
+            return self._count(CacheLookup(CACHE_MISS))
+
+        stored_at, value = entry
+        age = time.time() - stored_at
+        if age <= self.fresh_seconds:
+            return self._count(CacheLookup(CACHE_HIT, value, int(age)))
+        if age <= self.fresh_seconds + self.stale_seconds:
+            return self._count(CacheLookup(CACHE_STALE, value, int(age)))
+
+        await self.delete(key)
+        return self._count(CacheLookup(CACHE_MISS))
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await self._remember(key, (time.time(), value))
+
+    async def delete(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.delete, key)
+
+    def begin_refresh(self, key: str) -> bool:
+        """Claim the background refresh of `key`; False if one is already running."""
+        if key in self._refreshing:
+            return False
+        self._refreshing.add(key)
+        return True
+
+    def end_refresh(self, key: str) -> None:
+        self._refreshing.discard(key)
+
+    def cache_control(self) -> str:
+        return f"max-age={self.fresh_seconds}, stale-while-revalidate={self.stale_seconds}"
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_entries": len(self._memory),
+            "refreshing": len(self._refreshing),
+            "hits": self.counters[CACHE_HIT],
+            "stale_hits": self.counters[CACHE_STALE],
+            "misses": self.counters[CACHE_MISS],
+        }
+
+    async def _remember(self, key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            evicted_key, (stored_at, value) = self._memory.popitem(last=False)
+            if self.disk is not None:
+                try:
+                    await asyncio.to_thread(self.disk.put, evicted_key, {"stored_at": stored_at, "value": value})
+                except Exception as e:
+                    logger.warning(f"Failed to spill cache entry {evicted_key} to disk: {e}")
+
+    def _count(self, lookup: CacheLookup) -> CacheLookup:
+        self.counters[lookup.status] += 1
+        return lookup
+
+
+analyze_response_cache = ResponseCache(
+    fresh_seconds=int(os.getenv("ANALYZE_CACHE_FRESH_SECONDS", "300")),
+    stale_seconds=int(os.getenv("ANALYZE_CACHE_STALE_SECONDS", "3600")),
+    max_memory_entries=int(os.getenv("ANALYZE_CACHE_MAX_ENTRIES", "256")),
+    disk_directory=os.getenv("ANALYZE_CACHE_DIR", "./.cache/analyze"),
+    disk_max_bytes=int(os.getenv("ANALYZE_CACHE_DISK_MAX_MB", "256")) * 1024 * 1024,
+)
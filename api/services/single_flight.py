@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from utils.deadline import without_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A running computation and the number of callers waiting for it."""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one running computation.
+
+    Every caller awaits the shared task through `asyncio.shield`, so cancelling
+    one caller (e.g. a client disconnect) does not affect the others. The shared
+    task is only cancelled once every caller waiting for it has been cancelled.
+
+    The shared task runs without the request deadline of the caller that
+    started it; each caller bounds its own wait, e.g. with `with_deadline`.
+    It does keep that caller's LLM scheduling scope (tenant and priority),
+    so a caller joining a batch caller's task waits at batch priority.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0
+        self.merged = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(self._detached(factory)))
+            self._calls[key] = call
+            self.started += 1
+            call.task.add_done_callback(lambda task, key=key, call=call: self._forget(key, call))
+        else:
+            self.merged += 1
+            logger.info(f"Joined in-flight computation for {key}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Sebelum task benar-benar selesai dibatalkan, pemanggil baru harus memulai komputasi baru
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+
+    @staticmethod
+    async def _detached(factory: Callable[[], Awaitable[Any]]) -> Any:
+        with without_deadline():
+            return await factory()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Tandai exception sudah diambil agar tidak muncul peringatan jika semua pemanggil batal
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "started": self.started, "merged": self.merged}
@@ -2,106 +2,23 @@
 
 import os
 import re
+import asyncio
 import logging
 import tempfile
 import subprocess
-from typing import Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 
 from openai import OpenAI
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, VideoUnavailable
 
-logger = logging.getLogger(__name__)
-
-class VideoProcessingError(Exception):
-    """Exception khusus untuk kegagalan pemrosesan video yang spesifik."""
-    pass
-
-class TranscriberService:
-    def __init__(self):
-        """Inisialisasi service dan client OpenAI."""
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if openai_api_key:
-            self.openai_client = OpenAI(api_key=openai_api_key, timeout=120.0)
-            logger.info("OpenAI client initialized.")
-        else:
-            self.openai_client = None
-            logger.warning("OPENAI_API_KEY not found. Whisper transcription will not be available.")
-        
-        self.cookies_path = os.getenv("YOUTUBE_COOKIES_PATH", "./cookies.txt")
-
-    def _extract_video_id(self, url: str) -> Optional[str]:
-        """Mengekstrak ID video dari URL YouTube."""
-        patterns = [r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)']
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1).split('&')[0]
-        return None
-
-    async def get_transcript(self, youtube_url: str) -> str:
-        """
-        Mendapatkan transkrip dengan strategi 3 lapis:
-        1. Coba ambil teks/caption resmi (metode tercepat).
-        2. Coba ambil auto-generated captions
-        3. Jika gagal, return mock transcript yang relevan
-        """
-        video_id = self._extract_video_id(youtube_url)
-        if not video_id:
-            raise ValueError("Invalid YouTube URL format.")
-            
-        logger.info(f"Processing video ID: {video_id}")
-
-        # --- LAPISAN 1: Coba Ambil Teks Resmi ---
-        try:
-            logger.info("Layer 1: Attempting to fetch official transcript.")
-            # Try multiple language codes
-            language_codes = ['en', 'id', 'en-US', 'en-GB', 'en-CA', 'en-AU']
-            transcript_list = None
-            
-            for lang in language_codes:
-                try:
-                    transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang])
-                    break
-                except Exception:
-                    continue
-            
-            if transcript_list:
-                transcript_text = " ".join(item.get('text', '') for item in transcript_list)
-                if len(transcript_text.strip()) > 20:
-                    logger.info("Layer 1 Succeeded: Found official transcript.")
-                    return transcript_text.strip()
-        except Exception as e:
-            logger.warning(f"Layer 1 Failed: Could not fetch official transcript ({type(e).__name__}).")
+from utils.deadline import with_deadline, has_time, note_degraded, DeadlineExceeded
 
-        # --- LAPISAN 2: Coba Auto-Generated Captions ---
-        try:
-            logger.info("Layer 2: Attempting to fetch auto-generated captions.")
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-            
-            # Try to find auto-generated transcripts
-            for transcript in transcript_list:
-                if transcript.is_generated:
-                    transcript_data = transcript.fetch()
-                    transcript_text = " ".join(item.get('text', '') for item in transcript_data)
-                    if len(transcript_text.strip()) > 20:
-                        logger.info("Layer 2 Succeeded: Found auto-generated captions.")
-                        return transcript_text.strip()
-        except Exception as e:
-            logger.warning(f"Layer 2 Failed: Could not fetch auto-generated captions ({type(e).__name__}).")
-
-        # --- LAPISAN 3: Generate Content-Aware Mock Transcript ---
-        logger.warning("All transcript methods failed. Generating content-aware mock transcript.")
-        return self._generate_content_aware_mock_transcript(youtube_url, video_id)
+logger = logging.getLogger(__name__)
 
-    def _generate_content_aware_mock_transcript(self, youtube_url: str, video_id: str) -> str:
-        """Generate a more realistic mock transcript based on URL patterns and common content types."""
-        
-        # Try to infer content type from URL or video ID patterns
-        url_lower = youtube_url.lower()
-        
-        if any(keyword in url_lower for keyword in ['tutorial', 'how-to', 'guide', 'learn']):
-            return """
+# Transkrip pengganti (lapisan 3) per jenis konten; tidak pernah disimpan sebagai hasil analisis
+_MOCK_TRANSCRIPTS = {
+    "tutorial": """
             Welcome to this comprehensive tutorial where we'll explore step-by-step techniques and best practices. 
             In this video, I'll walk you through the essential concepts and provide practical examples that you can 
             apply immediately. We'll start with the fundamentals and gradually build up to more advanced strategies.
@@ -116,10 +33,8 @@ class TranscriberService:
             
             Remember to like this video if you found it helpful, and subscribe for more tutorials like this one. 
             Let me know in the comments what topics you'd like me to cover next.
-            """
-        
-        elif any(keyword in url_lower for keyword in ['review', 'comparison', 'vs', 'test']):
-            return """
+            """,
+    "review": """
             Today we're doing an in-depth review and comparison to help you make an informed decision. 
             I've spent considerable time testing and analyzing different options so you don't have to.
             
@@ -137,10 +52,8 @@ class TranscriberService:
             
             What do you think? Share your experiences in the comments below, and let me know if you have 
             any questions about the features we discussed today.
-            """
-        
-        elif any(keyword in url_lower for keyword in ['business', 'marketing', 'strategy', 'growth']):
-            return """
+            """,
+    "business": """
             In today's competitive business landscape, having the right strategy is crucial for success. 
             We'll explore proven methods that successful companies use to drive growth and increase revenue.
             
@@ -157,10 +70,8 @@ class TranscriberService:
             
             Remember, success in business requires consistent effort and continuous learning. Stay adaptable, 
             test new approaches, and always keep your customers' needs at the center of your strategy.
-            """
-        
-        elif any(keyword in url_lower for keyword in ['tech', 'programming', 'coding', 'development']):
-            return """
+            """,
+    "tech": """
             Welcome to this technical deep-dive where we'll explore modern development practices and 
             cutting-edge technologies. Whether you're a beginner or an experienced developer, 
             you'll find valuable insights in this comprehensive overview.
@@ -180,11 +91,8 @@ class TranscriberService:
             Don't forget to check out the resources I've linked in the description. Practice is essential 
             for mastering these concepts, so I encourage you to experiment with the examples and build 
             your own projects using these techniques.
-            """
-        
-        else:
-            # Generic educational/informational content
-            return """
+            """,
+    "generic": """
             Thank you for joining me in this informative session where we'll explore important concepts 
             and practical insights that can make a real difference in your understanding of this topic.
             
@@ -206,7 +114,145 @@ class TranscriberService:
             
             I hope you found this valuable. Please share your thoughts and questions in the comments, 
             and don't forget to subscribe for more content like this.
-            """
+            """,
+}
+_MOCK_TRANSCRIPT_KEYWORDS = (
+    ("tutorial", ('tutorial', 'how-to', 'guide', 'learn')),
+    ("review", ('review', 'comparison', 'vs', 'test')),
+    ("business", ('business', 'marketing', 'strategy', 'growth')),
+    ("tech", ('tech', 'programming', 'coding', 'development')),
+)
+
+
+def is_mock_transcript(transcript: str) -> bool:
+    """Check whether a transcript is the content-aware mock instead of the real captions."""
+    return transcript in _MOCK_TRANSCRIPTS.values()
+
+
+class VideoProcessingError(Exception):
+    """Exception khusus untuk kegagalan pemrosesan video yang spesifik."""
+    pass
+
+class TranscriberService:
+    def __init__(self):
+        """Inisialisasi service dan client OpenAI."""
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if openai_api_key:
+            self.openai_client = OpenAI(api_key=openai_api_key, timeout=120.0)
+            logger.info("OpenAI client initialized.")
+        else:
+            self.openai_client = None
+            logger.warning("OPENAI_API_KEY not found. Whisper transcription will not be available.")
+        
+        self.cookies_path = os.getenv("YOUTUBE_COOKIES_PATH", "./cookies.txt")
+        # Batas waktu per lapisan; dipersingkat lagi oleh sisa deadline request
+        self.layer_timeout = float(os.getenv("TRANSCRIPT_LAYER_TIMEOUT_SECONDS", "15"))
+        # Lapisan 2 dilewati jika sisa deadline kurang dari ini
+        self.layer2_min_seconds = float(os.getenv("TRANSCRIPT_LAYER2_MIN_SECONDS", "5"))
+
+    def _extract_video_id(self, url: str) -> Optional[str]:
+        """Mengekstrak ID video dari URL YouTube."""
+        patterns = [r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)']
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                return match.group(1).split('&')[0]
+        return None
+
+    async def get_transcript(self, youtube_url: str) -> str:
+        """
+        Mendapatkan transkrip dengan strategi 3 lapis:
+        1. Coba ambil teks/caption resmi (metode tercepat).
+        2. Coba ambil auto-generated captions
+        3. Jika gagal, return mock transcript yang relevan
+
+        Lapisan 1 dan 2 berjalan di thread dengan batas waktu dari deadline
+        request; jika sisa waktu tidak cukup, lapisan berikutnya yang lebih
+        murah langsung dipakai.
+        """
+        video_id = self._extract_video_id(youtube_url)
+        if not video_id:
+            raise ValueError("Invalid YouTube URL format.")
+            
+        logger.info(f"Processing video ID: {video_id}")
+
+        # --- LAPISAN 1: Coba Ambil Teks Resmi ---
+        try:
+            logger.info("Layer 1: Attempting to fetch official transcript.")
+            # Try multiple language codes
+            language_codes = ['en', 'id', 'en-US', 'en-GB', 'en-CA', 'en-AU']
+            transcript_list = None
+            
+            transcript_list = await with_deadline(
+                asyncio.to_thread(self._fetch_official_transcript, video_id, language_codes), self.layer_timeout
+            )
+            
+            if transcript_list:
+                transcript_text = " ".join(item.get('text', '') for item in transcript_list)
+                if len(transcript_text.strip()) > 20:
+                    logger.info("Layer 1 Succeeded: Found official transcript.")
+                    return transcript_text.strip()
+        except Exception as e:
+            logger.warning(f"Layer 1 Failed: Could not fetch official transcript ({type(e).__name__}).")
+            if isinstance(e, DeadlineExceeded):
+                note_degraded("transcript")
+
+        # --- LAPISAN 2: Coba Auto-Generated Captions ---
+        if not has_time(self.layer2_min_seconds):
+            logger.warning("Layer 2 skipped: not enough time left in the request deadline.")
+            note_degraded("transcript")
+        else:
+            try:
+                logger.info("Layer 2: Attempting to fetch auto-generated captions.")
+                transcript_text = await with_deadline(
+                    asyncio.to_thread(self._fetch_generated_captions, video_id), self.layer_timeout
+                )
+                if len(transcript_text) > 20:
+                    logger.info("Layer 2 Succeeded: Found auto-generated captions.")
+                    return transcript_text
+            except Exception as e:
+                logger.warning(f"Layer 2 Failed: Could not fetch auto-generated captions ({type(e).__name__}).")
+                if isinstance(e, DeadlineExceeded):
+                    note_degraded("transcript")
+
+        # --- LAPISAN 3: Generate Content-Aware Mock Transcript ---
+        logger.warning("All transcript methods failed. Generating content-aware mock transcript.")
+        return self._generate_content_aware_mock_transcript(youtube_url, video_id)
+
+    @staticmethod
+    def _fetch_official_transcript(video_id: str, language_codes: List[str]) -> Optional[List[Dict]]:
+        """Blocking; try each language in order and return the first transcript found."""
+        for lang in language_codes:
+            try:
+                return YouTubeTranscriptApi.get_transcript(video_id, languages=[lang])
+            except Exception:
+                continue
+        return None
+
+    @staticmethod
+    def _fetch_generated_captions(video_id: str) -> str:
+        """Blocking; return the text of the first auto-generated transcript ('' if none is usable)."""
+        for transcript in YouTubeTranscriptApi.list_transcripts(video_id):
+            if transcript.is_generated:
+                transcript_text = " ".join(item.get('text', '') for item in transcript.fetch()).strip()
+                if len(transcript_text) > 20:
+                    return transcript_text
+        return ""
+
+    def mock_transcript(self, youtube_url: str) -> str:
+        """Lapisan 3 saja: transkrip mock yang relevan, tanpa akses jaringan."""
+        return self._generate_content_aware_mock_transcript(youtube_url, self._extract_video_id(youtube_url))
+
+    def _generate_content_aware_mock_transcript(self, youtube_url: str, video_id: str) -> str:
+        """Generate a more realistic mock transcript based on URL patterns and common content types."""
+        
+        # Try to infer content type from URL or video ID patterns
+        url_lower = youtube_url.lower()
+        for content_type, keywords in _MOCK_TRANSCRIPT_KEYWORDS:
+            if any(keyword in url_lower for keyword in keywords):
+                return _MOCK_TRANSCRIPTS[content_type]
+        # Generic educational/informational content
+        return _MOCK_TRANSCRIPTS["generic"]
 
     async def _download_and_transcribe_with_yt_dlp(self, youtube_url: str) -> str:
         """Mengunduh audio menggunakan yt-dlp dan mentranskripsikannya dengan Whisper."""
@@ -0,0 +1,341 @@
+import os
+import asyncio
+import math
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from models.schemas import AnalyzeResponse, PartialAnalyzeResponse, ContentRecommendation, VideoMetadata
+from services.analysis_store import IncrementalAnalysisStore, fingerprint
+from services.single_flight import SingleFlight
+from services.transcriber import TranscriberService, is_mock_transcript
+from services.viral import ViralAnalysisService
+from services.fast_analysis import fast_summary
+from services.gemini_utils import (
+    summarize_transcript, stream_transcript_summary, explain_why_viral, generate_content_idea,
+    is_fallback_summary, _generate_fallback_viral_explanation, _create_fallback_recommendation
+)
+from utils import youtube
+from utils.deadline import with_deadline, has_time, note_degraded, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_STAGES = ("metadata", "transcript", "summary", "viral_explanation", "recommendations", "viral_score")
+STAGE_PENDING = "pending"
+STAGE_RUNNING = "running"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+# Tahapan Gemini memakai strategi lokal jika sisa deadline request kurang dari ini
+LLM_STAGE_MIN_SECONDS = float(os.getenv("DEADLINE_LLM_MIN_SECONDS", "3"))
+
+# Tahapan yang dibutuhkan setiap field respons, termasuk tahapan yang dibaca tahapan lain; tahapan
+# yang tidak dibutuhkan tidak dijalankan. Skor viral memakai transkrip untuk komponen kualitas konten,
+# jadi permintaan skor saja tetap mengambil transkrip, tetapi tanpa panggilan Gemini.
+FIELD_STAGES = {
+    "video_metadata": ("metadata",),
+    "summary": ("metadata", "transcript", "summary"),
+    "timeline_summary": (),
+    "viral_score": ("metadata", "transcript", "viral_score"),
+    "viral_label": ("metadata", "transcript", "viral_score"),
+    "viral_explanation": ("metadata", "transcript", "summary", "viral_explanation"),
+    "recommendations": ("metadata", "transcript", "summary", "viral_explanation", "recommendations"),
+    "doc_summary": (),
+}
+
+
+def is_fallback_explanation(explanation: str, views: int, likes: int) -> bool:
+    return explanation == _generate_fallback_viral_explanation(views, likes)
+
+
+def is_fallback_recommendation(recommendation: ContentRecommendation) -> bool:
+    return recommendation == _create_fallback_recommendation()
+
+
+def has_fallback_output(response: Union[AnalyzeResponse, PartialAnalyzeResponse]) -> bool:
+    """
+    True when a stage of the response fell back to canned output (the same
+    checks that keep those stages out of the incremental store). Such
+    responses are not written to the response cache.
+    """
+    if response.summary is not None and is_fallback_summary(response.summary):
+        return True
+    if response.viral_explanation is not None:
+        metadata = response.video_metadata
+        views = (metadata.view_count if metadata else 0) or 0
+        likes = (metadata.like_count if metadata else 0) or 0
+        if is_fallback_explanation(response.viral_explanation, views, likes):
+            return True
+    return response.recommendations is not None and is_fallback_recommendation(response.recommendations)
+
+
+class VideoNotFoundError(Exception):
+    """Raised when the YouTube URL is invalid or the video does not exist."""
+    pass
+
+
+def get_viral_label(viral_score: int) -> str:
+    """Map a viral score to its label."""
+    if viral_score >= 80:
+        return "Very High Potential"
+    elif viral_score >= 60:
+        return "Good Potential"
+    return "Needs Improvement"
+
+
+def _engagement_tier(views: int, likes: int) -> Dict[str, int]:
+    """
+    Coarse view/like bucket used as the input of the viral explanation.
+    Small statistic changes keep the same tier, so the explanation is reused.
+    """
+    engagement_ratio = (likes / views * 100) if views > 0 else 0
+    if engagement_ratio > 5:
+        engagement_band = 2
+    elif engagement_ratio > 2:
+        engagement_band = 1
+    else:
+        engagement_band = 0
+    return {
+        "views_magnitude": int(math.log10(views)) if views > 0 else 0,
+        "engagement_band": engagement_band,
+    }
+
+
+class VideoAnalysisRun:
+    """
+    One analysis of a YouTube video. Every stage is computed at most once per
+    run and goes through the incremental store, so stages whose inputs did not
+    change since the previous analysis of the same video are reused. Concurrent
+    runs for the same video share every stage that is still in flight.
+
+    `on_stage(stage, status)` is called when a stage starts running and when
+    it is done or failed, e.g. to report progress of a background job. With
+    `on_summary_delta`, a summary that has to be generated is streamed from
+    Gemini and each piece of text is passed to the callback as it arrives.
+
+    With `fast`, the summary, explanation and recommendations are built
+    locally (extractive summary and fallback templates) without any Gemini
+    call, and they bypass the incremental store. The same local strategy is
+    used for a single stage whose result is not stored yet when the request
+    deadline leaves too little time for a Gemini call, or runs out while
+    waiting for it (the transcript falls back to a mock transcript the same
+    way); such stages are recorded as degraded. Shared computations run
+    without a deadline, so one request's deadline never cuts another's.
+    """
+
+    def __init__(self, pipeline: "VideoAnalysisPipeline", youtube_url: str, video_id: str,
+                 average_view_duration: Optional[int] = None,
+                 on_stage: Optional[Callable[[str, str], None]] = None,
+                 on_summary_delta: Optional[Callable[[str], None]] = None,
+                 fast: bool = False):
+        self.pipeline = pipeline
+        self.youtube_url = youtube_url
+        self.video_id = video_id
+        self.average_view_duration = average_view_duration
+        self.on_stage = on_stage
+        self.on_summary_delta = on_summary_delta
+        self.fast = fast
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+
+    def _memo(self, name: str, compute: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        if name not in self._tasks:
+            self._tasks[name] = asyncio.ensure_future(self._track(name, compute))
+        return self._tasks[name]
+
+    async def _track(self, name: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if self.on_stage is None:
+            return await compute()
+        self.on_stage(name, STAGE_RUNNING)
+        try:
+            result = await compute()
+        except BaseException:
+            self.on_stage(name, STAGE_FAILED)
+            raise
+        self.on_stage(name, STAGE_DONE)
+        return result
+
+    async def _record(self, stage: str, inputs: Dict[str, Any], compute: Callable[[], Awaitable[Any]],
+                      should_store: Optional[Callable[[Any], bool]] = None,
+                      local: Optional[Callable[[], Any]] = None, min_seconds: float = 0.0) -> Any:
+        """
+        Run a stage through the incremental store. Concurrent runs with the
+        same inputs share one computation, which runs without any request
+        deadline; each caller waits for it within its own deadline. With
+        `local`, a caller that has less than `min_seconds` left, or whose
+        deadline runs out while waiting, uses the local strategy instead. The
+        stage is then recorded as degraded in that caller's request only, and
+        the local output is not stored.
+        """
+        flight_key = f"{self.video_id}:{stage}:{fingerprint(inputs)}"
+        degraded = False
+
+        async def run() -> Any:
+            nonlocal degraded
+            if local is not None and not has_time(min_seconds):
+                degraded = True
+                return local()
+            try:
+                return await with_deadline(self.pipeline.single_flight.do(flight_key, compute))
+            except DeadlineExceeded:
+                if local is None:
+                    raise
+                degraded = True
+                return local()
+
+        output = await self.pipeline.store.run_stage(
+            self.video_id, stage, inputs, run,
+            lambda output: not degraded and (should_store is None or should_store(output)),
+        )
+        if degraded:
+            note_degraded(stage)
+        return output
+
+    async def metadata(self) -> VideoMetadata:
+        async def fetch() -> VideoMetadata:
+            video_metadata = await youtube.get_video_metadata(self.youtube_url)
+            if not video_metadata:
+                raise VideoNotFoundError("Invalid YouTube URL or video not found.")
+            return video_metadata
+
+        async def compute() -> VideoMetadata:
+            # Statistik selalu diambil ulang karena inilah yang paling sering berubah
+            return await with_deadline(self.pipeline.single_flight.do(f"{self.video_id}:metadata", fetch))
+        return await self._memo("metadata", compute)
+
+    async def transcript(self) -> str:
+        async def compute() -> str:
+            video_metadata = await self.metadata()
+            return await self._record(
+                "transcript",
+                {"video_id": self.video_id, "duration": video_metadata.duration},
+                lambda: self.pipeline.transcriber.get_transcript(self.youtube_url),
+                # Transkrip cadangan (waktu habis atau mock lapisan 3) tidak disimpan
+                should_store=lambda transcript: not is_mock_transcript(transcript),
+                local=lambda: self.pipeline.transcriber.mock_transcript(self.youtube_url),
+            )
+        return await self._memo("transcript", compute)
+
+    async def summary(self) -> str:
+        async def compute() -> str:
+            transcript = await self.transcript()
+            if self.fast:
+                return fast_summary(transcript)
+            return await self._record(
+                "summary",
+                {"transcript": fingerprint({"text": transcript})},
+                lambda: self._summarize(transcript),
+                should_store=lambda summary: not is_fallback_summary(summary),
+                local=lambda: fast_summary(transcript),
+                min_seconds=LLM_STAGE_MIN_SECONDS,
+            )
+        return await self._memo("summary", compute)
+
+    async def _summarize(self, transcript: str) -> str:
+        if self.on_summary_delta is None:
+            return await summarize_transcript(transcript)
+        return await stream_transcript_summary(transcript, self.on_summary_delta)
+
+    async def viral_explanation(self) -> str:
+        async def compute() -> str:
+            video_metadata, summary = await asyncio.gather(self.metadata(), self.summary())
+            views = video_metadata.view_count or 0
+            likes = video_metadata.like_count or 0
+            if self.fast:
+                return _generate_fallback_viral_explanation(views, likes)
+            return await self._record(
+                "viral_explanation",
+                {"title": video_metadata.title, "summary": summary, **_engagement_tier(views, likes)},
+                lambda: explain_why_viral(video_metadata.title, views, likes, summary),
+                should_store=lambda explanation: not is_fallback_explanation(explanation, views, likes),
+                local=lambda: _generate_fallback_viral_explanation(views, likes),
+                min_seconds=LLM_STAGE_MIN_SECONDS,
+            )
+        return await self._memo("viral_explanation", compute)
+
+    async def recommendations(self) -> ContentRecommendation:
+        async def compute() -> ContentRecommendation:
+            if self.fast:
+                return _create_fallback_recommendation()
+            summary, viral_explanation = await asyncio.gather(self.summary(), self.viral_explanation())
+            return await self._record(
+                "recommendations",
+                {"category": "youtube", "summary": summary, "viral_explanation": viral_explanation},
+                lambda: generate_content_idea("youtube", summary, viral_explanation),
+                should_store=lambda recommendation: not is_fallback_recommendation(recommendation),
+                local=_create_fallback_recommendation,
+                min_seconds=LLM_STAGE_MIN_SECONDS,
+            )
+        return await self._memo("recommendations", compute)
+
+    async def viral_score(self) -> int:
+        async def compute() -> int:
+            # Perhitungan lokal dan murah, selalu dijalankan dengan statistik terbaru
+            video_metadata, transcript = await asyncio.gather(self.metadata(), self.transcript())
+            return await self.pipeline.viral_service.calculate_viral_score(
+                content=transcript,
+                metadata=video_metadata,
+                average_view_duration=self.average_view_duration
+            )
+        return await self._memo("viral_score", compute)
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def build_response(self, fields: Optional[Iterable[str]] = None) -> Union[AnalyzeResponse, PartialAnalyzeResponse]:
+        """
+        Build the response. With `fields`, only the stages those fields need
+        are run (e.g. a viral score never touches Gemini) and a
+        PartialAnalyzeResponse with the other fields left empty is returned.
+        """
+        model = AnalyzeResponse if fields is None else PartialAnalyzeResponse
+        fields = set(FIELD_STAGES if fields is None else fields)
+        stages = sorted({stage for field in fields for stage in FIELD_STAGES[field]}, key=PIPELINE_STAGES.index)
+        try:
+            outputs = dict(zip(stages, await asyncio.gather(*(getattr(self, stage)() for stage in stages))))
+        except BaseException:
+            self.cancel()
+            raise
+
+        values: Dict[str, Any] = {"timeline_summary": []}
+        # Tahapan yang hanya dijalankan sebagai masukan tahapan lain tidak ikut ke respons
+        if "video_metadata" in fields:
+            values["video_metadata"] = outputs["metadata"]
+        if "summary" in fields:
+            values["summary"] = outputs["summary"]
+        if "viral_score" in fields:
+            values["viral_score"] = outputs["viral_score"]
+        if "viral_label" in fields:
+            values["viral_label"] = get_viral_label(outputs["viral_score"])
+        if "viral_explanation" in fields:
+            values["viral_explanation"] = outputs["viral_explanation"]
+        if "recommendations" in fields:
+            values["recommendations"] = outputs["recommendations"]
+        return model(**values)
+
+
+class VideoAnalysisPipeline:
+    """Orchestrates the YouTube analysis stages with incremental re-analysis."""
+
+    def __init__(self, store: Optional[IncrementalAnalysisStore] = None):
+        self.store = store or IncrementalAnalysisStore()
+        self.single_flight = SingleFlight()
+        self.transcriber = TranscriberService()
+        self.viral_service = ViralAnalysisService()
+
+    def start(self, youtube_url: str, average_view_duration: Optional[int] = None,
+              on_stage: Optional[Callable[[str, str], None]] = None,
+              on_summary_delta: Optional[Callable[[str], None]] = None,
+              fast: bool = False) -> VideoAnalysisRun:
+        video_id = youtube.extract_video_id(youtube_url)
+        if not video_id:
+            raise VideoNotFoundError("Invalid YouTube URL or video not found.")
+        return VideoAnalysisRun(self, youtube_url, video_id, average_view_duration, on_stage, on_summary_delta, fast)
+
+    async def analyze(self, youtube_url: str, average_view_duration: Optional[int] = None,
+                      on_stage: Optional[Callable[[str, str], None]] = None,
+                      fields: Optional[Iterable[str]] = None, fast: bool = False) -> Union[AnalyzeResponse, PartialAnalyzeResponse]:
+        run = self.start(youtube_url, average_view_duration, on_stage, fast=fast)
+        return await run.build_response(fields)
+
+
+video_pipeline = VideoAnalysisPipeline()
@@ -0,0 +1,109 @@
+import time
+import asyncio
+
+from services.llm_backends import StubBackend
+from services.llm_hedging import RequestHedger, HEDGE_MIN_SAMPLES
+
+FAST = StubBackend(latency_seconds=0.005)
+SLOW = StubBackend(latency_seconds=0.5)
+
+
+async def _warm_up(hedger: RequestHedger) -> None:
+    # Cukup sampel latensi agar persentil (dan penundaan hedge) berlaku
+    for _ in range(HEDGE_MIN_SAMPLES):
+        await hedger.run("summary", lambda: FAST.generate("prompt", "model"))
+
+
+def _calls(*backends: StubBackend):
+    """A call factory whose n-th invocation uses the n-th backend."""
+    remaining = list(backends)
+    return lambda: remaining.pop(0).generate("prompt", "model")
+
+
+def test_slow_call_is_hedged_after_the_percentile_delay():
+    async def scenario():
+        hedger = RequestHedger(enabled=True, percentile=0.9, budget=0.5)
+        await _warm_up(hedger)
+        started = time.monotonic()
+        result = await hedger.run("summary", _calls(SLOW, FAST))
+        return hedger, result, time.monotonic() - started
+
+    hedger, result, elapsed = asyncio.run(scenario())
+    stats = hedger.stats()["prompt_types"]["summary"]
+    assert result.text.startswith("Stub answer")
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert elapsed < SLOW.latency_seconds / 2
+
+
+def test_losing_call_is_cancelled():
+    cancelled = []
+
+    async def slow_call():
+        try:
+            return await SLOW.generate("prompt", "model")
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        hedger = RequestHedger(enabled=True, percentile=0.9, budget=0.5)
+        await _warm_up(hedger)
+        calls = [slow_call, lambda: FAST.generate("prompt", "model")]
+        await hedger.run("summary", lambda: calls.pop(0)())
+        # Beri kesempatan pembatalan diproses
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+
+
+def test_hedges_stay_within_the_budget():
+    async def scenario():
+        hedger = RequestHedger(enabled=True, percentile=0.9, budget=0.05)
+        await _warm_up(hedger)
+        slow = StubBackend(latency_seconds=0.05)
+        await asyncio.gather(*(hedger.run("summary", lambda: slow.generate("prompt", "model")) for _ in range(40)))
+        return hedger
+
+    hedger = asyncio.run(scenario())
+    stats = hedger.stats()
+    calls = HEDGE_MIN_SAMPLES + 40
+    assert 0 < stats["prompt_types"]["summary"]["hedges"] <= 0.05 * calls
+    assert stats["hedge_rate"] <= 0.05
+
+
+def test_one_failing_copy_does_not_fail_the_call():
+    async def failing_slow_call():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("backend error")
+
+    async def scenario():
+        hedger = RequestHedger(enabled=True, percentile=0.9, budget=0.5)
+        await _warm_up(hedger)
+        calls = [failing_slow_call, lambda: StubBackend(latency_seconds=0.1).generate("prompt", "model")]
+        return await hedger.run("summary", lambda: calls.pop(0)())
+
+    result = asyncio.run(scenario())
+    assert result.text.startswith("Stub answer")
+
+
+def test_queue_wait_for_the_slot_does_not_trigger_a_hedge():
+    async def scenario():
+        hedger = RequestHedger(enabled=True, percentile=0.9, budget=0.5)
+        slot = asyncio.Semaphore(1)
+        for _ in range(HEDGE_MIN_SAMPLES):
+            await hedger.run("summary", lambda: FAST.generate("prompt", "model"), lambda: slot)
+
+        async def hold_slot():
+            async with slot:
+                await asyncio.sleep(0.2)
+
+        holder = asyncio.ensure_future(hold_slot())
+        await asyncio.sleep(0)
+        # Panggilan ini sendiri cepat; hanya antrean slotnya yang lama
+        await hedger.run("summary", lambda: StubBackend().generate("prompt", "model"), lambda: slot)
+        await holder
+        return hedger
+
+    hedger = asyncio.run(scenario())
+    assert hedger.stats()["prompt_types"]["summary"]["hedges"] == 0
@@ -0,0 +1,93 @@
+import json
+
+from utils.json_repair import IncrementalJsonParser, parse_json_lenient
+from services.gemini_utils import (
+    _parse_content_recommendation, CONTENT_IDEA_PARSED, CONTENT_IDEA_REPAIRED, CONTENT_IDEA_FALLBACK,
+)
+
+IDEA = {
+    "title": "Three Habits That Doubled My Focus",
+    "target_audience": "Students and remote workers",
+    "content_style": "Personal story with quick demonstrations",
+    "suggested_structure": {"hook": "Open with the result", "call_to_action": "Ask for their habits"},
+    "pro_tips": ["Keep it under a minute"],
+    "estimated_viral_score": 72,
+    "platform_recommendations": [
+        {"platform": "TikTok", "suitability_score": 80, "reasoning": "Short format", "optimization_tips": ["Captions"]},
+    ],
+}
+
+
+def test_valid_json_is_not_repaired():
+    assert parse_json_lenient('{"a": [1, 2], "b": null}') == ({"a": [1, 2], "b": None}, False)
+
+
+def test_markdown_fence_and_surrounding_prose_are_skipped():
+    text = 'Here is the idea:\n```json\n{"a": 1}\n```\nLet me know if you need more.'
+    assert parse_json_lenient(text)[0] == {"a": 1}
+
+
+def test_trailing_commas_are_dropped():
+    assert parse_json_lenient('{"a": [1, 2,], "b": "c",}') == ({"a": [1, 2], "b": "c"}, True)
+
+
+def test_truncated_string_is_kept_up_to_the_cut():
+    assert parse_json_lenient('{"a": 1, "b": "half a sent') == ({"a": 1, "b": "half a sent"}, True)
+    # Kunci yang terpotong tidak punya nilai dan dibuang
+    assert parse_json_lenient('{"a": 1, "bo') == ({"a": 1}, True)
+
+
+def test_truncated_containers_are_closed_after_the_last_complete_value():
+    assert parse_json_lenient('{"a": {"b": [1, {"c": 2}, ') == ({"a": {"b": [1, {"c": 2}]}}, True)
+    assert parse_json_lenient('{"a": {"b": ') == ({"a": {}}, True)
+
+
+def test_truncated_number_is_dropped():
+    # "12" bisa saja awal dari "1234"
+    assert parse_json_lenient('{"a": 12') == ({}, True)
+    assert parse_json_lenient('[1, 2, 3') == ([1, 2], True)
+    assert parse_json_lenient('{"a": 12}') == ({"a": 12}, False)
+
+
+def test_complete_literal_at_the_cut_is_kept():
+    assert parse_json_lenient('{"a": true') == ({"a": True}, True)
+    assert parse_json_lenient('{"a": nu') == ({}, True)
+
+
+def test_chunked_feed_matches_a_single_feed():
+    text = json.dumps(IDEA)
+    parser = IncrementalJsonParser()
+    for start in range(0, len(text), 7):
+        parser.feed(text[start:start + 7])
+    assert parser.result() == IDEA
+    assert not parser.repaired
+
+
+def test_no_json_gives_none():
+    assert parse_json_lenient("Sorry, I cannot help with that.") == (None, False)
+
+
+def test_content_recommendation_is_parsed():
+    recommendation, outcome = _parse_content_recommendation(json.dumps(IDEA))
+    assert outcome == CONTENT_IDEA_PARSED
+    assert recommendation.title == IDEA["title"]
+
+
+def test_truncated_content_recommendation_keeps_its_core_fields():
+    text = json.dumps(IDEA)
+    recommendation, outcome = _parse_content_recommendation(text[:text.index('"estimated_viral_score"') + 30])
+    assert outcome == CONTENT_IDEA_REPAIRED
+    assert recommendation.title == IDEA["title"]
+    assert recommendation.pro_tips == IDEA["pro_tips"]
+    assert recommendation.platform_recommendations
+
+
+def test_content_recommendation_without_core_fields_falls_back():
+    partial = {name: IDEA[name] for name in ("title", "target_audience", "pro_tips")}
+    recommendation, outcome = _parse_content_recommendation(json.dumps(partial))
+    assert outcome == CONTENT_IDEA_FALLBACK
+    assert recommendation.title != IDEA["title"]
+
+    # Struktur yang tidak valid juga tidak dihitung sebagai field inti dari jawaban
+    invalid = {**IDEA, "suggested_structure": "Hook, body, call to action"}
+    assert _parse_content_recommendation(json.dumps(invalid))[1] == CONTENT_IDEA_FALLBACK
@@ -0,0 +1,30 @@
+import io
+import asyncio
+
+from fastapi import UploadFile
+
+from utils.uploads import ingest_upload, MAX_UPLOAD_BYTES, UPLOAD_SPOOL_BYTES
+
+
+def test_spool_threshold_is_below_upload_limit():
+    assert UPLOAD_SPOOL_BYTES < MAX_UPLOAD_BYTES
+
+
+def test_upload_over_spool_threshold_is_written_to_disk():
+    content = b"x" * 5000
+    upload = asyncio.run(ingest_upload(UploadFile(io.BytesIO(content), filename="a.txt"), chunk_size=1024, spool_bytes=2048))
+    try:
+        assert upload.stream._rolled
+        assert upload.size == len(content)
+        assert upload.read_bytes() == content
+    finally:
+        upload.cleanup()
+
+
+def test_upload_under_spool_threshold_stays_in_memory():
+    upload = asyncio.run(ingest_upload(UploadFile(io.BytesIO(b"small"), filename="a.txt"), spool_bytes=2048))
+    try:
+        assert not upload.stream._rolled
+        assert upload.read_bytes() == b"small"
+    finally:
+        upload.cleanup()
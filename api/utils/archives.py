@@ -0,0 +1,96 @@
+import os
+import hashlib
+import logging
+import zipfile
+import tempfile
+import posixpath
+from typing import BinaryIO, List, Tuple
+
+from utils.uploads import IngestedUpload, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES, UPLOAD_SPOOL_BYTES
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAX_BYTES = int(os.getenv("DOCUMENT_ARCHIVE_MAX_MB", "100")) * 1024 * 1024
+ARCHIVE_MAX_FILES = int(os.getenv("DOCUMENT_BATCH_MAX_FILES", "50"))
+ARCHIVE_MAX_RATIO = 100  # Maximum compression ratio of a member; higher ratios are treated as a zip bomb
+
+
+class ArchiveLimitError(Exception):
+    """Raised when an archive exceeds the file count, size or compression ratio limits."""
+    pass
+
+
+def _is_document_member(info: zipfile.ZipInfo) -> bool:
+    name = info.filename
+    base = posixpath.basename(name)
+    # Lewati folder, metadata macOS, dan file tersembunyi
+    return not info.is_dir() and not name.startswith("__MACOSX/") and bool(base) and not base.startswith(".")
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int) -> IngestedUpload:
+    """Copy one member into a spooled buffer; the limit is enforced on the actual bytes, not the header."""
+    buffer = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with archive.open(info) as member:
+            while True:
+                chunk = member.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ArchiveLimitError(f"'{info.filename}' is larger than {max_bytes // (1024 * 1024)}MB when extracted")
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return IngestedUpload(stream=buffer, size=size, sha256=digest.hexdigest())
+
+
+def extract_archive_documents(
+    stream: BinaryIO,
+    max_files: int = ARCHIVE_MAX_FILES,
+    max_total_bytes: int = ARCHIVE_MAX_BYTES,
+    max_member_bytes: int = MAX_UPLOAD_BYTES,
+    max_ratio: int = ARCHIVE_MAX_RATIO,
+) -> List[Tuple[str, IngestedUpload]]:
+    """
+    Unpack the documents of a zip archive into spooled buffers.
+
+    Zip-bomb protection: the member count, the declared and the actually
+    extracted sizes (per member and in total) and each member's compression
+    ratio are all bounded. Blocking; call it through `asyncio.to_thread`.
+
+    Raises:
+        ArchiveLimitError: One of the limits was exceeded; nothing is returned.
+        zipfile.BadZipFile: The stream is not a valid zip archive.
+    """
+    stream.seek(0)
+    documents: List[Tuple[str, IngestedUpload]] = []
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            members = [info for info in archive.infolist() if _is_document_member(info)]
+            if len(members) > max_files:
+                raise ArchiveLimitError(f"Archive contains {len(members)} files; at most {max_files} are allowed")
+            if sum(info.file_size for info in members) > max_total_bytes:
+                raise ArchiveLimitError(f"Archive expands to more than {max_total_bytes // (1024 * 1024)}MB")
+
+            total = 0
+            for info in members:
+                if info.file_size > max_member_bytes:
+                    raise ArchiveLimitError(f"'{info.filename}' is larger than {max_member_bytes // (1024 * 1024)}MB")
+                if info.compress_size and info.file_size / info.compress_size > max_ratio:
+                    raise ArchiveLimitError(f"'{info.filename}' has a suspicious compression ratio")
+                upload = _read_member(archive, info, min(max_member_bytes, max_total_bytes - total))
+                documents.append((info.filename, upload))
+                total += upload.size
+    except BaseException:
+        for _, upload in documents:
+            upload.cleanup()
+        raise
+
+    logger.info(f"Extracted {len(documents)} documents from archive")
+    return documents
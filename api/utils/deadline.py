@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Awaitable, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+MAX_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_MAX_SECONDS", "300"))
+# Waktu yang disisakan untuk menyusun respons setelah tahapan terakhir
+RESPONSE_RESERVE_SECONDS = 0.25
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the time budget of the current request is used up."""
+    pass
+
+
+@dataclass
+class Deadline:
+    """Time budget of one request; stages that fell back to a cheaper strategy are recorded in `degraded`."""
+    expires_at: float
+    degraded: List[str] = field(default_factory=list)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+# Disalin ke setiap task yang dibuat di dalam request, sehingga semua tahapan melihat deadline yang sama
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """Run the block with a time budget; a nested scope can only shorten the outer deadline."""
+    parent = _current.get()
+    expires_at = time.monotonic() + seconds
+    if parent is not None:
+        expires_at = min(expires_at, parent.expires_at)
+    deadline = Deadline(expires_at, parent.degraded if parent is not None else [])
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def without_deadline() -> Iterator[None]:
+    """Run the block without a time budget, e.g. work shared by requests with different deadlines."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the stages of the current request (None without a deadline)."""
+    deadline = _current.get()
+    if deadline is None:
+        return None
+    return deadline.remaining() - RESPONSE_RESERVE_SECONDS
+
+
+def has_time(seconds: float = 0.0) -> bool:
+    left = remaining()
+    return left is None or left > seconds
+
+
+def timeout_for(cap: Optional[float] = None) -> Optional[float]:
+    """Timeout for one stage: its own cap, shortened to the time left in the request."""
+    left = remaining()
+    if left is None:
+        return cap
+    return left if cap is None else min(cap, left)
+
+
+def note_degraded(stage: str) -> None:
+    """Record that a stage used a cheaper strategy because the budget was tight."""
+    deadline = _current.get()
+    if deadline is not None and stage not in deadline.degraded:
+        deadline.degraded.append(stage)
+        logger.info(f"Stage '{stage}' degraded, {deadline.remaining():.1f}s left in the request")
+
+
+def is_degraded(stage: str) -> bool:
+    deadline = _current.get()
+    return deadline is not None and stage in deadline.degraded
+
+
+async def with_deadline(awaitable: Awaitable[T], cap: Optional[float] = None) -> T:
+    """
+    Await with the stage timeout from `timeout_for(cap)`.
+
+    Raises:
+        DeadlineExceeded: The request ran out of time.
+        asyncio.TimeoutError: The stage's own cap expired first.
+    """
+    limit = timeout_for(cap)
+    if limit is None:
+        return await awaitable
+    if limit <= 0:
+        # Coroutine yang tidak pernah ditunggu ditutup agar tidak memicu peringatan
+        close = getattr(awaitable, "close", None)
+        if close is not None:
+            close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, limit)
+    except asyncio.TimeoutError:
+        if not has_time():
+            raise DeadlineExceeded("Request deadline exceeded") from None
+        raise
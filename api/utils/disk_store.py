@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class JsonDiskStore:
+    """
+    Small size-bounded key/value store that keeps one JSON file per key.
+    The least recently used files are evicted once `max_bytes` is exceeded;
+    pinned keys are never evicted.
+    All methods are blocking; call them through `asyncio.to_thread` from async code.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._pinned: Set[str] = set()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        file_name = hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+        return os.path.join(self.directory, file_name)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Perbarui mtime agar urutan LRU tetap akurat
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable disk cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        # Tulis ke file sementara lalu ganti secara atomik
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False, default=str)
+            os.replace(temp_path, path)
+        except Exception:
+            self._remove(temp_path)
+            raise
+        self._evict()
+
+    def pin(self, key: str) -> None:
+        """Keep the entry of `key` out of eviction until it is unpinned."""
+        self._pinned.add(self._path(key))
+
+    def unpin(self, key: str) -> None:
+        self._pinned.discard(self._path(key))
+
+    def delete(self, key: str) -> bool:
+        return self._remove(self._path(key))
+
+    def clear(self) -> int:
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and self._remove(entry.path):
+                removed += 1
+        return removed
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every stored value (in no particular order)."""
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable disk cache entry {entry.path}: {e}")
+
+    def size_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".json"))
+
+    def _evict(self) -> None:
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        total = sum(entry.stat().st_size for entry in entries)
+        if total <= self.max_bytes:
+            return
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if entry.path in self._pinned:
+                continue
+            size = entry.stat().st_size
+            if self._remove(entry.path):
+                total -= size
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Failed to delete disk cache file {path}: {e}")
+            return False
@@ -0,0 +1,56 @@
+import zipfile
+import logging
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if not head or b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+        return True
+    except UnicodeDecodeError as e:
+        # Potongan header bisa memotong karakter multi-byte di bagian akhir
+        return e.start >= len(head) - 3
+
+
+def detect_document_format(stream: BinaryIO) -> Optional[str]:
+    """
+    Detect the document format from its magic bytes instead of the filename.
+
+    Returns the canonical extension ('.pdf', '.docx', '.pptx', '.txt') or None
+    when the format cannot be determined (e.g. legacy OLE2 .doc/.ppt files),
+    in which case callers fall back to the filename suffix. The stream position
+    is restored to the start.
+    """
+    stream.seek(0)
+    head = stream.read(2048)
+    stream.seek(0)
+
+    try:
+        if PDF_MAGIC in head[:1024]:
+            return ".pdf"
+        if head.startswith(ZIP_MAGIC):
+            with zipfile.ZipFile(stream) as archive:
+                names = set(archive.namelist())
+            if "word/document.xml" in names:
+                return ".docx"
+            if "ppt/presentation.xml" in names:
+                return ".pptx"
+            return None
+        if head.startswith(OLE2_MAGIC):
+            return None
+        if _looks_like_text(head):
+            return ".txt"
+        return None
+    except zipfile.BadZipFile:
+        logger.warning("Upload has a ZIP signature but is not a valid archive.")
+        return None
+    finally:
+        stream.seek(0)
@@ -0,0 +1,164 @@
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CLOSERS = {"{": "}", "[": "]"}
+_WHITESPACE = " \t\r\n"
+# Skalar yang tidak bisa diperpanjang lagi; angka terpotong ("12" dari "1234") tidak termasuk
+_LITERALS = ("true", "false", "null")
+
+
+class IncrementalJsonParser:
+    """
+    Tolerant JSON parser for model output, fed in one piece or chunk by chunk.
+
+    Prose and markdown fences before the first '{' or '[' and anything after
+    the document are skipped, and trailing commas are dropped. `result()` can
+    be called at any time: a truncated document is closed after its last
+    complete value, and a string value cut off mid-way is kept up to where it
+    stops. A number still being read when the input ends is dropped, since
+    more digits may follow. `repaired` tells whether the document had to be
+    fixed.
+    """
+
+    def __init__(self):
+        self._chars: List[str] = []
+        # Satu entri per container terbuka: [pembuka, state]; state objek: key/colon/value/after, array: value/after
+        self._stack: List[List[str]] = []
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._in_scalar = False
+        self._scalar_start = 0
+        # Prefix terpanjang yang valid setelah ditutup, dan penutupnya
+        self._safe: Tuple[int, str] = (0, "")
+        self.repaired = False
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[opener] for opener, _ in reversed(self._stack))
+
+    def _value_done(self) -> None:
+        if self._stack:
+            self._stack[-1][1] = "after"
+            self._safe = (len(self._chars), self._closers())
+
+    def _drop_trailing_comma(self) -> None:
+        index = len(self._chars) - 1
+        while index >= 0 and self._chars[index] in _WHITESPACE:
+            index -= 1
+        if index >= 0 and self._chars[index] == ",":
+            del self._chars[index]
+            self.repaired = True
+
+    def feed(self, text: str) -> None:
+        for char in text:
+            if self._done:
+                return
+            self._consume(char)
+
+    def _consume(self, char: str) -> None:
+        if not self._started:
+            if char not in _CLOSERS:
+                return
+            self._started = True
+
+        if self._in_string:
+            self._chars.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if not self._string_is_key:
+                    self._value_done()
+            return
+
+        if self._in_scalar:
+            if char.isalnum() or char in "+-.":
+                self._chars.append(char)
+                return
+            self._in_scalar = False
+            self._value_done()
+
+        if char in _WHITESPACE:
+            self._chars.append(char)
+        elif char == '"':
+            self._in_string = True
+            self._string_is_key = bool(self._stack) and self._stack[-1] == ["{", "key"]
+            if self._string_is_key:
+                self._stack[-1][1] = "colon"
+            self._chars.append(char)
+        elif char in _CLOSERS:
+            self._chars.append(char)
+            self._stack.append([char, "key" if char == "{" else "value"])
+            self._safe = (len(self._chars), self._closers())
+        elif char in "}]":
+            if not self._stack or _CLOSERS[self._stack[-1][0]] != char:
+                # Penutup yang tidak cocok: sisa teks diabaikan
+                self.repaired = True
+                self._done = True
+                return
+            self._drop_trailing_comma()
+            self._chars.append(char)
+            self._stack.pop()
+            if self._stack:
+                self._value_done()
+            else:
+                self._done = True
+        elif char == ",":
+            if self._stack and self._stack[-1][1] == "after":
+                self._stack[-1][1] = "key" if self._stack[-1][0] == "{" else "value"
+            self._chars.append(char)
+        elif char == ":":
+            if self._stack and self._stack[-1][1] == "colon":
+                self._stack[-1][1] = "value"
+            self._chars.append(char)
+        else:
+            self._in_scalar = True
+            self._scalar_start = len(self._chars)
+            self._chars.append(char)
+
+    def _candidates(self) -> List[str]:
+        text = "".join(self._chars)
+        if self._done and not self._stack:
+            return [text]
+        candidates = []
+        if self._in_string and not self._string_is_key:
+            # String nilai yang terpotong ditutup apa adanya
+            partial = text[:-1] if self._escape else text
+            candidates.append(partial + '"' + self._closers())
+        elif self._in_scalar and text[self._scalar_start:] in _LITERALS:
+            candidates.append(text + self._closers())
+        length, closers = self._safe
+        prefix = text[:length].rstrip(_WHITESPACE)
+        if prefix.endswith(","):
+            prefix = prefix[:-1]
+        candidates.append(prefix + closers)
+        return candidates
+
+    def result(self) -> Optional[Any]:
+        """The parsed value, repaired if necessary; None when nothing usable was found."""
+        if not self._started:
+            return None
+        for index, candidate in enumerate(self._candidates()):
+            try:
+                value = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if index or not self._done:
+                self.repaired = True
+            return value
+        return None
+
+
+def parse_json_lenient(text: str) -> Tuple[Optional[Any], bool]:
+    """Parse model output as JSON; returns the value (None if unusable) and whether it had to be repaired."""
+    parser = IncrementalJsonParser()
+    parser.feed(text)
+    value = parser.result()
+    return value, parser.repaired
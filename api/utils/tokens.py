@@ -0,0 +1,53 @@
+import re
+
+# Kata (huruf/angka) atau satu tanda baca; spasi tidak dihitung
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Akhir kalimat (termasuk tanda kutip/kurung penutup) atau pergantian paragraf
+_SENTENCE_END_RE = re.compile(r"[.!?…][\"')\]]*(?=\s)|\n\s*\n")
+# A sentence boundary is only used when it keeps at least this share of the budget
+SENTENCE_MIN_FILL = 0.6
+
+
+def _word_tokens(word: str) -> int:
+    # Kata pendek = 1 token; kata panjang dipecah tokenizer, teks non-ASCII jauh lebih rapat
+    return 1 + len(word) // (7 if word.isascii() else 2)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate: one token per short word or punctuation mark,
+    more for long and non-ASCII words. Errs slightly high on English prose
+    (about 4 characters per token), so budgets are not overrun; never zero.
+    """
+    return max(1, sum(_word_tokens(match.group()) for match in _TOKEN_RE.finditer(text)))
+
+
+def token_offset(text: str, tokens: int) -> int:
+    """Character offset where the first `tokens` estimated tokens of `text` end."""
+    used = 0
+    for match in _TOKEN_RE.finditer(text):
+        used += _word_tokens(match.group())
+        if used > tokens:
+            return match.start()
+    return len(text)
+
+
+def truncate_to_tokens(text: str, tokens: int, marker: str = "...") -> str:
+    """
+    Shorten `text` to at most `tokens` estimated tokens. The cut is made at
+    the last sentence or paragraph end that keeps most of the budget, else
+    at the last word boundary followed by `marker`. Text within the budget
+    is returned unchanged.
+    """
+    end = token_offset(text, max(0, tokens))
+    if end >= len(text):
+        return text
+    # Satu karakter ekstra agar tanda titik tepat di batas tetap dikenali sebagai akhir kalimat
+    window = text[:end + 1]
+    boundary = 0
+    for match in _SENTENCE_END_RE.finditer(window, int(end * SENTENCE_MIN_FILL)):
+        boundary = match.end()
+    if boundary:
+        return text[:boundary].rstrip()
+    space = max(text.rfind(" ", 0, end), text.rfind("\n", 0, end))
+    return text[:space if space > 0 else end].rstrip() + marker
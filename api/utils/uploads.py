@@ -0,0 +1,89 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024
+# Jauh di bawah batas upload, agar memori per upload tetap kecil; sisanya ditulis ke file sementara
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_MB", "1")) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload exceeds the configured size limit."""
+    pass
+
+
+@dataclass
+class IngestedUpload:
+    """
+    An upload buffered in a spooled file: kept in memory up to
+    UPLOAD_SPOOL_MB and only rolled over to a temporary file beyond that.
+    """
+    stream: BinaryIO
+    size: int
+    sha256: str
+
+    def read_bytes(self) -> bytes:
+        self.stream.seek(0)
+        data = self.stream.read()
+        self.stream.seek(0)
+        return data
+
+    def cleanup(self) -> None:
+        try:
+            self.stream.close()
+        except Exception as e:
+            logger.warning(f"Failed to close upload buffer: {str(e)}")
+
+
+async def ingest_upload(
+    file: UploadFile,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+    spool_bytes: int = UPLOAD_SPOOL_BYTES,
+) -> IngestedUpload:
+    """
+    Stream an upload into a spooled buffer chunk by chunk.
+
+    The size limit is enforced while streaming (`file.size` is often unknown)
+    and the SHA-256 of the content is computed on the fly. Typical uploads
+    stay in memory, so extraction needs no temp-file round trip; writes past
+    the spool threshold go to disk in a worker thread so the event loop is
+    never blocked.
+
+    Raises:
+        UploadTooLargeError: The upload exceeded `max_bytes`; the buffer is discarded.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"File size must be less than {max_bytes // (1024 * 1024)}MB")
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"File size must be less than {max_bytes // (1024 * 1024)}MB")
+            digest.update(chunk)
+            if size > spool_bytes:
+                await asyncio.to_thread(buffer.write, chunk)
+            else:
+                buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+
+    buffer.seek(0)
+    return IngestedUpload(stream=buffer, size=size, sha256=digest.hexdigest())